@@ -6,11 +6,13 @@
 # Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, February 2017
 
 import numpy as np
+import scipy.sparse as sp
 import sklearn.neighbors as nn
-from scipy.spatial.distance import pdist, squareform
 
 import measures
 from classification.validation import utils as clf_utils
+from representation.sparse import knp_representation
+from retrieval.cascade import CascadeSearch
 
 # ---------------------------------------------------------------
 
@@ -19,7 +21,7 @@ def grid_search_in_euc_space(X, labels, folds=3):
     """KNN classifier accuracy in an Euclidean Space.
 
     Args:
-        X (np.ndarray): The data array.
+        X (np.ndarray, scipy.sparse.spmatrix): The data array.
         labels (list, np.ndarray): The data labels.
         folds (int): Amount of folds for validation.
 
@@ -32,7 +34,7 @@ def grid_search_in_euc_space(X, labels, folds=3):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not (isinstance(X, np.ndarray) or sp.issparse(X)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
@@ -87,27 +89,86 @@ def grid_search_in_pretopological_space(X, labels, measure, folds=3):
     if measure not in measures.measure_to_function:
         raise ValueError('Unknown dissimilarity measure.')
 
-    # creating a KNN classifier with a custom metric
-    knn = nn.KNeighborsClassifier(metric=measures.measure_to_function[measure])
+    # comparing all the samples only once (with the prepared version of the measure)
+    pm = measures.prepared_measure(measure)
+    dm = pm.matrix(pm.prepare(X))
+
+    # samples are represented by their index, so the classifier looks their dissimilarities up
+    X_idx = np.arange(X.shape[0], dtype=float)[:, np.newaxis]
+
+    # creating a KNN classifier with a custom metric (looking up the precomputed dissimilarities)
+    knn = nn.KNeighborsClassifier(metric=lambda a, b: dm[int(a[0]), int(b[0])], algorithm='brute')
 
     # list of `k` neighbours to test for
     params = {'n_neighbors': [1, 3, 5]}
 
     # performing grid search with cross validation
-    gs_results = clf_utils.grid_search_cv(knn, X, y, params, folds=folds)
+    gs_results = clf_utils.grid_search_cv(knn, X_idx, y, params, folds=folds)
 
     # returning the grid search validation results
     return gs_results
 
 
-def grid_search_in_dis_space(X, labels, measure, folds=3):
-    """KNN classifier accuracy in a Dissimilarity Space.
+def leave_one_out_in_pretopological_space(X, labels, measure, n_neighbors=1):
+    """Leave-one-out KNN classifier accuracy in a Pretopological Space.
+
+    The neighbours of each sample are found with an exact search pruned by cheap lower bounds
+    of the measure (see ``retrieval.cascade``), so most of the dissimilarities are never computed.
 
     Args:
         X (np.ndarray): The data array.
         labels (list, np.ndarray): The data labels.
         measure (int): The type of dissimilarity to use as metric (see 'measures' module).
+        n_neighbors (int): Amount of neighbours voting the label of each sample.
+
+    Returns:
+        float: The fraction of samples whose label is the most voted among their neighbours (ties
+        broken by the first label in sorted order).
+
+    """
+
+    # validating 'data' and 'labels'
+    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+        raise ValueError('Verify data and labels.')
+
+    # getting the values of labels as ndarray
+    y = labels.copy() if isinstance(labels, np.ndarray) else np.array(labels)
+
+    # validating consistency between samples and labels
+    if X.shape[0] != y.shape[0]:
+        raise ValueError('Amount of samples must be the same as the amount of labels.')
+
+    # validating the amount of neighbours (the sample itself is left out)
+    if not 1 <= n_neighbors < X.shape[0]:
+        raise ValueError('The amount of neighbours must be between 1 and the amount of samples minus one.')
+
+    # the neighbours of each sample, including itself
+    _, idx = CascadeSearch(X, measure).query(X, k=n_neighbors + 1)
+
+    # leaving each sample out of its neighbours (or the farthest one, if a duplicate displaced it)
+    own = idx == np.arange(X.shape[0])[:, np.newaxis]
+    own[~own.any(axis=1), -1] = True
+    neighbours = idx[~own].reshape((X.shape[0], n_neighbors))
+
+    # voting the labels among the neighbours
+    classes, y_codes = np.unique(y, return_inverse=True)
+    votes = np.zeros((X.shape[0], len(classes)), np.intp)
+    np.add.at(votes, (np.arange(X.shape[0])[:, np.newaxis], y_codes[neighbours]), 1)
+
+    # returning the leave-one-out accuracy
+    return float(np.mean(votes.argmax(axis=1) == y_codes))
+
+
+def grid_search_in_dis_space(X, labels, measure, folds=3, n_nearest=None):
+    """KNN classifier accuracy in a Dissimilarity Space.
+
+    Args:
+        X (np.ndarray, scipy.sparse.spmatrix, measures.DistanceMatrix): The data array (or the dissimilarity matrix, if 'precomputed').
+        labels (list, np.ndarray): The data labels.
+        measure (int, string): The type of dissimilarity to use as metric (see 'measures' module).
         folds (int): Amount of folds for validation.
+        n_nearest (int): If given, the space is the sparse representation by the affinities of each
+            sample to its `n_nearest` closest samples (see ``representation.sparse``).
 
     Returns:
         The result of the grid search procedure in a dissimilarity space.
@@ -118,7 +179,7 @@ def grid_search_in_dis_space(X, labels, measure, folds=3):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not (isinstance(X, (np.ndarray, measures.DistanceMatrix)) or sp.issparse(X)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
@@ -128,15 +189,17 @@ def grid_search_in_dis_space(X, labels, measure, folds=3):
     if X.shape[0] != y.shape[0]:
         raise ValueError('Amount of samples must be the same as the amount of labels.')
 
-    # the specified metric must be one of the implemented measures
-    if measure not in measures.measure_to_function:
-        raise ValueError('Unknown dissimilarity measure.')
-
-    # getting the metric function
-    d = measures.measure_to_function[measure]
-
-    # build distance/dissimilarity matrix
-    dm = squareform(pdist(X, d))
+    # taking X data as proximity values
+    if measure == 'precomputed':
+        # using X as proximity matrix (e.g. a memory mapped one, without copying it)
+        dm = clf_utils.precomputed_matrix(X)
+    else:
+        # the specified metric must be one of the implemented measures
+        if measure not in measures.measure_to_function:
+            raise ValueError('Unknown dissimilarity measure.')
+
+        # build distance/dissimilarity matrix (only with the nearest samples, if requested)
+        dm = measures.dissimilarity_matrix(X, measure) if n_nearest is None else knp_representation(X, X, measure, n_nearest)
 
     # returning the accuracy considering the dissimilarity space euclidean
     return grid_search_in_euc_space(dm, y, folds)
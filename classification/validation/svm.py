@@ -8,7 +8,6 @@
 import numpy as np
 from sklearn import svm
 from sklearn.preprocessing import MinMaxScaler
-from scipy.spatial.distance import pdist, squareform
 
 import measures
 import classification.validation.utils as clf_utils
@@ -126,9 +125,9 @@ def grid_search_in_dis_space(X, labels, measure, folds=3):
     """Grid search for SVM classifier in a Dissimilarity Space.
 
     Args:
-        X (np.ndarray): The data array.
+        X (np.ndarray, measures.DistanceMatrix): The data array (or the dissimilarity matrix, if 'precomputed').
         labels (list, np.ndarray): The data labels.
-        measure (int): The type of dissimilarity to use as metric (see 'measures' module).
+        measure (int, string): The type of dissimilarity to use as metric (see 'measures' module).
         folds (int): Amount of folds for validation
 
     Returns:
@@ -137,7 +136,7 @@ def grid_search_in_dis_space(X, labels, measure, folds=3):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not isinstance(X, (np.ndarray, measures.DistanceMatrix)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
@@ -147,11 +146,13 @@ def grid_search_in_dis_space(X, labels, measure, folds=3):
     if X.shape[0] != y.shape[0]:
         raise ValueError('Amount of samples must be the same as the amount of labels.')
 
-    # getting the metric function
-    d = measures.measure_to_function[measure]
-
-    # build distance/dissimilarity matrix
-    dm = squareform(pdist(X, d))
+    # taking X data as proximity values
+    if measure == 'precomputed':
+        # using X as proximity matrix (e.g. a memory mapped one, without copying it)
+        dm = clf_utils.precomputed_matrix(X)
+    else:
+        # build distance/dissimilarity matrix
+        dm = measures.dissimilarity_matrix(X, measure)
 
     # returning result of grid search considering the dissimilarity space euclidean
     return grid_search_in_euc_space(dm, labels, folds)
@@ -161,9 +162,9 @@ def grid_search_in_dis_space_params(X, labels, measure, params, folds=3):
     """Grid search for SVM classifier in a Dissimilarity Space.
 
     Args:
-        X (np.ndarray): The data array.
+        X (np.ndarray, measures.DistanceMatrix): The data array (or the dissimilarity matrix, if 'precomputed').
         labels (list, np.ndarray): The data labels.
-        measure (int): The type of dissimilarity to use as metric (see 'measures' module).
+        measure (int, string): The type of dissimilarity to use as metric (see 'measures' module).
         params (dict): Dictionary of parameters and its values.
         folds (int): Amount of folds for validation
 
@@ -173,7 +174,7 @@ def grid_search_in_dis_space_params(X, labels, measure, params, folds=3):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not isinstance(X, (np.ndarray, measures.DistanceMatrix)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
@@ -187,11 +188,13 @@ def grid_search_in_dis_space_params(X, labels, measure, params, folds=3):
     if not isinstance(params, dict) or not __valid_svm_params(params):
         raise AttributeError('Invalid parameters for SVM classifier.')
 
-    # getting the metric function
-    d = measures.measure_to_function[measure]
-
-    # build distance/dissimilarity matrix
-    dm = squareform(pdist(X, d))
+    # taking X data as proximity values
+    if measure == 'precomputed':
+        # using X as proximity matrix (e.g. a memory mapped one, without copying it)
+        dm = clf_utils.precomputed_matrix(X)
+    else:
+        # build distance/dissimilarity matrix
+        dm = measures.dissimilarity_matrix(X, measure)
 
     # returning result of grid search considering the dissimilarity space euclidean
     return grid_search_in_euc_space_params(dm, labels, params, folds)
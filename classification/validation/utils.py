@@ -6,17 +6,48 @@
 # Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, February 2017
 
 import numpy as np
+import scipy.sparse as sp
 from sklearn import grid_search
 
+import measures
+
 # -----------------------------------------------------
 
 
+def precomputed_matrix(X):
+    """Gets a precomputed (square) dissimilarity matrix as an array the estimators consume.
+
+    Args:
+        X (np.ndarray, measures.DistanceMatrix): The dissimilarity matrix (e.g. a memory mapped one).
+
+    Returns:
+        np.ndarray: The square matrix (arrays are returned as they are, without copying them).
+
+    Examples:
+        >>> import measures
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> D = precomputed_matrix(measures.DistanceMatrix.from_data(X, measures.EUCLIDEAN))
+        >>> type(D).__name__, D.shape
+        ('ndarray', (5, 5))
+        >>> precomputed_matrix(D) is D
+        True
+
+    """
+
+    # checking for square matrix
+    if X.shape[0] != X.shape[1]:
+        raise ValueError('Proximity matrix must be a squared matrix.')
+
+    # expanding condensed matrices
+    return X.square() if isinstance(X, measures.DistanceMatrix) else X
+
+
 def grid_search_cv(clf, X, labels, params, folds=3):
     """Grid search for SVM classifier.
 
     Args:
         clf: Classifier to perform grid search on.
-        X (np.ndarray): The data array.
+        X (np.ndarray, scipy.sparse.spmatrix): The data array.
         labels (list, np.ndarray): The data labels.
         params (dict): Dictionary of parameters and its values.
         folds (int): Amount of folds for validation.
@@ -27,7 +58,7 @@ def grid_search_cv(clf, X, labels, params, folds=3):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not (isinstance(X, np.ndarray) or sp.issparse(X)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
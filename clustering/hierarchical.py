@@ -7,8 +7,6 @@
 
 from sklearn.cluster import AgglomerativeClustering
 
-from scipy.spatial.distance import pdist, squareform
-
 import measures
 
 # ---------------------------------------------------------------
@@ -205,11 +203,8 @@ def agglomerative_clustering_in_pretopological_space(X, k, linkage, measure):
     if measure not in measures.measure_to_function:
         raise ValueError('Unknown dissimilarity measure.')
 
-    # getting the metric function
-    d = measures.measure_to_function[measure]
-
     # build distance/dissimilarity matrix
-    dm = squareform(pdist(X, d))
+    dm = measures.dissimilarity_matrix(X, measure)
 
     # returning the partition obtained for agglomerative clustering in the built space
     return agglomerative_clustering_in_some_space(dm, k, linkage=linkage, affinity='precomputed')
@@ -271,11 +266,8 @@ def agglomerative_clustering_in_dissimilarity_space(X, k, linkage, measure):
     if measure not in measures.measure_to_function:
         raise ValueError('Unknown dissimilarity measure.')
 
-    # getting the metric function
-    d = measures.measure_to_function[measure]
-
     # build distance/dissimilarity matrix
-    dm = squareform(pdist(X, d))
+    dm = measures.dissimilarity_matrix(X, measure)
 
     # returning the partition obtained for agglomerative clustering in the built space
     return agglomerative_clustering_in_some_space(dm, k, linkage=linkage, affinity='euclidean')
@@ -7,9 +7,8 @@
 
 from sklearn.cluster import KMeans
 
-from scipy.spatial.distance import pdist, squareform
-
 import measures
+from representation.sparse import knp_representation
 
 # ---------------------------------------------------------------
 
@@ -22,7 +21,7 @@ def kmeans_from_data_in_some_space(X, k, n_init=3):
     """KMeans clustering in some vector space.
 
     Args:
-        X (np.ndarray): The data array.
+        X (np.ndarray, scipy.sparse.spmatrix): The data array.
         k (int): The amount of clusters for the KMeans clustering algorithm.
         n_init (int): The amount of random initializations to try on
 
@@ -103,7 +102,7 @@ def kmeans_in_euclidean_space(X, k, n_init=3):
     return kmeans_from_data_in_some_space(X, k, n_init=n_init)
 
 
-def kmeans_in_dissimilarity_space(X, k, measure, n_init=3):
+def kmeans_in_dissimilarity_space(X, k, measure, n_init=3, n_nearest=None):
     """KMeans clustering over a Dissimilarity space.
 
     Args:
@@ -111,6 +110,8 @@ def kmeans_in_dissimilarity_space(X, k, measure, n_init=3):
         k (int): The amount of clusters for the KMeans clustering algorithm.
         measure (int): The type of dissimilarity to use as metric (see 'measures' module).
         n_init (int): The amount of random initializations to try on
+        n_nearest (int): If given, the space is the sparse representation by the affinities of each
+            sample to its `n_nearest` closest samples (see ``representation.sparse``).
 
     Returns:
         The partition found by KMeans in the built dissimilarity space.
@@ -143,11 +144,8 @@ def kmeans_in_dissimilarity_space(X, k, measure, n_init=3):
     if measure not in measures.measure_to_function:
         raise ValueError('Unknown dissimilarity measure.')
 
-    # getting the metric function
-    d = measures.measure_to_function[measure]
-
-    # build distance/dissimilarity matrix
-    dm = squareform(pdist(X, d))
+    # build distance/dissimilarity matrix (only with the nearest samples, if requested)
+    dm = measures.dissimilarity_matrix(X, measure) if n_nearest is None else knp_representation(X, X, measure, n_nearest)
 
     # returning the partition obtained for kmeans in the built space
     return kmeans_from_data_in_some_space(dm, k, n_init=n_init)
@@ -27,7 +27,6 @@ Todo:
 """
 
 import numpy as np
-from scipy.spatial.distance import pdist, squareform
 
 import measures
 
@@ -74,8 +73,7 @@ def kmedoids(X, k, measure, tmax=100):
             raise ValueError('Unknown measure')
 
         # building distance/dissimilarity matrix
-        d = measures.measure_to_function[measure]
-        D = squareform(pdist(X, d))
+        D = measures.dissimilarity_matrix(X, measure)
 
     # determine dimensions of distance matrix D
     m, n = D.shape
@@ -114,7 +114,7 @@ def dunn(X, labels, measure):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not isinstance(X, (np.ndarray, measures.DistanceMatrix)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
@@ -138,8 +138,7 @@ def dunn(X, labels, measure):
             raise ValueError('Unknown measure')
 
         # building distance/dissimilarity matrix
-        d = measures.measure_to_function[measure]
-        D = squareform(pdist(X, d))
+        D = measures.dissimilarity_matrix(X, measure)
 
     # --------- index computation ---------
 
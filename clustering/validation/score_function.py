@@ -30,7 +30,6 @@ Todo:
 from math import exp
 
 import numpy as np
-from scipy.spatial.distance import pdist, squareform
 
 import measures
 
@@ -80,7 +79,7 @@ def score_function(X, labels, measure=None):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not isinstance(X, (np.ndarray, measures.DistanceMatrix)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
@@ -108,8 +107,7 @@ def score_function(X, labels, measure=None):
             raise ValueError('Unknown measure')
 
         # building distance/dissimilarity matrix
-        d = measures.measure_to_function[measure]
-        D = squareform(pdist(X, d))
+        D = measures.dissimilarity_matrix(X, measure)
 
         # --------- index computation ---------
 
@@ -5,32 +5,61 @@
 # Proprietary and confidential
 # Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, August 2016
 
+from functools import partial
+
 from .euclidean_distance import euclidean
+from .euclidean_distance import euclidean_matrix
 from .manhattan_distance import manhattan
+from .manhattan_distance import manhattan_matrix
 from .minkowski_distance import minkowski
+from .minkowski_distance import minkowski_matrix
 
 from .shape_dissimilarity import dshape as shape_hy
 from .shape_dissimilarity import shape_measure as shape_py
+from .shape_dissimilarity import dspec_shape as shape_hy_matrix
+from .shape_dissimilarity import shape_measure_matrix as shape_py_matrix
 
 from .correlation_coefficient import probabilistic_correlation as prob_correlation
 from .correlation_coefficient import dis_correlation_scipy
+from .correlation_coefficient import dis_correlation_matrix
 from .pearson_coefficient import probabilistic_pearsonr as prob_pearson
 from .pearson_coefficient import dis_pearsonr as dis_pearson
 from .spearman_coefficient import probabilistic_spearmanr as prob_spearman
 from .spearman_coefficient import dis_spearmanr as dis_spearman
+from .spearman_coefficient import dis_spearman_matrix
 
 from .cosine_distance import cosine
+from .cosine_distance import cosine_matrix
 from .spectral_angle_mapper import sam
+from .spectral_angle_mapper import sam_matrix
 from .pearson_coefficient import dissimilarity_pcc as pcc
 
 from .kolmogorov_smirnov import dkolmogorov as kolmogorov
+from .kolmogorov_smirnov import dkolmogorov_matrix as kolmogorov_matrix
 from .bray_curtis import dis_bray_curtis as bray_curtis
+from .bray_curtis import dis_bray_curtis_matrix as bray_curtis_matrix
 from .chi_squared import X2
+from .chi_squared import X2_matrix
+from .earth_movers_distance import emd
+from .earth_movers_distance import emd_matrix
 
 from .andrew_curves import dis_andrews_curves
+from .andrew_curves import dis_andrews_curves_matrix
 from .corr_shape_dissimilarity import corr_dshape as corr_shape_hy
 from .corr_shape_dissimilarity import corr_shape_measure as corr_shape_py
+from .corr_shape_dissimilarity import corr_dspec_shape as corr_shape_hy_matrix
+from .corr_shape_dissimilarity import corr_shape_measure_matrix as corr_shape_py_matrix
 from .dcomb import dnom, dord
+from .dcomb import dnom_matrix, dord_matrix
+
+from .matrix import dissimilarity_matrix
+from .matrix import iter_dissimilarity_blocks
+from .distance_matrix import DistanceMatrix
+
+from . import prepared as _prepared
+from .prepared import PreparedMeasure
+from .prepared import prepared_measure
+from .shape_dissimilarity import DERFILTER as _DERFILTER, GAUSS1D as _GAUSS1D
 
 # ------------------------------------------------------
 
@@ -57,6 +86,7 @@ SAM = 10
 KOLMOGOROV = 11
 BRAY_CURTIS = 12
 CHI_SQUARED = 13
+EMD = 19
 
 # other measures
 ANDREW_CURVES = 14
@@ -92,6 +122,7 @@ measures_list = [
     KOLMOGOROV,
     BRAY_CURTIS,
     CHI_SQUARED,
+    EMD,
 
     # other measures
     ANDREW_CURVES,
@@ -101,6 +132,44 @@ measures_list = [
     DORD,
 ]
 
+# capabilities of the measures (combined as bit flags)
+SYMMETRIC = 1           # d(x, y) == d(y, x)
+ZERO_DIAGONAL = 2       # d(x, x) == 0
+METRIC = 4              # triangle inequality (metrics or pseudo-metrics on the spectra)
+
+# map of measure id and its capabilities
+measure_to_capabilities = {
+    EUCLIDEAN:      SYMMETRIC | ZERO_DIAGONAL | METRIC,
+    MANHATTAN:      SYMMETRIC | ZERO_DIAGONAL | METRIC,
+    MINKOWSKI:      SYMMETRIC | ZERO_DIAGONAL | METRIC,
+    SHAPE_HY:       SYMMETRIC | ZERO_DIAGONAL | METRIC,     # l1 distance among derivative filtered spectra
+    SHAPE_PY:       SYMMETRIC | ZERO_DIAGONAL | METRIC,
+    CORRELATION:    SYMMETRIC | ZERO_DIAGONAL,
+    PEARSON:        SYMMETRIC | ZERO_DIAGONAL,
+    SPEARMAN:       SYMMETRIC | ZERO_DIAGONAL,
+    PCC:            SYMMETRIC | ZERO_DIAGONAL,
+    COSINE:         SYMMETRIC | ZERO_DIAGONAL,
+    SAM:            SYMMETRIC | ZERO_DIAGONAL | METRIC,     # angle among the spectra
+    KOLMOGOROV:     SYMMETRIC | ZERO_DIAGONAL | METRIC,     # chebyshev distance among densities
+    BRAY_CURTIS:    SYMMETRIC | ZERO_DIAGONAL,
+    CHI_SQUARED:    SYMMETRIC | ZERO_DIAGONAL,
+    EMD:            SYMMETRIC | ZERO_DIAGONAL | METRIC,     # l1 distance among cumulative distributions
+    ANDREW_CURVES:  SYMMETRIC | ZERO_DIAGONAL,
+    CORR_SHAPE_HY:  SYMMETRIC | ZERO_DIAGONAL,
+    CORR_SHAPE_PY:  SYMMETRIC | ZERO_DIAGONAL,
+    DNOM:           SYMMETRIC | ZERO_DIAGONAL,
+    DORD:           SYMMETRIC | ZERO_DIAGONAL,
+}
+
+
+def has_capabilities(measure, capabilities):
+    """Checks whether a measure has all the given capabilities (e.g. ``SYMMETRIC | ZERO_DIAGONAL``)."""
+    return measure_to_capabilities.get(measure, 0) & capabilities == capabilities
+
+
+# measures satisfying the triangle inequality
+metric_measures = {m for m, c in measure_to_capabilities.items() if c & METRIC}
+
 # ---------------
 
 # map of measure id and the corresponding callable
@@ -119,7 +188,8 @@ measure_to_function = {
     KOLMOGOROV:     kolmogorov,
     BRAY_CURTIS:    bray_curtis,
     CHI_SQUARED:    X2,
-    ANDREW_CURVES:  lambda x, y: dis_andrews_curves(x, y, SHAPE_PY),
+    EMD:            emd,
+    ANDREW_CURVES:  partial(dis_andrews_curves, measure=SHAPE_PY),
     CORR_SHAPE_HY:  corr_shape_hy,
     CORR_SHAPE_PY:  corr_shape_py,
     DNOM:           dnom,
@@ -128,6 +198,65 @@ measure_to_function = {
 
 # ---------------
 
+# map of measure id and the corresponding batch callable (computing the whole (n, p) matrix at once)
+measure_to_matrix_function = {
+    EUCLIDEAN:      euclidean_matrix,
+    MANHATTAN:      manhattan_matrix,
+    MINKOWSKI:      minkowski_matrix,
+    SHAPE_HY:       shape_hy_matrix,
+    SHAPE_PY:       shape_py_matrix,
+    CORRELATION:    dis_correlation_matrix,
+    PEARSON:        dis_correlation_matrix,
+    SPEARMAN:       dis_spearman_matrix,
+    PCC:            dis_correlation_matrix,
+    COSINE:         cosine_matrix,
+    SAM:            sam_matrix,
+    KOLMOGOROV:     kolmogorov_matrix,
+    BRAY_CURTIS:    bray_curtis_matrix,
+    CHI_SQUARED:    X2_matrix,
+    EMD:            emd_matrix,
+    ANDREW_CURVES:  partial(dis_andrews_curves_matrix, measure=SHAPE_PY),
+    DNOM:           dnom_matrix,
+    DORD:           dord_matrix,
+    CORR_SHAPE_HY:  corr_shape_hy_matrix,
+    CORR_SHAPE_PY:  corr_shape_py_matrix,
+}
+
+# ---------------
+
+# map of measure id and the corresponding prepare/compare version (see 'measures.prepared')
+measure_to_prepared = {
+    EUCLIDEAN:      PreparedMeasure(_prepared.prepare_squared_norms, _prepared.compare_euclidean),
+    MANHATTAN:      PreparedMeasure(_prepared.prepare_float64,
+                                    partial(_prepared.compare_cdist, metric='cityblock')),
+    MINKOWSKI:      PreparedMeasure(_prepared.prepare_float32, _prepared.compare_minkowski),
+    SHAPE_HY:       PreparedMeasure(partial(_prepared.prepare_shape_features, variant=_DERFILTER),
+                                    partial(_prepared.compare_cdist, metric='cityblock')),
+    SHAPE_PY:       PreparedMeasure(partial(_prepared.prepare_shape_features, variant=_GAUSS1D),
+                                    partial(_prepared.compare_cdist, metric='cityblock')),
+    CORRELATION:    PreparedMeasure(_prepared.prepare_standardized, _prepared.compare_correlations),
+    PEARSON:        PreparedMeasure(_prepared.prepare_standardized, _prepared.compare_correlations),
+    SPEARMAN:       PreparedMeasure(_prepared.prepare_standardized_ranks, _prepared.compare_correlations),
+    PCC:            PreparedMeasure(_prepared.prepare_standardized, _prepared.compare_correlations),
+    COSINE:         PreparedMeasure(_prepared.prepare_unit_rows, _prepared.compare_cosines),
+    SAM:            PreparedMeasure(_prepared.prepare_angles, _prepared.compare_angles),
+    KOLMOGOROV:     PreparedMeasure(_prepared.prepare_densities,
+                                    partial(_prepared.compare_cdist, metric='chebyshev')),
+    BRAY_CURTIS:    PreparedMeasure(_prepared.prepare_float64,
+                                    partial(_prepared.compare_cdist, metric='braycurtis')),
+    CHI_SQUARED:    PreparedMeasure(_prepared.prepare_shifted, _prepared.compare_chi_squared),
+    EMD:            PreparedMeasure(_prepared.prepare_cdfs,
+                                    partial(_prepared.compare_cdist, metric='cityblock')),
+    ANDREW_CURVES:  PreparedMeasure(partial(_prepared.prepare_andrews_curves, measure=SHAPE_PY),
+                                    partial(_prepared.compare_andrews_curves, measure=SHAPE_PY)),
+    CORR_SHAPE_HY:  PreparedMeasure(partial(_prepared.prepare_standardized_shapes, variant=_DERFILTER),
+                                    _prepared.compare_correlations),
+    CORR_SHAPE_PY:  PreparedMeasure(partial(_prepared.prepare_standardized_shapes, variant=_GAUSS1D),
+                                    _prepared.compare_correlations),
+}
+
+# ---------------
+
 # map of measure id and measure name
 measures_names = {
     EUCLIDEAN:      'Euc',
@@ -144,6 +273,7 @@ measures_names = {
     KOLMOGOROV:     'Kol',
     BRAY_CURTIS:    'Bra',
     CHI_SQUARED:    'Chi',
+    EMD:            'EMD',
     ANDREW_CURVES:  'And',
     CORR_SHAPE_HY:  'CSH',
     CORR_SHAPE_PY:  'CSP',
@@ -9,13 +9,96 @@
 Andrew curves utilities for data representation and visualization.
 """
 
-from math import ceil, sqrt, pi
+from functools import lru_cache
+from math import sqrt, pi
 import numpy as np
 import measures
 
 # -------------------------------------------------
 
 
+@lru_cache(maxsize=32)
+def andrews_basis(n, m=100):
+    """Builds the (cached) Fourier basis of the Andrew's Curves.
+
+    Args:
+        n (int): The amount of features of the data vectors.
+        m (int): The range of values for the angles.
+
+    Returns:
+        np.ndarray: The (read only) m x n matrix `A` (see ``andrews_curves``).
+
+    Examples:
+        >>> A = andrews_basis(5, m=3)
+        >>> A.shape
+        (3, 5)
+        >>> andrews_basis(5, m=3) is A
+        True
+
+    """
+
+    # andrew curve dimension (a.k.a, amount theta angles)
+    t = np.linspace(-pi, pi, m)
+
+    # scaling coefficients for angle 'theta' (ceil(i / 2) for the i-th column)
+    c = (np.arange(1, n) + 1) // 2
+
+    # matrix Amxn:
+    # m: range of values for angle 'theta'
+    # n: amount of components for the Fourier function
+    A = np.empty((m, n))
+
+    # setting first column of A
+    A[:, 0] = 1.0 / sqrt(2.0)
+
+    # filling odd (sine) and even (cosine) columns of A
+    angles = np.outer(t, c)
+    A[:, 1::2] = np.sin(angles[:, 0::2])
+    A[:, 2::2] = np.cos(angles[:, 1::2])
+
+    # the basis is shared, so it must not be modified
+    A.flags.writeable = False
+
+    return A
+
+
+class AndrewsCurves(object):
+    """Transformation of data vectors into their Andrew's Curves.
+
+    Args:
+        m (int): The range of values for the angles.
+
+    Examples:
+        >>> M = np.array(range(1, 51)).reshape((5, 10))
+        >>> np.allclose(AndrewsCurves(m=5).transform(M), andrews_curves(M, m=5))
+        True
+
+    """
+
+    def __init__(self, m=100):
+        # the range of values for the angles
+        self.m = m
+
+    def transform(self, X):
+        """Computes the Andrew's Curves of a collection of data vectors.
+
+        Args:
+            X (np.ndarray): The data matrix (rows are samples).
+
+        Returns:
+            np.ndarray: The (n, m) matrix of Andrew's Curves (rows are samples).
+
+        """
+
+        # validating data dimensions
+        X = np.asarray(X)
+        if X.ndim != 2:
+            raise ValueError('Data must be a 2D matrix.')
+
+        # projecting the whole data set onto the (cached) basis
+        return np.dot(X, andrews_basis(X.shape[1], self.m).T)
+
+
 def dis_andrews_curves(x, y, measure, m=100):
     """Computes Andrew's Curves for the given data
 
@@ -61,7 +144,44 @@ def dis_andrews_curves(x, y, measure, m=100):
     andrews = andrews_curves(M, m)
 
     # returning the dissimilarity m between both curves
-    return d(andrews[0, :], andrews[0, :])
+    return d(andrews[0, :], andrews[1, :])
+
+
+def dis_andrews_curves_matrix(data, proto=None, measure=None, m=100, block_size=None):
+    """Computes the dissimilarities among the Andrew's Curves of the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        measure (int): The type of dissimilarity to use as metric in curve space (``SHAPE_PY`` by default).
+        m (int): The range of values for the angles.
+        block_size (int): Amount of samples compared at once (by default the whole matrix is computed at once).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of dissimilarities among Andrew's Curves.
+
+    Examples:
+        >>> X = np.sin(np.arange(1, 201).reshape((4, 50)) / 7.0) + 2.0
+        >>> D = dis_andrews_curves_matrix(X, measure=measures.EUCLIDEAN)
+        >>> np.allclose(D[0, 1], dis_andrews_curves(X[0], X[1], measures.EUCLIDEAN), rtol=1e-5)
+        True
+
+    """
+
+    # comparing shapes in curve space by default
+    measure = measures.SHAPE_PY if measure is None else measure
+
+    # the specified metric must be one of the implemented measures
+    if measure not in measures.measures_list:
+        raise ValueError('Unknown dissimilarity measure.')
+
+    # computing the curves of the whole data set (and prototypes) at once
+    transformer = AndrewsCurves(m)
+    data_curves = transformer.transform(np.asarray(data, np.float32))
+    proto_curves = None if proto is None or proto is data else transformer.transform(np.asarray(proto, np.float32))
+
+    # comparing the curves with the batch implementation of the measure (if any)
+    return measures.dissimilarity_matrix(data_curves, measure, proto_curves, block_size=block_size, cache=False)
 
 
 def andrews_curves(M, m=100):
@@ -121,35 +241,10 @@ def andrews_curves(M, m=100):
         raise ValueError("Only data vectors (1D) and collections of data vectors (2D) arrays supported")
 
     # getting data vectors
-    X = np.reshape(M, (1, -1)) if len(M.shape) == 1 else M.copy()
-
-    # getting the rows and the amount
-    rows, n = X.shape
-
-    # andrew curve dimension (a.k.a, amount theta angles)
-    t = np.linspace(-pi, pi, m)
-
-    # matrix Amxn:
-    # m: range of values for angle 'theta'
-    # n: amount of components for the Fourier function
-    A = np.empty((m, n))
-
-    # setting first column of A
-    A[:, 0] = [1.0 / sqrt(2.0)] * m
-
-    # filling columns of A
-    for i in range(1, n):
-        # computing the scaling coefficient for angle 'theta'
-        c = ceil(i / 2)
-
-        # computing i-th column of matrix A
-        col = np.sin(c * t) if i % 2 == 1 else np.cos(c * t)
-
-        # setting column in matrix A
-        A[:, i] = col[:]
+    X = np.reshape(M, (1, -1)) if len(M.shape) == 1 else M
 
     # computing the values of Andrew curves for data M
-    andrew_curves = np.dot(A, X.T).T
+    andrew_curves = AndrewsCurves(m).transform(X)
 
     # returning the Andrew's Curves (raveling if needed)
     return np.ravel(andrew_curves) if andrew_curves.shape[0] == 1 else andrew_curves
@@ -7,6 +7,8 @@
 
 from scipy.spatial.distance import braycurtis as scy_bray_curtis
 
+from measures.utils import blocked_cdist
+
 
 def dis_bray_curtis(x, y):
     """Computes the Bray Curtis dissimilarity value.
@@ -43,3 +45,29 @@ def dis_bray_curtis(x, y):
 
     # returning the bray curtis distance
     return scy_bray_curtis(x, y)
+
+
+def dis_bray_curtis_matrix(data, proto=None, block_size=None):
+    """Computes the Bray Curtis dissimilarities between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of Bray-Curtis dissimilarities.
+
+    Examples:
+        >>> import numpy as np
+        >>> X = np.array([[1.0, 2.0, 3.0, 20.0, 150.0, 3.0], [6.0, 5.0, 4.0, 3.0, 2.0, 1.0]])
+        >>> np.allclose(dis_bray_curtis_matrix(X)[0, 1], 0.88)
+        True
+
+    """
+
+    # comparing data against itself if no prototypes were given
+    proto = data if proto is None else proto
+
+    # computing the dissimilarities with the native scipy implementation
+    return blocked_cdist(data, proto, 'braycurtis', block_size)
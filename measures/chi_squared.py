@@ -7,6 +7,9 @@
 
 import numpy as np
 
+from measures.distributions import distribution_features, SHIFTED
+from measures.utils import pair_block_sizes, row_blocks
+
 
 def X2(x, y, eps=1e-10):
     """Computes the Chi Squared (X2) distance value.
@@ -68,3 +71,76 @@ def X2(x, y, eps=1e-10):
 
     # returning the sum of all the fractions
     return sum(fracs)
+
+
+def X2_matrix(data, proto=None, eps=1e-10, block_size=None):
+    """Computes the Chi Squared (X2) distances between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        eps (float): Tolerance parameter to avoid zero division
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of chi squared distances.
+
+    Notes:
+        * The differences of each block of samples against each tile of prototypes are computed at
+          once, so both are bounded by the memory budget of that (block, tile, features) buffer.
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0, 20.0, 150.0, 3.0], [6.0, 5.0, 4.0, 3.0, 2.0, 1.0]])
+        >>> np.allclose(X2_matrix(X)[0, 1], X2(X[0], X[1]))
+        True
+
+    """
+
+    # getting the non-negative spectra (only once when comparing data against itself)
+    data_pos = distribution_features(data, SHIFTED)
+    proto_pos = data_pos if proto is None else distribution_features(proto, SHIFTED)
+
+    # computing the distances among the non-negative spectra
+    return X2_nonnegative_matrix(data_pos, proto_pos, eps, block_size)
+
+
+def X2_nonnegative_matrix(data_pos, proto_pos, eps=1e-10, block_size=None):
+    """Computes the Chi Squared (X2) distances between already non-negative spectra.
+
+    Args:
+        data_pos (np.ndarray): The non-negative data array (e.g. ``distribution_features(data, SHIFTED)``).
+        proto_pos (np.ndarray): The non-negative prototypes array.
+        eps (float): Tolerance parameter to avoid zero division
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of chi squared distances.
+
+    """
+
+    # resulting distances
+    D = np.empty((data_pos.shape[0], proto_pos.shape[0]), np.float32)
+
+    # amount of samples and prototypes per tile (bounded by the memory budget of the fractions buffers)
+    block_size, proto_block = pair_block_sizes(proto_pos.shape[0], 2 * proto_pos.shape[1] * D.itemsize, block_size)
+
+    # computing the sum of the fractions tile by tile
+    for start, stop in row_blocks(data_pos.shape[0], block_size):
+        for p_start, p_stop in row_blocks(proto_pos.shape[0], proto_block):
+            x = data_pos[start:stop, np.newaxis, :]
+            y = proto_pos[np.newaxis, p_start:p_stop, :]
+
+            # computing the squared differences
+            num = x - y
+            num *= num
+
+            # computing the sum of both arrays
+            den = x + y
+            den += eps
+
+            # summing the fractions
+            num /= den
+            np.sum(num, axis=2, out=D[start:stop, p_start:p_stop])
+
+    # returning the distances
+    return D
@@ -5,89 +5,84 @@
 # Proprietary and confidential
 # Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, June 2017
 
-from math import ceil, floor
 import numpy as np
 from scipy.ndimage.filters import gaussian_filter1d as scipy_gauss1d
 from scipy.spatial.distance import correlation
 
-def derfilter(data, sigma=2.0):
-    # computing x boundaries
-    x_lb = int(floor(-3 * sigma))
-    x_ub = int(ceil(3 * sigma)) + 1   # accounting for the upper exclusive boundary in python
+from measures.shape_dissimilarity import shape_features, derivative_features, DERFILTER, GAUSS1D
+from measures.correlation_coefficient import dis_correlation_matrix
 
-    # computing x and g
-    x = np.arange(x_lb, x_ub)
-    g = np.exp(-0.5 * (x ** 2) / sigma ** 2)    # parenthesis only for clarity
 
-    # computing kernel
-    dg = -x * g / sigma ** 2
-    kernel = dg
+def corr_dshape(x, y, sigma=2.0):
+    # computing the filtered and normalized representation of the two samples
+    data2 = shape_features(np.array([x, y]), sigma)
 
-    # computing data and sizes
-    sc, fc = data.shape
-    kernel_length = kernel.shape[0]
-    kc = kernel_length + 10    # amount of columns of kernel
+    # computing the correlation distance between filtered samples
+    return correlation(data2[0], data2[1])
 
-    # output data
-    out = np.zeros(data.shape)
 
-    # extend the data by mirroring the tails
-    data2 = np.hstack([np.fliplr(data[:, 0:kc]), data, np.fliplr(data[:, -kc:])])
+def corr_dspec_shape(data, proto, sigma=2.0, block_size=None):
+    """Computes the dissimilarity representation of the data via correlation shape measure.
 
-    # size of the convolution output
-    outc = fc + 2*kc + kernel_length - 1
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array (rows are prototypes).
+        sigma (float): The smoothing parameter.
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
 
-    # ind = kc+ceil(length(kernel)/2):outc-kc-floor(length(kernel)/2);
-    ind = slice(kc + int(ceil(kernel_length / 2)), outc - kc - int(floor(kernel_length / 2)) + 1)   # +1 because Python excludes upper bound while MATLAB does not
+    Returns:
+        np.ndarray: The (n, p) matrix of correlation shape dissimilarities.
 
-    # TODO: Optimization here!: 1-list comprehension, 2-out=np.vstack(list_comprehension)
-    for i in range(sc):
-        t = np.convolve(data2[i, :], kernel)
-        out[i, :] = t[ind]
+    Examples:
+        >>> X = np.sin(np.arange(1, 201).reshape((4, 50)) / 7.0) + 2.0
+        >>> D = corr_dspec_shape(X, X[:2])
+        >>> np.allclose(D[3, 1], corr_dshape(X[3], X[1]))
+        True
 
-    # data convolved with a gaussian kernel
-    return out
+    """
 
+    # validating feature sizes
+    if data.shape[1] != proto.shape[1]:
+        raise Exception('Both "data" and "prototypes" must have the same feature sizes.')
 
-def corr_dshape(x, y, sigma=2.0):
-    # creating a data array from the two samples
-    data = np.array([x, y])
+    # filtered and normalized representation of both data and prototypes
+    data2 = derivative_features(data, sigma, DERFILTER)
+    proto2 = derivative_features(proto, sigma, DERFILTER)
 
-    # computing the dissimilarity representation via shape measure
-    dr_data = corr_dspec_shape(data, data, sigma)
+    # the dissimilarity representation (correlation distances between filtered samples and prototypes)
+    return dis_correlation_matrix(data2, proto2, block_size=block_size)
 
-    # dr_data should have shape (2, 2) and dshape(x, y) = dr_data[0, 1] = dr_data[1, 0]
-    return dr_data[0, 1]
 
+def corr_shape_measure_matrix(data, proto, sigma=2.0, block_size=None):
+    """Computes the dissimilarity representation of the data via ``corr_shape_measure``.
 
-def corr_dspec_shape(data, proto, sigma=2.0):
-    # validating feature sizes
-    if data.shape[1] != proto.shape[1]:
-        raise Exception('Both "data" and "prototypes" must have the same feature sizes.')
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array (rows are prototypes).
+        sigma (float): The smoothing parameter.
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
 
-    # getting samples and prototypes count
-    sc = data.shape[0]
-    pc = proto.shape[0]
+    Returns:
+        np.ndarray: The (n, p) matrix of correlation shape dissimilarities.
 
-    # resulting dissimilarity representation
-    d = np.zeros((sc, pc))
+    Examples:
+        >>> X = np.sin(np.arange(1, 201).reshape((4, 50)) / 7.0) + 2.0
+        >>> D = corr_shape_measure_matrix(X, X[:2])
+        >>> np.allclose(D[3, 1], corr_shape_measure(X[3], X[1]), atol=1e-6)
+        True
 
-    # derivative filter for both data and prototypes
-    data2 = derfilter(data, sigma)
-    proto2 = derfilter(proto, sigma)
+    """
 
-    # normalizing each row by its maximum value
-    data2 = np.apply_along_axis(lambda row: row / row.max(), 1, data2)
-    proto2 = np.apply_along_axis(lambda row: row / row.max(), 1, proto2)
+    # validating feature sizes
+    if data.shape[1] != proto.shape[1]:
+        raise Exception('Both "data" and "prototypes" must have the same feature sizes.')
 
-    # change here!!!!!!
-    # TODO: Optimization here!: 1-list comprehension, 2-out=np.vstack(list_comprehension)
-    for i in range(pc):
-        t = np.apply_along_axis(lambda row: correlation(row, proto2[i, :]), 1, data2)
-        d[:, i] = t
+    # filtered representation of both data and prototypes
+    data2 = derivative_features(data, sigma, GAUSS1D)
+    proto2 = derivative_features(proto, sigma, GAUSS1D)
 
-    # the dissimilarity representation
-    return d
+    # the dissimilarity representation (correlation distances between filtered samples and prototypes)
+    return dis_correlation_matrix(data2, proto2, block_size=block_size)
 
 
 def corr_shape_measure(x, y, sigma=2.0):
@@ -7,8 +7,11 @@
 
 from math import sqrt
 
+import numpy as np
 from scipy.spatial.distance import correlation as scy_correlation
 
+from measures.utils import block_size_for, row_blocks
+
 
 def correlation(x, y):
     """Computes the correlation coefficient.
@@ -137,3 +140,96 @@ def dis_correlation_scipy(x, y):
 
         # returning the correlation distance
         return scy_correlation(x, y)
+
+
+def standardize_rows(X, dtype=np.float64):
+    """Centers each row of `X` and scales it to unit norm.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        dtype (np.dtype): The floating point type of the result (float32 or float64).
+
+    Returns:
+        np.ndarray: The standardized rows (the dot product of two of them is their correlation coefficient).
+
+    """
+
+    # converting data to the requested precision
+    X = np.asarray(X, dtype)
+
+    # centering each row
+    Xc = X - X.mean(axis=1)[:, np.newaxis]
+
+    # scaling each row to unit norm (constant rows are undefined, as in the pairwise version)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return Xc / np.sqrt(np.einsum('ij,ij->i', Xc, Xc))[:, np.newaxis]
+
+
+def correlation_matrix(data, proto=None, dtype=np.float64, block_size=None):
+    """Computes the correlation coefficients between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        dtype (np.dtype): The floating point type used in the computation (float32 or float64).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of correlation coefficients.
+
+    Notes:
+        * Rows are standardized only once, then the whole matrix is computed with blocked matrix products.
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0, 20.0, 150.0, 3.0], [6.0, 5.0, 4.0, 3.0, 2.0, 1.0], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+        >>> R = correlation_matrix(X)
+        >>> np.allclose([R[0, 1], R[0, 2]], [correlation(X[0], X[1]), correlation(X[0], X[2])])
+        True
+        >>> correlation_matrix(X, X[:2], dtype=np.float32).dtype
+        dtype('float32')
+
+    """
+
+    # standardizing the rows of data and prototypes (only once when comparing data against itself)
+    data_std = standardize_rows(data, dtype)
+    proto_std = data_std if proto is None or proto is data else standardize_rows(proto, dtype)
+
+    # resulting correlation coefficients
+    R = np.empty((data_std.shape[0], proto_std.shape[0]), dtype)
+
+    # amount of samples per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(proto_std.shape[0] * R.itemsize) if block_size is None else block_size
+
+    # computing the correlations block by block with matrix products
+    for start, stop in row_blocks(data_std.shape[0], block_size):
+        np.dot(data_std[start:stop], proto_std.T, out=R[start:stop])
+
+    # clipping round-off errors to the valid range
+    return np.clip(R, -1.0, 1.0, out=R)
+
+
+def dis_correlation_matrix(data, proto=None, dtype=np.float64, block_size=None):
+    """Computes the correlation distances between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        dtype (np.dtype): The floating point type used in the computation (float32 or float64).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of correlation distances (as ``dis_correlation_scipy`` for each pair).
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0, 20.0, 150.0, 3.0], [6.0, 5.0, 4.0, 3.0, 2.0, 1.0], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+        >>> D = dis_correlation_matrix(X)
+        >>> np.allclose([D[0, 1], D[0, 2]], [1.4245486433123256, 0.5754513566876744])
+        True
+
+    """
+
+    # computing the correlation coefficients
+    D = correlation_matrix(data, proto, dtype, block_size)
+
+    # setting dissimilarity values to the interval [0, 2]
+    return np.subtract(1.0, D, out=D)
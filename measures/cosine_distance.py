@@ -7,6 +7,8 @@
 
 import numpy as np
 
+from measures.utils import block_size_for, row_blocks
+
 
 def cosine(x, y):
     """Cosine distance among two vectors.
@@ -33,3 +35,103 @@ def cosine(x, y):
 
     # converting cosine in a distance/dissimilarity
     return 1 - cos
+
+
+def row_norms(X, dtype=np.float64):
+    """Computes the euclidean norm of each row of `X`.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        dtype (np.dtype): The floating point type of the result (float32 or float64).
+
+    Returns:
+        np.ndarray: The norm of each row.
+
+    Examples:
+        >>> row_norms(np.array([[3.0, 4.0], [1.0, 0.0]])).tolist()
+        [5.0, 1.0]
+
+    """
+
+    # converting data to the requested precision
+    X = np.asarray(X, dtype)
+
+    # computing the norms without building the squared array
+    return np.sqrt(np.einsum('ij,ij->i', X, X))
+
+
+def cosine_similarity_matrix(data, proto=None, data_norms=None, proto_norms=None, dtype=np.float64, block_size=None):
+    """Computes the cosine of the angles between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        data_norms (np.ndarray): The precomputed norms of the rows of `data` (computed if not provided).
+        proto_norms (np.ndarray): The precomputed norms of the rows of `proto` (computed if not provided).
+        dtype (np.dtype): The floating point type used in the computation (float32 or float64).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of cosines.
+
+    Notes:
+        * Passing the norms of a reference library avoids recomputing them on every query batch.
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0], [6.0, 5.0, 4.0], [1.0, 0.0, 0.0]])
+        >>> C = cosine_similarity_matrix(X, X[:2])
+        >>> np.allclose(C[2, 1], 1 - cosine(X[2], X[1]))
+        True
+
+    """
+
+    # comparing data against itself if no prototypes were given
+    square = proto is None or proto is data
+
+    # converting data and prototypes to the requested precision
+    data = np.asarray(data, dtype)
+    proto = data if square else np.asarray(proto, dtype)
+
+    # computing the norms of the rows (only once when comparing data against itself)
+    data_norms = row_norms(data, dtype) if data_norms is None else np.asarray(data_norms, dtype)
+    proto_norms = data_norms if square else row_norms(proto, dtype) if proto_norms is None else np.asarray(proto_norms, dtype)
+
+    # resulting cosines
+    C = np.empty((data.shape[0], proto.shape[0]), dtype)
+
+    # amount of samples per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(proto.shape[0] * C.itemsize) if block_size is None else block_size
+
+    # computing the dot products block by block with matrix products
+    for start, stop in row_blocks(data.shape[0], block_size):
+        np.dot(data[start:stop], proto.T, out=C[start:stop])
+
+    # normalizing the dot products by the norms of both vectors
+    C /= data_norms[:, np.newaxis]
+    C /= proto_norms[np.newaxis, :]
+
+    # returning the cosines
+    return C
+
+
+def cosine_matrix(data, proto=None, data_norms=None, proto_norms=None, dtype=np.float64, block_size=None):
+    """Computes the cosine distances between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        data_norms (np.ndarray): The precomputed norms of the rows of `data` (computed if not provided).
+        proto_norms (np.ndarray): The precomputed norms of the rows of `proto` (computed if not provided).
+        dtype (np.dtype): The floating point type used in the computation (float32 or float64).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of cosine distances (as ``cosine`` for each pair).
+
+    """
+
+    # computing the cosines
+    D = cosine_similarity_matrix(data, proto, data_norms, proto_norms, dtype, block_size)
+
+    # converting cosines in distances/dissimilarities
+    return np.subtract(1.0, D, out=D)
@@ -3,7 +3,7 @@
 /**
 Funcion que devuelve un vector  binario que describe la presencia(1) o no(0) de una sustancia de origen. 
 **/
-vector<double> presence(vector<double> vector_origin)
+vector<double> presence(const vector<double>& vector_origin)
 {
 	vector<double> vector_presence;
 		
@@ -19,7 +19,7 @@ vector<double> presence(vector<double> vector_origin)
 	return vector_presence;
 }
 
-double dist_presence(vector<double> vector_incognita, vector<double> vector_origin)
+double dist_presence(const vector<double>& vector_incognita, const vector<double>& vector_origin)
 {
 	vector<double> presence_incognita = presence(vector_incognita);
 	double dist_presence=0.0;
@@ -34,7 +34,7 @@ double dist_presence(vector<double> vector_incognita, vector<double> vector_orig
 }
 
 /*** Funcion que calcula la distancia de correlacion de Pearson entre dos vectores***/
-double correlation(vector<double> vector_incognita, vector<double> vector_origin)
+double correlation(const vector<double>& vector_incognita, const vector<double>& vector_origin)
 {
 	double den=0;
 	double correlation;
@@ -69,7 +69,7 @@ double correlation(vector<double> vector_incognita, vector<double> vector_origin
  * Funcion que define una signatura S=[S_1,...,S_n], donde dado un conjunto A, S_k(A)={w_k,m_k}
  * Resultado: Devuelve en S, las matrices w y m
  **/
-vector<vector<double>> Definition_Signature(vector<double> vector_origin)
+vector<vector<double>> Definition_Signature(const vector<double>& vector_origin)
 {
 	vector<vector<double>> Signature;
 	vector<double> w;
@@ -90,7 +90,7 @@ vector<vector<double>> Definition_Signature(vector<double> vector_origin)
 	return Signature;
 }
 
-vector<vector<vector<double>>> Extended_Signature(vector<double> vector_incognita, vector<double> vector_origin)
+vector<vector<vector<double>>> Extended_Signature(const vector<double>& vector_incognita, const vector<double>& vector_origin)
 {
 	vector<vector<double>> Signature1_new;
 	vector<vector<double>> Signature2_new;
@@ -147,7 +147,7 @@ vector<vector<vector<double>>> Extended_Signature(vector<double> vector_incognit
 		return Signatures_new;
 }
 	
-double dist_nominal(vector<double> vector_incognita, vector<double> vector_origin)
+double dist_nominal(const vector<double>& vector_incognita, const vector<double>& vector_origin)
 {
 	double distance_nominal =0.0;
 	vector<vector<vector<double>>> Signatures_new=Extended_Signature(vector_incognita,vector_origin);
@@ -159,7 +159,7 @@ double dist_nominal(vector<double> vector_incognita, vector<double> vector_origi
 	return distance_nominal;
 }
 	
-double dist_ordinal(vector<double> vector_incognita, vector<double> vector_origin)
+double dist_ordinal(const vector<double>& vector_incognita, const vector<double>& vector_origin)
 {
 	double distance_ordinal=0.0;
 	double p=0.0;
@@ -174,7 +174,7 @@ double dist_ordinal(vector<double> vector_incognita, vector<double> vector_origi
 	return distance_ordinal;
 }
 
-double dnom_vec(vector<double> x, vector<double> y)
+double dnom_vec(const vector<double>& x, const vector<double>& y)
 {
 	double d_pres = dist_presence(x, y);
 
@@ -185,31 +185,224 @@ double dnom_vec(vector<double> x, vector<double> y)
 	return 0.5 * d_pres + 0.25 * d_corr + 0.25 * d_hist;
 }
 
-extern "C"
-double dnom(double* x, double* y, int count)
+double dord_vec(const vector<double>& x, const vector<double>& y)
 {
-	vector<double> vx(x, x + count);
-	vector<double> vy(y, y + count);
+	double d_pres = dist_presence(x, y);
+
+	double d_corr = correlation(x, y);
+
+	double d_hist = dist_ordinal(x, y);
 
-	return dnom_vec(vx, vy);
+	return 0.5 * d_pres + 0.25 * d_corr + 0.25 * d_hist;
 }
 
-double dord_vec(vector<double> x, vector<double> y)
+/**
+ * Funcion que prepara la signatura dispersa de un vector: sus entradas no nulas (presencia y productos cruzados),
+ * sus entradas positivas (signatura S = {w, m}), su media y la suma de sus desviaciones cuadraticas.
+ **/
+Prepared_Signature prepare_signature(const double* x, int count)
 {
-	double d_pres = dist_presence(x, y);
+	Prepared_Signature s;
+	s.count = count;
 
-	double d_corr = correlation(x, y);
+	double sum = 0.0;
+	for (int j = 0; j < count; j++)
+	{
+		sum += x[j];
 
-	double d_hist = dist_ordinal(x, y);
+		// entradas no nulas (definen la presencia)
+		if (x[j] != 0)
+		{
+			s.nz_index.push_back(j);
+			s.nz_value.push_back(x[j]);
+		}
+
+		// entradas positivas (definen la signatura)
+		if (x[j] > 0)
+		{
+			s.w.push_back(j);
+			s.m.push_back(x[j]);
+		}
+	}
+
+	s.mean = sum / count;
+
+	s.ssd = 0.0;
+	for (int j = 0; j < count; j++)
+	{
+		s.ssd += pow(x[j] - s.mean, 2.0);
+	}
+
+	return s;
+}
+
+/**
+ * Funcion que calcula la distancia de presencia y la de correlacion entre dos signaturas preparadas,
+ * mezclando sus entradas no nulas en O(nnz).
+ **/
+void presence_correlation(const Prepared_Signature& a, const Prepared_Signature& b, double& d_pres, double& d_corr)
+{
+	size_t i = 0;
+	size_t j = 0;
+	int common = 0;
+	double cross = 0.0;
+	while (i < a.nz_index.size() && j < b.nz_index.size())
+	{
+		if (a.nz_index[i] < b.nz_index[j]) { i++; }
+		else if (a.nz_index[i] > b.nz_index[j]) { j++; }
+		else
+		{
+			cross += a.nz_value[i] * b.nz_value[j];
+			common++;
+			i++;
+			j++;
+		}
+	}
+
+	// la presencia difiere en las entradas no nulas de solo uno de los vectores
+	d_pres = sqrt((double)(a.nz_index.size() + b.nz_index.size() - 2 * common));
+
+	// sum((x - mean_x) * (y - mean_y)) = sum(x * y) - n * mean_x * mean_y
+	double sum = cross - a.count * a.mean * b.mean;
+	d_corr = 1 - (sum / sqrt(a.ssd * b.ssd));
+}
+
+/**
+ * Funcion que mezcla las signaturas de dos vectores (como Extended_Signature, la mezcla termina cuando
+ * se agota alguna de las signaturas) y devuelve la distancia nominal o la ordinal.
+ **/
+double signature_distance(const Prepared_Signature& a, const Prepared_Signature& b, bool ordinal)
+{
+	size_t i = 0;
+	size_t j = 0;
+	bool first = true;
+	int w = 0;
+	int prev_w = 0;
+	double m1;
+	double m2;
+	double p = 0.0;
+	double distance = 0.0;
+	while (i < a.w.size() && j < b.w.size())
+	{
+		if (a.w[i] < b.w[j])
+		{
+			w = a.w[i]; m1 = a.m[i]; m2 = 0; i++;
+		}
+		else if (a.w[i] > b.w[j])
+		{
+			w = b.w[j]; m1 = 0; m2 = b.m[j]; j++;
+		}
+		else
+		{
+			w = a.w[i]; m1 = a.m[i]; m2 = b.m[j]; i++; j++;
+		}
+
+		if (ordinal)
+		{
+			// el acumulado hasta la posicion anterior, escalado por la distancia entre posiciones
+			if (!first) { distance += (w - prev_w) * abs(p); }
+			p += m1 - m2;
+			prev_w = w;
+			first = false;
+		}
+		else
+		{
+			distance += abs(m1 - m2);
+		}
+	}
+
+	return distance;
+}
+
+double dnom_prepared(const Prepared_Signature& x, const Prepared_Signature& y)
+{
+	double d_pres, d_corr;
+	presence_correlation(x, y, d_pres, d_corr);
+
+	double d_hist = signature_distance(x, y, false);
+
+	return 0.5 * d_pres + 0.25 * d_corr + 0.25 * d_hist;
+}
+
+double dord_prepared(const Prepared_Signature& x, const Prepared_Signature& y)
+{
+	double d_pres, d_corr;
+	presence_correlation(x, y, d_pres, d_corr);
+
+	double d_hist = signature_distance(x, y, true);
 
 	return 0.5 * d_pres + 0.25 * d_corr + 0.25 * d_hist;
 }
 
+extern "C"
+double dnom(double* x, double* y, int count)
+{
+	return dnom_prepared(prepare_signature(x, count), prepare_signature(y, count));
+}
+
 extern "C"
 double dord(double* x, double* y, int count)
 {
-	vector<double> vx(x, x + count);
-	vector<double> vy(y, y + count);
+	return dord_prepared(prepare_signature(x, count), prepare_signature(y, count));
+}
 
-	return dord_vec(vx, vy);
+/**
+ * Funcion que llena la matriz de disimilitudes out (n x p) entre las filas de X (n x count) y las de Y (p x count).
+ * Cada fila se prepara una sola vez y las filas de X se reparten en bloques contiguos entre n_threads hilos.
+ **/
+void dcomb_matrix(double (*d)(const Prepared_Signature&, const Prepared_Signature&),
+                  const double* X, int n, const double* Y, int p, int count, double* out, int n_threads)
+{
+	// preparando cada fila de Y una sola vez (compartidas por todos los hilos)
+	vector<Prepared_Signature> prepared_y(p);
+	for (int j = 0; j < p; j++)
+	{
+		prepared_y[j] = prepare_signature(Y + (size_t)j * count, count);
+	}
+
+	// trabajo de cada hilo: las filas [start, stop) de X
+	auto work = [&](int start, int stop)
+	{
+		for (int i = start; i < stop; i++)
+		{
+			Prepared_Signature prepared_x = prepare_signature(X + (size_t)i * count, count);
+			for (int j = 0; j < p; j++)
+			{
+				out[(size_t)i * p + j] = d(prepared_x, prepared_y[j]);
+			}
+		}
+	};
+
+	// al menos un hilo y no mas hilos que filas
+	n_threads = max(1, min(n_threads, n));
+	if (n_threads == 1)
+	{
+		work(0, n);
+		return;
+	}
+
+	// repartiendo las filas entre los hilos
+	vector<thread> threads;
+	int chunk = (n + n_threads - 1) / n_threads;
+	for (int start = 0; start < n; start += chunk)
+	{
+		threads.push_back(thread(work, start, min(start + chunk, n)));
+	}
+
+	for (size_t t = 0; t < threads.size(); t++)
+	{
+		threads[t].join();
+	}
+}
+
+extern "C"
+void dnom_matrix(const double* X, int n, const double* Y, int p, int count, double* out, int n_threads)
+{
+	dcomb_matrix(dnom_prepared, X, n, Y, p, count, out, n_threads);
+}
+
+extern "C"
+void dord_matrix(const double* X, int n, const double* Y, int p, int count, double* out, int n_threads)
+{
+	dcomb_matrix(dord_prepared, X, n, Y, p, count, out, n_threads);
 }
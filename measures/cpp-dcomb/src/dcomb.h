@@ -10,29 +10,63 @@
 #include <stdio.h>
 #include <sys/types.h>
 #include <complex>
+#include <thread>
 
 using namespace std;
 
-vector<double> presence(vector<double> vector_origin);
+vector<double> presence(const vector<double>& vector_origin);
 
-double dist_presence(vector<double> vector_incognita, vector<double> vector_origin);
+double dist_presence(const vector<double>& vector_incognita, const vector<double>& vector_origin);
 
-double correlation(vector<double> vector_incognita, vector<double> vector_origin);
+double correlation(const vector<double>& vector_incognita, const vector<double>& vector_origin);
 
-vector<vector<double>> Definition_Signature(vector<double> vector_origin);
+vector<vector<double>> Definition_Signature(const vector<double>& vector_origin);
 
-vector<vector<vector<double>>> Extended_Signature(vector<double> vector_incognita, vector<double> vector_origin);
+vector<vector<vector<double>>> Extended_Signature(const vector<double>& vector_incognita, const vector<double>& vector_origin);
 
-double dist_nominal(vector<double> vector_incognita, vector<double> vector_origin);
+double dist_nominal(const vector<double>& vector_incognita, const vector<double>& vector_origin);
 
-double dist_ordinal(vector<double> vector_incognita, vector<double> vector_origin);
+double dist_ordinal(const vector<double>& vector_incognita, const vector<double>& vector_origin);
 
-double dnom_vec(vector<double> x, vector<double> y);
+/**
+ * Signatura dispersa de un vector, preparada una sola vez para todas sus comparaciones.
+ **/
+struct Prepared_Signature
+{
+	int count;                  // longitud del vector
+	vector<int> nz_index;       // indices de las entradas no nulas
+	vector<double> nz_value;    // valores de las entradas no nulas
+	vector<int> w;              // indices de las entradas positivas (signatura)
+	vector<double> m;           // valores de las entradas positivas (signatura)
+	double mean;                // media del vector
+	double ssd;                 // suma de las desviaciones cuadraticas respecto a la media
+};
+
+Prepared_Signature prepare_signature(const double* x, int count);
+
+void presence_correlation(const Prepared_Signature& a, const Prepared_Signature& b, double& d_pres, double& d_corr);
+
+double signature_distance(const Prepared_Signature& a, const Prepared_Signature& b, bool ordinal);
+
+double dnom_prepared(const Prepared_Signature& x, const Prepared_Signature& y);
+
+double dord_prepared(const Prepared_Signature& x, const Prepared_Signature& y);
+
+double dnom_vec(const vector<double>& x, const vector<double>& y);
 
 extern "C"
 double dnom(double* x, double* y, int count);
 
-double dord_vec(vector<double> x, vector<double> y);
+double dord_vec(const vector<double>& x, const vector<double>& y);
 
 extern "C"
 double dord(double* x, double* y, int count);
+
+void dcomb_matrix(double (*d)(const Prepared_Signature&, const Prepared_Signature&),
+                  const double* X, int n, const double* Y, int p, int count, double* out, int n_threads);
+
+extern "C"
+void dnom_matrix(const double* X, int n, const double* Y, int p, int count, double* out, int n_threads);
+
+extern "C"
+void dord_matrix(const double* X, int n, const double* Y, int p, int count, double* out, int n_threads);
@@ -21,6 +21,8 @@ from ctypes import (
 
 import numpy as np
 
+from measures.utils import row_blocks
+
 # ---------------------------------------------------------------
 
 # common path for shared library
@@ -104,8 +106,107 @@ __dord = c_func(
     ('count', c_int, 1),  # int count
 )
 
+# handle to 'dnom_matrix' function in the *.so library
+__dnom_matrix = c_func(
+    'dnom_matrix', __dcomb_lib, None,
+
+    # 'X' matrix and its rows
+    ('X', c_double_p, 1),  # const double* X
+    ('n', c_int, 1),  # int n
+
+    # 'Y' matrix and its rows
+    ('Y', c_double_p, 1),  # const double* Y
+    ('p', c_int, 1),  # int p
+
+    # vectors count
+    ('count', c_int, 1),  # int count
+
+    # 'out' matrix (n x p)
+    ('out', c_double_p, 1),  # double* out
+
+    # amount of worker threads
+    ('n_threads', c_int, 1),  # int n_threads
+)
+
+# handle to 'dord_matrix' function in the *.so library
+__dord_matrix = c_func(
+    'dord_matrix', __dcomb_lib, None,
+
+    # 'X' matrix and its rows
+    ('X', c_double_p, 1),  # const double* X
+    ('n', c_int, 1),  # int n
+
+    # 'Y' matrix and its rows
+    ('Y', c_double_p, 1),  # const double* Y
+    ('p', c_int, 1),  # int p
+
+    # vectors count
+    ('count', c_int, 1),  # int count
+
+    # 'out' matrix (n x p)
+    ('out', c_double_p, 1),  # double* out
+
+    # amount of worker threads
+    ('n_threads', c_int, 1),  # int n_threads
+)
+
 # ---------------------------------------------------------------
 
+
+def __dcomb_matrix(c_matrix_func, data, proto, out, n_jobs, block_size):
+    """Fills a dissimilarity matrix with a native (multi-threaded) dcomb matrix function.
+
+    Args:
+        c_matrix_func (callable): The handle to the native matrix function.
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        out (np.ndarray): Preallocated c-contiguous float64 (n, p) output.
+        n_jobs (int): Amount of worker threads (all the available cores by default or if -1).
+        block_size (int): Amount of samples compared per native call (all of them by default).
+
+    Returns:
+        np.ndarray: The (n, p) dissimilarity matrix.
+
+    """
+
+    # getting contiguous float64 buffers (no copy if they already are)
+    data = np.ascontiguousarray(data, np.float64)
+    proto = data if proto is None else np.ascontiguousarray(proto, np.float64)
+
+    # validating data and prototypes altogether
+    if data.ndim != 2 or proto.ndim != 2 or data.shape[1] != proto.shape[1]:
+        raise ValueError('Data and prototypes must be 2D matrices with the same features size.')
+
+    # getting the sizes of the matrices
+    n, count = data.shape
+    p = proto.shape[0]
+
+    # allocating the output if not given
+    out = np.empty((n, p)) if out is None else out
+
+    # the output is written in place by the native library
+    if out.shape != (n, p) or out.dtype != np.float64 or not out.flags.c_contiguous or not out.flags.writeable:
+        raise ValueError('The output must be a writeable c-contiguous float64 (n, p) matrix.')
+
+    # using all the available cores by default (or if -1, as in 'measures.parallel')
+    n_jobs = (os.cpu_count() or 1) if n_jobs is None or n_jobs < 0 else max(1, n_jobs)
+
+    # comparing all the samples in a single native call by default
+    block_size = max(1, n) if block_size is None else block_size
+
+    # filling the output block by block of rows (the GIL is released during each native call)
+    proto_p = proto.ctypes.data_as(c_double_p)
+    for start, stop in row_blocks(n, block_size):
+        c_matrix_func(
+            data[start:stop].ctypes.data_as(c_double_p), stop - start,
+            proto_p, p, count,
+            out[start:stop].ctypes.data_as(c_double_p), n_jobs
+        )
+
+    # returning the dissimilarity matrix
+    return out
+
+
 def dnom(x, y):
     if len(x) != len(y):
         raise ValueError('Vectors must have the same size.')
@@ -141,3 +242,51 @@ def dord(x, y):
     d = __dord(x_arr, y_arr, count)
 
     return d
+
+
+def dnom_matrix(data, proto=None, out=None, n_jobs=None, block_size=None):
+    """Computes the DNOM dissimilarities between the rows of `data` and `proto` in a native call.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        out (np.ndarray): Preallocated c-contiguous float64 (n, p) output, filled in place.
+        n_jobs (int): Amount of worker threads (all the available cores by default or if -1).
+        block_size (int): Amount of samples compared per native call (all of them by default).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of DNOM dissimilarities.
+
+    Examples:
+        >>> X = np.array([[0.0, 1.0, 2.0, 0.0, 3.0], [1.0, 0.0, 2.0, 4.0, 0.0], [0.0, 2.0, 1.0, 1.0, 1.0]])
+        >>> np.allclose(dnom_matrix(X, n_jobs=2)[1, 2], dnom(X[1], X[2]))
+        True
+        >>> np.array_equal(dnom_matrix(X, n_jobs=-1), dnom_matrix(X, n_jobs=1))
+        True
+
+    """
+
+    return __dcomb_matrix(__dnom_matrix, data, proto, out, n_jobs, block_size)
+
+
+def dord_matrix(data, proto=None, out=None, n_jobs=None, block_size=None):
+    """Computes the DORD dissimilarities between the rows of `data` and `proto` in a native call.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        out (np.ndarray): Preallocated c-contiguous float64 (n, p) output, filled in place.
+        n_jobs (int): Amount of worker threads (all the available cores by default or if -1).
+        block_size (int): Amount of samples compared per native call (all of them by default).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of DORD dissimilarities.
+
+    Examples:
+        >>> X = np.array([[0.0, 1.0, 2.0, 0.0, 3.0], [1.0, 0.0, 2.0, 4.0, 0.0], [0.0, 2.0, 1.0, 1.0, 1.0]])
+        >>> np.allclose(dord_matrix(X, n_jobs=2)[1, 2], dord(X[1], X[2]))
+        True
+
+    """
+
+    return __dcomb_matrix(__dord_matrix, data, proto, out, n_jobs, block_size)
@@ -0,0 +1,417 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Out-of-core dissimilarity matrices stored in memory mapped files.
+
+The matrix is written block by block of rows into a raw ``numpy.memmap`` file, so it never
+has to fit in memory. A json sidecar (``<filename>.json``) describes the matrix and records
+how many rows were already written, so an interrupted build is resumed where it stopped.
+
+The resulting memmaps are ``np.ndarray`` instances, so they can be given as ``'precomputed'``
+input to the clustering, validation and classification functions without copying them.
+
+When new samples are appended to a data set, ``extend_memmap_matrix`` grows the stored matrix
+in place, computing only the comparisons of the new samples. Files derived from a matrix
+(e.g. its linkages, see ``memmap_linkage``) are registered in its sidecar (see
+``register_derived``) and removed whenever the matrix changes.
+"""
+
+import json
+import logging
+import os
+import time
+
+import numpy as np
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import squareform
+
+import measures
+from measures.feature_store import fingerprint
+from measures.matrix import iter_condensed_blocks, iter_dissimilarity_blocks
+from measures.utils import block_size_for, condensed_offset
+
+# ---------------------------------------------------------------
+
+# logger reporting the progress of the builds
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------
+
+
+def sidecar_path(filename):
+    """Gets the path of the json file describing a memory mapped matrix."""
+    return filename + '.json'
+
+
+def _write_sidecar(filename, meta):
+    """Atomically writes the json description of a memory mapped matrix."""
+
+    # writing to a temporary file first (a crash never leaves a partial description)
+    path = sidecar_path(filename)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+
+    # replacing the old description
+    os.replace(tmp_path, path)
+
+
+def _read_sidecar(filename):
+    """Reads the json description of a memory mapped matrix (None if there is none)."""
+
+    path = sidecar_path(filename)
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_memmap_matrix(X, measure, filename, Y=None, condensed=False, dtype=np.float64, block_size=None,
+                        resume=True):
+    """Computes a dissimilarity matrix straight into a memory mapped file, block by block of rows.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        filename (str): The path of the raw matrix file (its description is stored in ``<filename>.json``).
+        Y (np.ndarray): The prototypes array. If not provided, `X` is compared against itself.
+        condensed (bool): Whether to store only the upper triangle (as ``pdist``) instead of the square matrix.
+        dtype (np.dtype): The floating point type of the stored matrix.
+        block_size (int): Amount of rows computed at once (by default computed from the memory budget).
+        resume (bool): Whether to resume a previous (interrupted) build of the same matrix.
+
+    Returns:
+        np.memmap: The (read only) memory mapped matrix, (n, n) or (n, p) if square and
+        (n * (n - 1) / 2,) if condensed.
+
+    Examples:
+        >>> import tempfile
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> path = os.path.join(tempfile.mkdtemp(), 'euc.dat')
+        >>> D = build_memmap_matrix(X, measures.EUCLIDEAN, path, block_size=2)
+        >>> np.allclose(D, measures.dissimilarity_matrix(X, measures.EUCLIDEAN))
+        True
+        >>> d = build_memmap_matrix(X, measures.EUCLIDEAN, path + '.c', condensed=True, block_size=2)
+        >>> from scipy.spatial.distance import pdist
+        >>> np.allclose(d, pdist(X))
+        True
+
+    """
+
+    # the specified metric must be one of the implemented measures
+    if measure not in measures.measure_to_function:
+        raise ValueError('Unknown dissimilarity measure.')
+
+    # condensed matrices are only defined when comparing data against itself
+    if condensed and Y is not None:
+        raise ValueError('Condensed matrices require the data to be compared against itself.')
+
+    # getting data and prototypes as ndarrays
+    X = np.asarray(X)
+    Y = None if Y is None else np.asarray(Y)
+
+    # shape of the stored matrix
+    n = X.shape[0]
+    p = n if Y is None else Y.shape[0]
+    shape = (n * (n - 1) // 2,) if condensed else (n, p)
+
+    # description of the matrix (identifying the data, prototypes and measure)
+    meta = {
+        'shape': list(shape),
+        'dtype': np.dtype(dtype).str,
+        'measure': measure,
+        'condensed': condensed,
+        'rows': n,
+        'data': fingerprint(X),
+        'proto': None if Y is None else fingerprint(Y),
+        'rows_done': 0,
+    }
+
+    # resuming a previous build of the same matrix (if any)
+    old_meta = _read_sidecar(filename) if resume and os.path.exists(filename) else None
+    if old_meta is not None and all(old_meta.get(k) == v for k, v in meta.items() if k != 'rows_done'):
+        meta['rows_done'] = old_meta['rows_done']
+        D = np.memmap(filename, dtype=dtype, mode='r+', shape=shape)
+        logger.info('Resuming %s from row %d of %d.', filename, meta['rows_done'], n)
+    else:
+        D = np.memmap(filename, dtype=dtype, mode='w+', shape=shape)
+        _write_sidecar(filename, meta)
+
+    # amount of rows per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(p * 8) if block_size is None else block_size
+
+    # computing the remaining rows block by block
+    start_time = time.time()
+    rows_start = meta['rows_done']
+    if condensed:
+        blocks = iter_condensed_blocks(X, measure, block_size, first_row=rows_start)
+    else:
+        blocks = iter_dissimilarity_blocks(X, measure, Y, block_size, first_row=rows_start)
+
+    for start, stop, block in blocks:
+        # storing the block (the entries of consecutive rows are contiguous in the condensed matrix)
+        if condensed:
+            D[condensed_offset(n, start):condensed_offset(n, stop)] = block
+        else:
+            D[start:stop] = block
+
+        # persisting the block before recording it as done
+        D.flush()
+        meta['rows_done'] = stop
+        _write_sidecar(filename, meta)
+
+        # reporting the progress
+        elapsed = time.time() - start_time
+        logger.info('%s: %d/%d rows (%.1f rows/s).', filename, stop, n, (stop - rows_start) / max(elapsed, 1e-9))
+
+    # releasing the writable map
+    del D
+
+    # returning a read only map of the finished matrix
+    return open_memmap_matrix(filename)
+
+
+def open_memmap_matrix(filename):
+    """Opens a (finished) memory mapped dissimilarity matrix in read only mode.
+
+    Args:
+        filename (str): The path of the raw matrix file.
+
+    Returns:
+        np.memmap: The memory mapped matrix.
+
+    """
+
+    # reading the description of the matrix
+    meta = _read_sidecar(filename)
+    if meta is None:
+        raise ValueError('Missing description of the memory mapped matrix.')
+
+    # validating that the build was completed
+    if meta['rows_done'] < meta['rows']:
+        raise ValueError('The memory mapped matrix was not completely built.')
+
+    # mapping the matrix
+    return np.memmap(filename, dtype=np.dtype(meta['dtype']), mode='r', shape=tuple(meta['shape']))
+
+
+def register_derived(filename, path):
+    """Records a file derived from a memory mapped matrix (e.g. a linkage, see ``memmap_linkage``).
+
+    Registered files are removed when the matrix changes (see ``extend_memmap_matrix``).
+
+    Args:
+        filename (str): The path of the raw matrix file.
+        path (str): The path of the derived file.
+
+    """
+
+    # reading the description of the matrix
+    meta = _read_sidecar(filename)
+    if meta is None:
+        raise ValueError('Missing description of the memory mapped matrix.')
+
+    # recording the derived file (only once)
+    derived = meta.setdefault('derived', [])
+    if path not in derived:
+        derived.append(path)
+        _write_sidecar(filename, meta)
+
+
+def invalidate_derived(filename):
+    """Removes the files derived from a memory mapped matrix (see ``register_derived``).
+
+    Args:
+        filename (str): The path of the raw matrix file.
+
+    Returns:
+        list: The paths of the removed files.
+
+    """
+
+    meta = _read_sidecar(filename)
+    if meta is None or not meta.get('derived'):
+        return []
+
+    # removing the derived files (missing ones were already invalidated)
+    removed = []
+    for path in meta['derived']:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError:
+            pass
+
+    # forgetting them
+    meta['derived'] = []
+    _write_sidecar(filename, meta)
+
+    return removed
+
+
+def memmap_linkage(filename, method='average'):
+    """Computes (or reuses) the hierarchical clustering linkage of a memory mapped matrix.
+
+    The linkage is stored next to the matrix (``<filename>.<method>.linkage.npy``) and registered
+    as derived from it, so it is computed again once the matrix changes (see ``extend_memmap_matrix``).
+
+    Args:
+        filename (str): The path of the raw matrix file (square or condensed, of data against itself).
+        method (str): The linkage method (see ``scipy.cluster.hierarchy.linkage``), e.g. 'average'.
+
+    Returns:
+        np.ndarray: The linkage matrix.
+
+    Examples:
+        >>> import tempfile
+        >>> X = np.random.RandomState(0).rand(6, 4)
+        >>> path = os.path.join(tempfile.mkdtemp(), 'euc.dat')
+        >>> _ = build_memmap_matrix(X, measures.EUCLIDEAN, path, condensed=True)
+        >>> memmap_linkage(path).shape, os.path.exists(path + '.average.linkage.npy')
+        ((5, 4), True)
+        >>> _ = extend_memmap_matrix(X, X[:1] + 1, path)
+        >>> os.path.exists(path + '.average.linkage.npy')
+        False
+
+    """
+
+    # mapping the (finished) matrix
+    D = open_memmap_matrix(filename)
+    meta = _read_sidecar(filename)
+
+    # validating that the matrix is one of data against itself
+    if meta['proto'] is not None:
+        raise ValueError('Only matrices of data against itself have a linkage.')
+
+    # reusing the stored linkage (only registered ones are up to date)
+    path = '{}.{}.linkage.npy'.format(filename, method)
+    if path in meta.get('derived', []) and os.path.exists(path):
+        return np.load(path)
+
+    # computing the linkage from the condensed matrix
+    Z = hierarchy.linkage(np.asarray(D) if meta['condensed'] else squareform(D, checks=False), method=method)
+
+    # storing the linkage and registering it as derived from the matrix
+    np.save(path, Z)
+    register_derived(filename, path)
+
+    return Z
+
+
+def extend_memmap_matrix(X, X_new, filename, block_size=None):
+    """Appends new samples to the memory mapped dissimilarity matrix of a data set, in place.
+
+    Only the comparisons of the new samples against all the samples (old and new) are computed;
+    the entries among old samples are moved (from the last row to the first, so no row is
+    overwritten before being moved) to their place in the larger matrix. The comparisons of the
+    old samples against the new ones are mirrored from the new block, as the measures are symmetric.
+
+    The files derived from the matrix are removed first (see ``register_derived``). If the
+    extension is interrupted, the matrix is recorded as not built, so ``build_memmap_matrix``
+    with the extended data recomputes it.
+
+    Args:
+        X (np.ndarray): The data the matrix was built with.
+        X_new (np.ndarray): The new samples (appended after the ones of `X`).
+        filename (str): The path of the raw matrix file (square or condensed, of `X` against itself).
+        block_size (int): Amount of new rows computed at once (by default computed from the memory budget).
+
+    Returns:
+        np.memmap: The (read only) memory mapped matrix of the extended data.
+
+    Examples:
+        >>> import tempfile
+        >>> X = np.array(range(1, 36), float).reshape((7, 5)) ** 0.5
+        >>> path = os.path.join(tempfile.mkdtemp(), 'man.dat')
+        >>> _ = build_memmap_matrix(X[:4], measures.MANHATTAN, path, condensed=True)
+        >>> d = extend_memmap_matrix(X[:4], X[4:], path, block_size=2)
+        >>> from scipy.spatial.distance import pdist
+        >>> np.allclose(d, pdist(X, 'cityblock'))
+        True
+
+    """
+
+    # reading the description of the matrix
+    meta = _read_sidecar(filename)
+    if meta is None:
+        raise ValueError('Missing description of the memory mapped matrix.')
+
+    # validating that the matrix is a complete one of the data against itself
+    X = np.asarray(X)
+    if meta['rows_done'] < meta['rows'] or meta['proto'] is not None:
+        raise ValueError('Only completely built matrices of data against itself can be extended.')
+    if meta['data'] != fingerprint(X):
+        raise ValueError('The data is not the one the matrix was built with.')
+
+    # validating the new samples
+    X_new = np.asarray(X_new)
+    if X_new.ndim != 2 or X_new.shape[1] != X.shape[1]:
+        raise ValueError('New samples must be a 2D matrix with the same amount of features of the data.')
+
+    # sizes of the old and extended matrices
+    X_all = np.concatenate([X, X_new])
+    n, N = X.shape[0], X_all.shape[0]
+    condensed, dtype = meta['condensed'], np.dtype(meta['dtype'])
+    shape = (N * (N - 1) // 2,) if condensed else (N, N)
+
+    # the derived files are stale from now on
+    invalidate_derived(filename)
+
+    # recording the extended matrix as not built (an interrupted extension is recomputed)
+    meta.update(shape=list(shape), rows=N, data=fingerprint(X_all), rows_done=0)
+    _write_sidecar(filename, meta)
+
+    # growing the file
+    with open(filename, 'r+b') as f:
+        f.truncate(int(np.prod(shape)) * dtype.itemsize)
+    D = np.memmap(filename, dtype=dtype, mode='r+', shape=(int(np.prod(shape)),))
+
+    # moving the old rows to their new offsets (from the last one, as offsets only grow)
+    for i in range(n - 1, 0, -1):
+        if condensed:
+            old, new, length = condensed_offset(n, i), condensed_offset(N, i), n - 1 - i
+        else:
+            old, new, length = i * n, i * N, n
+        D[new:new + length] = D[old:old + length]
+
+    # offsets of the first comparison against a new sample of each old row
+    rows = np.arange(n)
+    first_new = condensed_offset(N, rows) + (n - 1 - rows) if condensed else rows * N + n
+
+    # amount of rows per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(N * 8) if block_size is None else block_size
+
+    # computing the comparisons of the new samples against all of them
+    start_time = time.time()
+    for start, stop, block in iter_dissimilarity_blocks(X_new, meta['measure'], X_all, block_size):
+        # self-dissimilarities are zero (as in 'squareform')
+        new_rows = np.arange(n + start, n + stop)
+        block[new_rows - n - start, new_rows] = 0.0
+
+        # storing the new rows
+        for r, i in enumerate(new_rows):
+            if condensed:
+                D[condensed_offset(N, i):condensed_offset(N, i + 1)] = block[r, i + 1:]
+            else:
+                D[i * N:(i + 1) * N] = block[r]
+
+        # mirroring them on the old rows
+        D[first_new[:, np.newaxis] + np.arange(start, stop)] = block[:, :n].T
+
+        # reporting the progress
+        elapsed = time.time() - start_time
+        logger.info('%s: %d/%d new rows (%.1f rows/s).', filename, stop, N - n, stop / max(elapsed, 1e-9))
+
+    # persisting the extended matrix before recording it as built
+    D.flush()
+    del D
+    meta['rows_done'] = N
+    _write_sidecar(filename, meta)
+
+    # returning a read only map of the extended matrix
+    return open_memmap_matrix(filename)
@@ -0,0 +1,254 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Symmetric dissimilarity matrices stored in condensed form.
+
+A ``DistanceMatrix`` keeps only the upper triangle of a symmetric, zero diagonal
+dissimilarity matrix (in scipy's ``pdist`` layout), i.e. half the memory of the square
+matrix. It is indexed as a square ndarray (only the requested entries are gathered) and
+is expanded into the square matrix only when converted with ``np.asarray``.
+"""
+
+import numpy as np
+from scipy.spatial.distance import squareform
+
+from measures.matrix import iter_condensed_blocks
+from measures.utils import condensed_offset
+
+# ---------------------------------------------------------------
+
+
+class DistanceMatrix(object):
+    """Symmetric dissimilarity matrix stored as its condensed upper triangle.
+
+    Args:
+        condensed (np.ndarray): The condensed matrix (as returned by ``pdist``), possibly memory mapped.
+
+    Examples:
+        >>> from scipy.spatial.distance import pdist
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> dm = DistanceMatrix(pdist(X))
+        >>> dm.shape
+        (5, 5)
+        >>> np.allclose(dm[1, 3], np.linalg.norm(X[1] - X[3])), float(dm[2, 2])
+        (True, 0.0)
+        >>> np.allclose(dm[[0, 4]][:, [1, 2]], squareform(pdist(X))[[0, 4]][:, [1, 2]])
+        True
+
+    """
+
+    def __init__(self, condensed):
+        # validating the condensed matrix
+        condensed = np.asarray(condensed) if not isinstance(condensed, np.ndarray) else condensed
+        if condensed.ndim != 1:
+            raise ValueError('The condensed matrix must be a 1D array.')
+
+        # getting the amount of samples (n * (n - 1) / 2 entries)
+        n = int(round((1 + np.sqrt(1 + 8 * condensed.shape[0])) / 2))
+        if n * (n - 1) // 2 != condensed.shape[0]:
+            raise ValueError('Invalid size for a condensed matrix.')
+
+        # the upper triangle entries and the amount of samples
+        self.condensed = condensed
+        self.n = n
+
+    @classmethod
+    def from_data(cls, X, measure, dtype=np.float64, block_size=None):
+        """Computes the condensed dissimilarity matrix of a data set block by block of rows.
+
+        Args:
+            X (np.ndarray): The data array (rows are samples).
+            measure (int): The type of dissimilarity to use (see 'measures' module).
+            dtype (np.dtype): The floating point type of the stored matrix (e.g. float32 to halve it again).
+            block_size (int): Amount of rows computed at once (by default computed from the memory budget).
+
+        Returns:
+            DistanceMatrix: The dissimilarity matrix of `X`.
+
+        """
+
+        # the condensed matrix of n samples
+        n = np.asarray(X).shape[0]
+        condensed = np.empty(n * (n - 1) // 2, dtype)
+
+        # filling it block by block of rows
+        for start, stop, values in iter_condensed_blocks(X, measure, block_size):
+            condensed[condensed_offset(n, start):condensed_offset(n, stop)] = values
+
+        return cls(condensed)
+
+    @classmethod
+    def from_square(cls, D, dtype=None):
+        """Builds a distance matrix from a square symmetric matrix.
+
+        Args:
+            D (np.ndarray): The square symmetric matrix.
+            dtype (np.dtype): The floating point type of the stored matrix (the one of `D` by default).
+
+        Returns:
+            DistanceMatrix: The condensed version of `D`.
+
+        """
+
+        # keeping only the upper triangle (as scipy's 'squareform')
+        condensed = squareform(np.asarray(D), checks=False)
+
+        return cls(condensed if dtype is None else condensed.astype(dtype))
+
+    @property
+    def shape(self):
+        """tuple: The shape of the (square) matrix."""
+        return self.n, self.n
+
+    @property
+    def ndim(self):
+        """int: The dimensions of the matrix (always 2)."""
+        return 2
+
+    @property
+    def dtype(self):
+        """np.dtype: The type of the stored dissimilarities."""
+        return self.condensed.dtype
+
+    @property
+    def nbytes(self):
+        """int: The amount of bytes of the stored (condensed) matrix."""
+        return self.condensed.nbytes
+
+    def __len__(self):
+        return self.n
+
+    def values(self, rows, cols):
+        """Gathers the dissimilarities between pairs of samples.
+
+        Args:
+            rows (np.ndarray): The indices of the first sample of each pair.
+            cols (np.ndarray): The indices of the second sample of each pair (same shape as `rows`).
+
+        Returns:
+            np.ndarray: The dissimilarities of each pair (zero for pairs of the same sample).
+
+        """
+
+        # getting the indices of the pairs as (broadcast) arrays
+        rows, cols = np.broadcast_arrays(np.asarray(rows, np.intp), np.asarray(cols, np.intp))
+
+        # comparisons of different samples (self-dissimilarities are zero)
+        out = np.zeros(rows.shape, self.dtype)
+        mask = rows != cols
+
+        # position of each pair (i < j) in the condensed matrix
+        i = np.minimum(rows[mask], cols[mask])
+        j = np.maximum(rows[mask], cols[mask])
+        out[mask] = self.condensed[condensed_offset(self.n, i) + (j - i - 1)]
+
+        return out
+
+    def __getitem__(self, key):
+        # indices of rows and columns of the square matrix (broadcast views, no memory used)
+        rows = np.broadcast_to(np.arange(self.n)[:, np.newaxis], self.shape)
+        cols = np.broadcast_to(np.arange(self.n)[np.newaxis, :], self.shape)
+
+        # selecting the entries as numpy would do in the square matrix
+        rows, cols = rows[key], cols[key]
+
+        # a single entry
+        if np.ndim(rows) == 0:
+            return self.values(rows, cols)[()]
+
+        # gathering the selected entries only
+        return self.values(rows, cols)
+
+    def row(self, i):
+        """Gets the dissimilarities of a sample against all the samples.
+
+        Args:
+            i (int): The index of the sample.
+
+        Returns:
+            np.ndarray: The `i`-th row of the square matrix.
+
+        """
+
+        return self.values(i, np.arange(self.n))
+
+    def block(self, rows, cols=None):
+        """Gets the (dense) block of dissimilarities among two sets of samples.
+
+        Args:
+            rows (np.ndarray): The indices (or boolean mask) of the samples of the rows.
+            cols (np.ndarray): The indices (or boolean mask) of the samples of the columns (`rows` by default).
+
+        Returns:
+            np.ndarray: The (len(rows), len(cols)) block of the square matrix.
+
+        """
+
+        # getting the indices of the samples
+        rows = np.arange(self.n)[rows]
+        cols = rows if cols is None else np.arange(self.n)[cols]
+
+        return self.values(rows[:, np.newaxis], cols[np.newaxis, :])
+
+    def label_block(self, labels, a, b=None):
+        """Gets the block of dissimilarities among the samples of two classes.
+
+        Args:
+            labels (np.ndarray, list): The labels of the samples.
+            a: The label of the samples of the rows.
+            b: The label of the samples of the columns (`a` by default, i.e. the within class block).
+
+        Returns:
+            np.ndarray: The block of dissimilarities (samples in their original order).
+
+        Examples:
+            >>> dm = DistanceMatrix.from_square(np.array([[0, 1, 2], [1, 0, 3], [2, 3, 0]], float))
+            >>> dm.label_block([0, 1, 0], 0).tolist()
+            [[0.0, 2.0], [2.0, 0.0]]
+            >>> dm.label_block([0, 1, 0], 0, 1).tolist()
+            [[1.0], [3.0]]
+
+        """
+
+        # getting the values of labels as ndarray
+        y = np.asarray(labels)
+
+        return self.block(y == a, y == (a if b is None else b))
+
+    def sub_matrix(self, indices):
+        """Gets the distance matrix of a subset of the samples.
+
+        Args:
+            indices (np.ndarray): The indices (or boolean mask) of the samples (in the desired order).
+
+        Returns:
+            DistanceMatrix: The (condensed) dissimilarity matrix of the subset.
+
+        """
+
+        # getting the indices of the samples
+        idx = np.arange(self.n)[indices]
+
+        # pairs (i < j) of the subset, in condensed order
+        i, j = np.triu_indices(len(idx), k=1)
+
+        return DistanceMatrix(self.values(idx[i], idx[j]))
+
+    def square(self):
+        """Expands the matrix into its square (redundant) form.
+
+        Returns:
+            np.ndarray: The (n, n) square matrix.
+
+        """
+
+        return squareform(self.condensed, checks=False)
+
+    def __array__(self, dtype=None, copy=None):
+        # lazy expansion (e.g. when given to functions requiring the square matrix)
+        D = self.square()
+        return D if dtype is None else D.astype(dtype)
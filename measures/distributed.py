@@ -0,0 +1,342 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Sharded computation of condensed dissimilarity matrices by several (remote) workers.
+
+A coordinator (``distributed_pdist``) splits the condensed matrix into tiles with the same
+amount of pairs and serves them through queues of a ``multiprocessing.managers`` server.
+Workers (``run_worker``), in this or in other machines, connect to it, take tiles, append
+their values to their own shard file and report where they were written. The coordinator
+merges the reported tiles into a single memory mapped matrix (see ``measures.disk_matrix``).
+
+Tiles taken by a worker that dies (or that do not finish before a timeout) are handed out
+again, up to a maximum amount of retries.
+
+Workers in other machines must see the shards directory (e.g. a network file system) and
+are started with ``run_worker((host, port), authkey)``, the address (and key) logged by the coordinator.
+The manager server unpickles what its clients send, so it must only accept trusted workers:
+there is no default key, and a random one is generated (and logged) unless one is given.
+
+Examples:
+    >>> import tempfile
+    >>> from scipy.spatial.distance import pdist
+    >>> X = np.random.RandomState(0).rand(20, 10)
+    >>> path = os.path.join(tempfile.mkdtemp(), 'spearman.dat')
+    >>> d = distributed_pdist(X, measures.SPEARMAN, path, n_local_workers=2, n_tiles=8)
+    >>> np.allclose(d, pdist(X, measures.dis_spearman))
+    True
+
+"""
+
+from multiprocessing.managers import BaseManager, DictProxy
+import binascii
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import socket
+import tempfile
+import time
+
+import numpy as np
+
+import measures
+from measures.disk_matrix import _write_sidecar, open_memmap_matrix
+from measures.feature_store import fingerprint
+from measures.matrix import dissimilarity_matrix
+from measures.parallel import balanced_tiles, condensed_pairs
+
+# ---------------------------------------------------------------
+
+# logger reporting the progress of the computations
+logger = logging.getLogger(__name__)
+
+# size (in bytes) of the random authentication keys of the coordinators
+AUTHKEY_SIZE = 32
+
+# seconds waited on the queues before checking the state again
+POLL_INTERVAL = 0.2
+
+# ---------------------------------------------------------------
+
+# queues and job description held by the manager server process
+__tasks = queue.Queue()
+__results = queue.Queue()
+__job = {}
+
+
+def _get_tasks():
+    return __tasks
+
+
+def _get_results():
+    return __results
+
+
+def _get_job():
+    return __job
+
+
+class TileManager(BaseManager):
+    """Manager serving the queues of tiles and results and the job description."""
+    pass
+
+
+TileManager.register('get_tasks', callable=_get_tasks)
+TileManager.register('get_results', callable=_get_results)
+TileManager.register('get_job', callable=_get_job, proxytype=DictProxy)
+
+# ---------------------------------------------------------------
+
+
+def shard_path(shard_dir, worker_id):
+    """Gets the path of the shard file of a worker."""
+    return os.path.join(shard_dir, 'shard-{}.bin'.format(worker_id))
+
+
+def tile_values(X, measure, start, stop):
+    """Computes the entries ``start:stop`` of the condensed dissimilarity matrix of `X`.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        start (int): The first entry.
+        stop (int): The entry after the last one.
+
+    Returns:
+        np.ndarray: The dissimilarities of the entries.
+
+    Examples:
+        >>> from scipy.spatial.distance import pdist
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> np.allclose(tile_values(X, measures.EUCLIDEAN, 2, 7), pdist(X)[2:7])
+        True
+
+    """
+
+    # the pairs of samples of the entries (sorted by row)
+    i, j = condensed_pairs(X.shape[0], start, stop)
+
+    # the entries of each row are contiguous (i.e. a single batch comparison per row)
+    values = np.empty(stop - start)
+    rows = np.unique(i)
+    bounds = np.append(np.searchsorted(i, rows), len(i))
+    for r, lo, hi in zip(rows.tolist(), bounds[:-1].tolist(), bounds[1:].tolist()):
+        D = dissimilarity_matrix(X[r:r + 1], measure, X[j[lo]:j[hi - 1] + 1], cache=False, n_jobs=1)
+        values[lo:hi] = D[0]
+
+    return values
+
+
+def run_worker(address, authkey, worker_id=None):
+    """Computes tiles served by a coordinator until its job is done.
+
+    Args:
+        address (tuple): The ``(host, port)`` address of the coordinator.
+        authkey (bytes): The authentication key of the coordinator (e.g. ``bytes.fromhex(<logged key>)``).
+        worker_id (str): The name of the worker (and of its shard file), by default ``<host>-<pid>``.
+
+    """
+
+    # connecting to the coordinator
+    manager = TileManager(address=tuple(address), authkey=authkey)
+    manager.connect()
+    tasks, results, job = manager.get_tasks(), manager.get_results(), manager.get_job()
+
+    # getting the job description (the data is transferred only once per worker)
+    worker_id = '{}-{}'.format(socket.gethostname(), os.getpid()) if worker_id is None else worker_id
+    X, measure = job.get('data'), job.get('measure')
+
+    with open(shard_path(job.get('shard_dir'), worker_id), 'ab') as shard:
+        while not job.get('done'):
+            # waiting for a tile
+            try:
+                tile_id, start, stop = tasks.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+            # reporting the tile as taken (it is handed out again if this worker is lost)
+            results.put(('taken', tile_id, worker_id, None))
+
+            try:
+                values = tile_values(X, measure, start, stop)
+            except Exception as e:
+                results.put(('failed', tile_id, worker_id, repr(e)))
+                continue
+
+            # appending the values to the shard (persisted before being reported)
+            offset = shard.tell()
+            shard.write(values.tobytes())
+            shard.flush()
+            os.fsync(shard.fileno())
+
+            results.put(('done', tile_id, worker_id, offset))
+
+        logger.debug('Worker %s finished.', worker_id)
+
+
+def distributed_pdist(X, measure, filename, address=('127.0.0.1', 0), authkey=None, n_local_workers=0,
+                      n_tiles=None, shard_dir=None, tile_timeout=600.0, max_retries=3):
+    """Computes the condensed dissimilarity matrix of `X` with workers coordinated through a socket.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        filename (str): The path of the raw (memory mapped) matrix file (see ``measures.disk_matrix``).
+        address (tuple): The ``(host, port)`` address the coordinator listens on (port 0 for any free port).
+        authkey (bytes): The authentication key the workers must use (by default a random one, logged in hex).
+        n_local_workers (int): Amount of worker processes started in this machine.
+        n_tiles (int): Amount of tiles the matrix is split into (by default 16 per local worker, at least 16).
+        shard_dir (str): The directory of the shard files (a temporary directory, removed at the end, by default).
+        tile_timeout (float): Seconds after which a taken but unfinished tile is handed out again.
+        max_retries (int): Maximum amount of times a tile is handed out again.
+
+    Returns:
+        np.memmap: The (read only) memory mapped condensed matrix (as returned by ``pdist``).
+
+    """
+
+    # the specified metric must be one of the implemented measures
+    if measure not in measures.measure_to_function:
+        raise ValueError('Unknown dissimilarity measure.')
+
+    # getting data as a float64 matrix
+    X = np.ascontiguousarray(X, np.float64)
+    if X.ndim != 2:
+        raise ValueError('Data must be a 2D matrix.')
+
+    # tiles with the same amount of pairs
+    n = X.shape[0]
+    n_pairs = n * (n - 1) // 2
+    tiles = balanced_tiles(n_pairs, n_tiles or max(16, 16 * n_local_workers))
+
+    # directory of the shard files
+    own_shard_dir = shard_dir is None
+    shard_dir = tempfile.mkdtemp(prefix='shards-', dir=os.path.dirname(os.path.abspath(filename))) \
+        if own_shard_dir else shard_dir
+    os.makedirs(shard_dir, exist_ok=True)
+
+    # a random authentication key by default (logged, so it can be given to the remote workers)
+    random_authkey = authkey is None
+    authkey = os.urandom(AUTHKEY_SIZE) if random_authkey else authkey
+
+    # starting the coordinator
+    manager = TileManager(address=tuple(address), authkey=authkey)
+    manager.start()
+    logger.info('Coordinator listening on %s.', manager.address)
+    if random_authkey:
+        logger.info('Coordinator authentication key: %s.', binascii.hexlify(authkey).decode('ascii'))
+
+    workers = {}
+    try:
+        tasks, results, job = manager.get_tasks(), manager.get_results(), manager.get_job()
+
+        # publishing the job and handing out the tiles
+        job.update({'data': X, 'measure': measure, 'shard_dir': shard_dir, 'done': False})
+        for tile_id, (start, stop) in enumerate(tiles):
+            tasks.put((tile_id, start, stop))
+
+        # starting the local workers
+        for k in range(n_local_workers):
+            worker_id = 'local-{}-{}'.format(os.getpid(), k)
+            workers[worker_id] = multiprocessing.Process(target=run_worker, args=(manager.address, authkey, worker_id))
+            workers[worker_id].start()
+
+        # the merged matrix
+        D = np.memmap(filename, dtype=np.float64, mode='w+', shape=(n_pairs,))
+
+        # state of the tiles (worker and time of the tiles being computed, retries of each tile)
+        taken = {}
+        retries = [0] * len(tiles)
+        pending = set(range(len(tiles)))
+
+        def retry(tile_id, reason):
+            # handing out a lost tile again
+            taken.pop(tile_id, None)
+            retries[tile_id] += 1
+            if retries[tile_id] > max_retries:
+                raise RuntimeError('Tile {} failed {} times ({}).'.format(tile_id, retries[tile_id], reason))
+
+            logger.warning('Retrying tile %d (%s).', tile_id, reason)
+            tasks.put((tile_id,) + tiles[tile_id])
+
+        start_time = time.time()
+        merged = 0
+        while pending:
+            # processing the reports of the workers
+            try:
+                kind, tile_id, worker_id, info = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                kind = None
+
+            if kind == 'taken' and tile_id in pending:
+                taken[tile_id] = (worker_id, time.time())
+
+            elif kind == 'failed' and tile_id in pending:
+                retry(tile_id, info)
+
+            elif kind == 'done' and tile_id in pending:
+                # merging the tile (only its first completion, repeated ones are ignored)
+                start, stop = tiles[tile_id]
+                D[start:stop] = np.fromfile(
+                    shard_path(shard_dir, worker_id), np.float64, count=stop - start, offset=info
+                )
+                pending.discard(tile_id)
+                taken.pop(tile_id, None)
+
+                # reporting the progress
+                merged += stop - start
+                logger.info('%s: %d/%d tiles (%.1f pairs/s).', filename, len(tiles) - len(pending), len(tiles),
+                            merged / max(time.time() - start_time, 1e-9))
+
+            # handing out again the tiles of dead local workers and the timed out ones
+            now = time.time()
+            for lost_id, (worker_id, since) in list(taken.items()):
+                if worker_id in workers and not workers[worker_id].is_alive():
+                    retry(lost_id, 'worker {} died'.format(worker_id))
+                elif now - since > tile_timeout:
+                    retry(lost_id, 'timeout')
+
+            # no local worker is left to compute the remaining tiles
+            if kind is None and workers and not any(w.is_alive() for w in workers.values()):
+                raise RuntimeError('All the local workers died.')
+
+        # persisting the merged matrix
+        D.flush()
+        del D
+    finally:
+        # releasing the workers and the coordinator
+        try:
+            manager.get_job()['done'] = True
+        except Exception:
+            pass
+
+        for w in workers.values():
+            w.join(timeout=10 * POLL_INTERVAL)
+            if w.is_alive():
+                w.terminate()
+
+        manager.shutdown()
+
+        # removing the temporary shards
+        if own_shard_dir:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+    # describing the matrix (as ``measures.disk_matrix.build_memmap_matrix`` does)
+    _write_sidecar(filename, {
+        'shape': [n_pairs],
+        'dtype': np.dtype(np.float64).str,
+        'measure': measure,
+        'condensed': True,
+        'rows': n,
+        'data': fingerprint(X),
+        'proto': None,
+        'rows_done': n,
+    })
+
+    return open_memmap_matrix(filename)
@@ -0,0 +1,106 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Probability distribution representations of the spectra.
+
+The distribution based dissimilarities (Kolmogorov-Smirnov, Chi Squared, Earth Mover's)
+compare the spectra once converted into non-negative signals, unit area densities or
+cumulative distributions. These representations are computed once per data set (see
+``measures.feature_store``) instead of once per compared pair.
+"""
+
+import numpy as np
+
+from measures.feature_store import feature_store, fingerprint
+
+# ---------------------------------------------------------------
+
+# kinds of distribution representations
+SHIFTED = 'shifted'     # spectra shifted to be non-negative
+DENSITY = 'density'     # non-negative spectra normalized to unit area
+CDF = 'cdf'             # cumulative sum of the densities
+
+# ---------------------------------------------------------------
+
+
+def shift_nonnegative(data, dtype=np.float32):
+    """Shifts each spectrum with negative values by the absolute value of its minimum.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        dtype (np.dtype): The floating point type of the result.
+
+    Returns:
+        np.ndarray: The non-negative spectra.
+
+    Examples:
+        >>> shift_nonnegative([[1.0, -2.0, 3.0], [1.0, 2.0, 3.0]]).tolist()
+        [[3.0, 0.0, 5.0], [1.0, 2.0, 3.0]]
+
+    """
+
+    # converting the data to the requested precision (always copying it)
+    X = np.array(data, dtype, ndmin=2)
+
+    # shifting only the spectra with negative values
+    mins = X.min(axis=1)
+    X -= np.where(mins < 0, mins, 0)[:, np.newaxis]
+
+    return X
+
+
+def compute_distribution(data, kind=DENSITY):
+    """Computes a distribution representation of the data (without storing it).
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        kind (str): The representation to compute (``SHIFTED``, ``DENSITY`` or ``CDF``).
+
+    Returns:
+        np.ndarray: The single precision representation of the data.
+
+    """
+
+    # non-negative spectra
+    X = shift_nonnegative(data)
+    if kind == SHIFTED:
+        return X
+
+    # normalizing to unit area (the total area taken from the cumulative sum, as in 'dkolmogorov')
+    X /= np.cumsum(X, axis=1)[:, -1:]
+    if kind == DENSITY:
+        return X
+
+    # cumulative distributions
+    return np.cumsum(X, axis=1, out=X)
+
+
+def distribution_features(data, kind=DENSITY):
+    """Gets a distribution representation of a data set (computed once per data set).
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        kind (str): The representation to get (``SHIFTED``, ``DENSITY`` or ``CDF``).
+
+    Returns:
+        np.ndarray: The (read only) single precision representation of the data.
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 1.0], [-1.0, 0.0, 2.0]])
+        >>> distribution_features(X, DENSITY).tolist()
+        [[0.25, 0.5, 0.25], [0.0, 0.25, 0.75]]
+        >>> distribution_features(X, CDF).tolist()
+        [[0.25, 0.75, 1.0], [0.0, 0.25, 1.0]]
+
+    """
+
+    # validating the kind of representation
+    if kind not in (SHIFTED, DENSITY, CDF):
+        raise ValueError('Unknown distribution representation.')
+
+    # getting the features from the store (computing them only the first time)
+    return feature_store.get((fingerprint(data), 'distribution', kind), lambda: compute_distribution(data, kind))
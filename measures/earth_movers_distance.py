@@ -0,0 +1,78 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+import numpy as np
+
+from measures.distributions import compute_distribution, distribution_features, CDF
+from measures.utils import blocked_cdist
+
+
+def emd(x, y):
+    """Computes the (one dimensional) Earth Mover's distance.
+
+    Args:
+        x (list): The first vector.
+        y (list): The second vector.
+
+    Returns:
+        float: The earth mover's distance between vectors x and y.
+
+    References:
+        . Y. Rubner, C. Tomasi, L. J. Guibas, The earth mover's distance as a metric for image
+        retrieval, International Journal of Computer Vision 40 (2) (2000) 99–121.
+
+    Note:
+        . Vectors are shifted to be non-negative and normalized to unit area (as in 'dkolmogorov').
+        . In one dimension (unit spaced bins), it is the L1 distance among the cumulative distributions.
+
+    Examples:
+        >>> emd([1.0, 0.0, 0.0], [0.0, 0.0, 1.0])
+        2.0
+        >>> emd([1.0, 2.0, 3.0], [2.0, 4.0, 6.0])
+        0.0
+
+    """
+
+    # getting the length of the vectors
+    x_length = len(x)
+    y_length = len(y)
+
+    # validating parameters
+    if x_length != y_length:
+        raise Exception('Vectors with different sizes')
+
+    # getting the cumulative distributions of both vectors
+    x_cdf, y_cdf = compute_distribution([x, y], CDF)
+
+    # returning the l1 distance among the cumulative distributions
+    return float(np.sum(np.abs(x_cdf - y_cdf)))
+
+
+def emd_matrix(data, proto=None, block_size=None):
+    """Computes the Earth Mover's distances between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of earth mover's distances.
+
+    Examples:
+        >>> X = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, 1.0, 1.0]])
+        >>> emd_matrix(X).tolist()
+        [[0.0, 2.0, 1.5], [2.0, 0.0, 0.5], [1.5, 0.5, 0.0]]
+
+    """
+
+    # getting the cumulative distributions (only once when comparing data against itself)
+    data_cdf = distribution_features(data, CDF)
+    proto_cdf = data_cdf if proto is None else distribution_features(proto, CDF)
+
+    # computing the l1 distance among cumulative distributions
+    return blocked_cdist(data_cdf, proto_cdf, 'cityblock', block_size)
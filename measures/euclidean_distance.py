@@ -9,6 +9,8 @@
 
 import numpy as np
 
+from measures.utils import block_size_for, row_blocks
+
 
 def euclidean(x, y):
     """Euclidean distance among two vectors.
@@ -28,3 +30,62 @@ def euclidean(x, y):
 
     # computing euclidean distance
     return np.linalg.norm(x_arr - y_arr)
+
+
+def euclidean_matrix(data, proto=None, dtype=np.float64, block_size=None, data_sq=None, proto_sq=None):
+    """Computes the euclidean distances between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        dtype (np.dtype): The floating point type used in the computation (float32 or float64).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+        data_sq (np.ndarray): The precomputed squared norms of the rows of `data` (computed if not provided).
+        proto_sq (np.ndarray): The precomputed squared norms of the rows of `proto` (computed if not provided).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of euclidean distances.
+
+    Notes:
+        * Uses the Gram matrix expansion ``|x - y|^2 = |x|^2 + |y|^2 - 2 x.y``, so distances between almost
+          identical vectors are subject to cancellation errors (negative squared distances are clipped to zero).
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0], [6.0, 5.0, 4.0], [1.0, 0.0, 0.0]])
+        >>> D = euclidean_matrix(X, X[:2])
+        >>> np.allclose(D[2, 1], euclidean(X[2], X[1]))
+        True
+
+    """
+
+    # comparing data against itself if no prototypes were given
+    square = proto is None or proto is data
+
+    # converting data and prototypes to the requested precision
+    data = np.asarray(data, dtype)
+    proto = data if square else np.asarray(proto, dtype)
+
+    # computing the squared norms of the rows (only once when comparing data against itself)
+    data_sq = np.einsum('ij,ij->i', data, data) if data_sq is None else data_sq
+    proto_sq = data_sq if square else np.einsum('ij,ij->i', proto, proto) if proto_sq is None else proto_sq
+
+    # resulting distances
+    D = np.empty((data.shape[0], proto.shape[0]), dtype)
+
+    # amount of samples per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(proto.shape[0] * D.itemsize) if block_size is None else block_size
+
+    # computing the squared distances block by block
+    for start, stop in row_blocks(data.shape[0], block_size):
+        # -2 x.y
+        Db = D[start:stop]
+        np.dot(data[start:stop], proto.T, out=Db)
+        Db *= -2.0
+
+        # |x|^2 + |y|^2 - 2 x.y
+        Db += data_sq[start:stop, np.newaxis]
+        Db += proto_sq[np.newaxis, :]
+
+    # clipping negative round-off errors and taking the square root
+    np.maximum(D, 0.0, out=D)
+    return np.sqrt(D, out=D)
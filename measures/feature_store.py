@@ -0,0 +1,156 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""In-memory store of per-dataset derived features.
+
+Several measures compare a transformed version of the spectra (e.g. the Gaussian derivative
+filtered signals of the shape measures). The store keeps those representations keyed by a
+fingerprint of the data and the transformation parameters, so they are computed only once
+per data set. Least recently used entries are evicted when the memory budget is exceeded.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------------------------------------------------------
+
+# default memory budget (in bytes) of the features store
+FEATURE_STORE_MEMORY_BUDGET = 512 * 1024 ** 2
+
+# ---------------------------------------------------------------
+
+
+def fingerprint(X):
+    """Computes a content based fingerprint of a data array.
+
+    Args:
+        X (np.ndarray): The data array.
+
+    Returns:
+        str: The hexadecimal digest identifying the shape, type and values of `X`.
+
+    Examples:
+        >>> X = np.arange(6.0).reshape((2, 3))
+        >>> fingerprint(X) == fingerprint(X.copy())
+        True
+        >>> fingerprint(X) == fingerprint(X.T)
+        False
+
+    """
+
+    # getting a c-contiguous version of the data (no copy if already contiguous)
+    X = np.ascontiguousarray(X)
+
+    # hashing shape, type and values
+    h = hashlib.sha1()
+    h.update(str((X.shape, X.dtype.str)).encode('utf-8'))
+    h.update(X.data)
+
+    # returning the digest
+    return h.hexdigest()
+
+
+class FeatureStore(object):
+    """LRU store of derived features bounded by a memory budget.
+
+    Args:
+        memory_budget (int): The maximum amount of bytes held by the store.
+
+    Examples:
+        >>> store = FeatureStore(memory_budget=100)
+        >>> a = store.get(('a',), lambda: np.zeros(10))     # 80 bytes
+        >>> b = store.get(('b',), lambda: np.zeros(5))      # 40 bytes ('a' is evicted)
+        >>> ('a',) in store, ('b',) in store, store.nbytes
+        (False, True, 40)
+
+    """
+
+    def __init__(self, memory_budget=FEATURE_STORE_MEMORY_BUDGET):
+        # the maximum amount of bytes held by the store
+        self.memory_budget = memory_budget
+
+        # entries from least to most recently used
+        self._entries = OrderedDict()
+        self._nbytes = 0
+
+        # guarding the entries when used from several threads
+        self._lock = threading.Lock()
+
+        # usage statistics
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        """int: The amount of bytes currently held by the store."""
+        return self._nbytes
+
+    def get(self, key, compute):
+        """Gets the features for a key, computing and storing them if needed.
+
+        Args:
+            key (tuple): The (hashable) key of the features.
+            compute (callable): Function with no arguments computing the features.
+
+        Returns:
+            np.ndarray: The (read only) features.
+
+        """
+
+        with self._lock:
+            # features were already computed
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            self.misses += 1
+
+        # computing the features (outside the lock)
+        value = compute()
+
+        # features are shared, so they must not be modified
+        value.flags.writeable = False
+
+        # features larger than the whole budget are not stored
+        if value.nbytes > self.memory_budget:
+            return value
+
+        with self._lock:
+            # storing the features (if not stored by another thread meanwhile)
+            if key not in self._entries:
+                self._entries[key] = value
+                self._nbytes += value.nbytes
+
+            # evicting the least recently used entries
+            while self._nbytes > self.memory_budget:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+        # returning the computed features
+        return value
+
+    def clear(self):
+        """Removes all the entries from the store."""
+
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+# ---------------------------------------------------------------
+
+# store shared by all the measures
+feature_store = FeatureStore()
@@ -7,6 +7,9 @@
 
 import numpy as np
 
+from measures.distributions import distribution_features, DENSITY
+from measures.utils import blocked_cdist
+
 
 def dkolmogorov(x, y):
     """Computes Kolmogorov-Smirnov dissimilarity.
@@ -47,3 +50,33 @@ def dkolmogorov(x, y):
     y_norm = y_arr / y_cum[-1]
 
     return max(abs(x_norm - y_norm))
+
+
+def dkolmogorov_matrix(data, proto=None, block_size=None):
+    """Computes the Kolmogorov-Smirnov dissimilarities between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of kolmogorov-smirnov dissimilarities.
+
+    Notes:
+        * As ``dkolmogorov``, it is the maximum absolute difference among the unit area densities,
+          i.e. the chebyshev distance among the (cached) densities of the spectra.
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0], [6.0, 5.0, -4.0], [1.0, 0.0, 0.0]])
+        >>> np.allclose(dkolmogorov_matrix(X)[1, 2], dkolmogorov(X[1], X[2]))
+        True
+
+    """
+
+    # getting the unit area densities (only once when comparing data against itself)
+    data_dens = distribution_features(data, DENSITY)
+    proto_dens = data_dens if proto is None else distribution_features(proto, DENSITY)
+
+    # computing the chebyshev distance among densities
+    return blocked_cdist(data_dens, proto_dens, 'chebyshev', block_size)
@@ -7,6 +7,8 @@
 
 import numpy as np
 
+from measures.utils import blocked_cdist
+
 
 def manhattan(x, y):
     """Manhattan distance among two vectors.
@@ -25,4 +27,29 @@ def manhattan(x, y):
     y_arr = np.array(y)
 
     # computing manhattan distance
-    return np.linalg.norm(x_arr - y_arr)
+    return np.sum(np.abs(x_arr - y_arr))
+
+
+def manhattan_matrix(data, proto=None, block_size=None):
+    """Computes the manhattan distances between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of manhattan distances.
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0], [6.0, 5.0, 4.0], [1.0, 0.0, 0.0]])
+        >>> manhattan_matrix(X, X[:2]).tolist()
+        [[0.0, 9.0], [9.0, 0.0], [5.0, 14.0]]
+
+    """
+
+    # comparing data against itself if no prototypes were given
+    proto = data if proto is None else proto
+
+    # computing l1 distances with the native scipy implementation
+    return blocked_cdist(data, proto, 'cityblock', block_size)
@@ -0,0 +1,342 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Utilities to compute whole dissimilarity matrices.
+
+Measures with a batch implementation registered in ``measures.measure_to_matrix_function``
+are computed with a single call to it (all the built-in measures have one). Measures registered
+without one fall back to scipy's ``pdist``/``cdist`` with the corresponding scalar callable,
+evaluated in a pool of processes when more than one job is requested (see ``measures.parallel``).
+Pair by pair comparisons of arbitrary callables (e.g. in ``measures.validation.utils``) use the
+same pool.
+
+Large matrices can be produced block by block of rows (see ``iter_dissimilarity_blocks``),
+e.g. to fill a preallocated (possibly memory mapped) output.
+
+Square matrices of symmetric measures (see ``measures.measure_to_capabilities``) are computed
+by blocks of rows against the rest of the samples only, mirroring the lower triangle.
+"""
+
+import numpy as np
+from scipy.spatial.distance import pdist, squareform
+
+import measures
+from measures.matrix_cache import get_matrix_cache
+from measures.parallel import parallel_cdist, parallel_pdist
+from measures.utils import block_size_for, condensed_offset, row_blocks
+
+# ---------------------------------------------------------------
+
+# minimum amount of row blocks of the square matrices of symmetric measures (the more blocks, the closer to half the work)
+SYMMETRIC_BLOCKS = 8
+
+# ---------------------------------------------------------------
+
+
+def _validate_inputs(X, measure, Y):
+    """Validates the measure and gets data and prototypes as 2D ndarrays."""
+
+    # the specified metric must be one of the implemented measures
+    if measure not in measures.measure_to_function:
+        raise ValueError('Unknown dissimilarity measure.')
+
+    # getting data and prototypes as ndarrays
+    X = np.asarray(X)
+    Y = X if Y is None else np.asarray(Y)
+
+    # validating data and prototypes altogether
+    if X.ndim != 2 or Y.ndim != 2 or X.shape[1] != Y.shape[1]:
+        raise ValueError('Data and prototypes must be 2D matrices with the same features size.')
+
+    return X, Y
+
+
+def cache_params(measure):
+    """Gets the parameters identifying the matrices of a measure in the persistent cache.
+
+    They are the kernel computing the matrices of the measure and its bound parameters (e.g. the
+    keywords of a ``functools.partial``), so the cached matrices are not reused by another kernel.
+
+    Args:
+        measure (int): The type of dissimilarity (see 'measures' module).
+
+    Returns:
+        dict: The parameters (see ``measures.matrix_cache.MatrixCache.key``).
+
+    Examples:
+        >>> import measures
+        >>> sorted(cache_params(measures.ANDREW_CURVES).items())
+        [('kernel', 'measures.andrew_curves.dis_andrews_curves_matrix'), ('measure', 4)]
+
+    """
+
+    # the batch implementation of the measure (or its scalar one)
+    func = measures.measure_to_matrix_function.get(measure, measures.measure_to_function[measure])
+
+    # the bound parameters and the underlying function of partials
+    params = dict(getattr(func, 'keywords', None) or {})
+    func = getattr(func, 'func', func)
+    params['kernel'] = '{}.{}'.format(getattr(func, '__module__', None), getattr(func, '__name__', repr(func)))
+
+    return params
+
+
+def iter_dissimilarity_blocks(X, measure, Y=None, block_size=None, first_row=0, n_jobs=None):
+    """Computes the dissimilarity matrix between `X` and `Y` block by block of rows.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        Y (np.ndarray): The prototypes array. If not provided, `X` is compared against itself.
+        block_size (int): Amount of rows per block (by default computed from the memory budget).
+        first_row (int): The first row to compute (e.g. to resume an interrupted computation).
+        n_jobs (int): Amount of worker processes of the pair by pair fallback of measures without a batch
+            implementation (see ``measures.parallel``).
+
+    Returns:
+        A generator of ``(start, stop, block)`` tuples, where `block` holds the rows
+        ``start:stop`` of the dissimilarity matrix.
+
+    Examples:
+        >>> import measures
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> blocks = list(iter_dissimilarity_blocks(X, measures.MANHATTAN, block_size=2))
+        >>> [(start, stop, block.shape) for start, stop, block in blocks]
+        [(0, 2, (2, 5)), (2, 4, (2, 5)), (4, 5, (1, 5))]
+        >>> np.allclose(np.vstack([b for _, _, b in blocks]), dissimilarity_matrix(X, measures.MANHATTAN))
+        True
+
+    """
+
+    # comparing data against itself if no prototypes were given
+    square = Y is None
+
+    # validating and getting data and prototypes as ndarrays
+    X, Y = _validate_inputs(X, measure, Y)
+
+    # getting the batch implementation (or the scalar one for the pair by pair fallback)
+    f = measures.measure_to_matrix_function.get(measure)
+
+    # amount of rows per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(Y.shape[0] * 8) if block_size is None else block_size
+
+    for start, stop in row_blocks(X.shape[0] - first_row, block_size):
+        start, stop = start + first_row, stop + first_row
+
+        # computing the block of rows
+        if f is None:
+            block = parallel_cdist(X[start:stop], Y, measure, n_jobs)
+        else:
+            block = f(X[start:stop], Y, block_size=block_size)
+
+        # self-dissimilarities are zero (as in 'squareform')
+        if square:
+            rows = np.arange(stop - start)
+            block[rows, rows + start] = 0.0
+
+        yield start, stop, block
+
+
+def iter_condensed_blocks(X, measure, block_size=None, first_row=0, n_jobs=None):
+    """Computes the condensed (``pdist`` like) dissimilarity matrix of `X` block by block of rows.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        block_size (int): Amount of rows per block (by default computed from the memory budget).
+        first_row (int): The first row to compute (e.g. to resume an interrupted computation).
+        n_jobs (int): Amount of worker processes of the pair by pair fallback of measures without a batch
+            implementation (see ``measures.parallel``).
+
+    Returns:
+        A generator of ``(start, stop, values)`` tuples, where `values` holds the (contiguous) entries
+        of rows ``start:stop`` in the condensed matrix, i.e. the comparisons of each row ``i`` against
+        the samples ``i + 1, ..., n - 1``.
+
+    Examples:
+        >>> import measures
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> d = np.concatenate([v for _, _, v in iter_condensed_blocks(X, measures.EUCLIDEAN, block_size=2)])
+        >>> np.allclose(d, pdist(X))
+        True
+
+    """
+
+    # validating and getting the data as ndarray
+    X, _ = _validate_inputs(X, measure, None)
+    n = X.shape[0]
+
+    # amount of rows per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(n * 8) if block_size is None else block_size
+
+    for start, stop in row_blocks(n - first_row, block_size):
+        start, stop = start + first_row, stop + first_row
+
+        # the last row has no entries in the condensed matrix
+        if start >= n - 1:
+            yield start, stop, np.empty(0)
+            continue
+
+        # comparing the rows of the block against the following samples only
+        block = dissimilarity_matrix(X[start:stop], measure, X[start + 1:], cache=False, n_jobs=n_jobs)
+
+        # keeping the upper triangle entries of each row
+        values = np.empty(condensed_offset(n, stop) - condensed_offset(n, start), block.dtype)
+        for i in range(start, min(stop, n - 1)):
+            offset = condensed_offset(n, i) - condensed_offset(n, start)
+            values[offset:offset + n - i - 1] = block[i - start, i - start:]
+
+        yield start, stop, values
+
+
+def symmetric_dissimilarity_matrix(state, measure, idx=None, out=None, block_size=None):
+    """Computes the square dissimilarity matrix among rows of a prepared state, computing only its upper triangle.
+
+    Each block of rows is compared against itself and the following rows only, and its comparisons
+    against the following rows are mirrored on the lower triangle.
+
+    Args:
+        state: The prepared state of the data (see ``measures.prepared``).
+        measure (int): The type of dissimilarity to use (a symmetric one, see ``measures.measure_to_capabilities``).
+        idx (np.ndarray): The indices of the compared rows (all the rows if not provided).
+        out (np.ndarray): Preallocated (m, m) output (e.g. a memory mapped array).
+        block_size (int): Amount of rows computed at once (by default computed from the memory budget,
+            with at least ``SYMMETRIC_BLOCKS`` blocks).
+
+    Returns:
+        np.ndarray: The (m, m) dissimilarity matrix.
+
+    Examples:
+        >>> import measures
+        >>> X = np.array(range(1, 26), float).reshape((5, 5)) ** 0.5
+        >>> pm = measures.prepared_measure(measures.COSINE)
+        >>> D = symmetric_dissimilarity_matrix(pm.prepare(X), measures.COSINE, block_size=2)
+        >>> np.allclose(D, squareform(pdist(X, 'cosine')))
+        True
+
+    """
+
+    # validating that the measure is symmetric
+    if not measures.has_capabilities(measure, measures.SYMMETRIC):
+        raise ValueError('The measure must be symmetric.')
+
+    pm = measures.prepared_measure(measure)
+    m = (state[0] if isinstance(state, tuple) else state).shape[0] if idx is None else len(idx)
+
+    # allocating the output if not given
+    out = np.empty((m, m)) if out is None else out
+    if out.shape != (m, m):
+        raise ValueError('The output must be a (m, m) matrix.')
+
+    # amount of rows per block (bounded by the memory budget, with enough blocks to skip most of the lower triangle)
+    if block_size is None:
+        block_size = min(block_size_for(m * 8), max(1, -(-m // SYMMETRIC_BLOCKS)))
+
+    for start, stop in row_blocks(m, block_size):
+        # comparing the block of rows against itself and the following rows
+        rows = slice(start, stop) if idx is None else idx[start:stop]
+        cols = slice(start, None) if idx is None else idx[start:]
+        block = pm.compare(state, rows, state, cols)
+
+        # storing it and mirroring its comparisons against the following rows (and within the block)
+        out[start:stop, start:] = block
+        out[stop:, start:stop] = block[:, stop - start:].T
+        lower = np.tril_indices(stop - start, -1)
+        out[start + lower[0], start + lower[1]] = block[lower[1], lower[0]]
+
+    # self-dissimilarities are zero (as in 'squareform')
+    if measures.has_capabilities(measure, measures.ZERO_DIAGONAL):
+        np.fill_diagonal(out, 0.0)
+
+    return out
+
+
+def dissimilarity_matrix(X, measure, Y=None, out=None, block_size=None, cache=True, n_jobs=None):
+    """Computes the dissimilarity matrix between the rows of `X` and the rows of `Y`.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        Y (np.ndarray): The prototypes array. If not provided, `X` is compared against itself.
+        out (np.ndarray): Preallocated output (e.g. a memory mapped array), filled block by block of rows.
+        block_size (int): Amount of rows computed at once (by default computed from the memory budget).
+        cache (bool): Whether to reuse the persistent matrix cache (if active, see ``measures.matrix_cache``).
+        n_jobs (int): Amount of worker processes of the pair by pair fallback (``measures.parallel.DEFAULT_N_JOBS``
+            by default, -1 for all the cores), only used by measures without a batch implementation.
+
+    Returns:
+        np.ndarray: The (n, n) dissimilarity matrix of `X` if `Y` is not provided, otherwise
+        the (n, p) dissimilarity representation of `X` by `Y`.
+
+    Notes:
+        * As with ``squareform(pdist(X, d))``, the diagonal of the square matrix is set to zero.
+        * When `out` or `block_size` are given, the matrix is computed with ``iter_dissimilarity_blocks``.
+        * Square matrices of symmetric measures are computed with ``symmetric_dissimilarity_matrix``.
+        * Matrices taken from the persistent cache are read only memory mapped arrays.
+
+    Examples:
+        >>> import measures
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> D = dissimilarity_matrix(X, measures.EUCLIDEAN)
+        >>> np.allclose(D, squareform(pdist(X, measures.euclidean)))
+        True
+        >>> S = np.sin(np.arange(1, 201).reshape((4, 50)) / 7.0) + 2.0
+        >>> dissimilarity_matrix(S, measures.SHAPE_HY, S[:2]).shape
+        (4, 2)
+
+    """
+
+    # comparing data against itself if no prototypes were given
+    square = Y is None
+
+    # validating and getting data and prototypes as ndarrays
+    X, Y = _validate_inputs(X, measure, Y)
+
+    # reusing the matrix stored in the persistent cache (computing and storing it if needed)
+    matrix_cache = get_matrix_cache()
+    if cache and out is None and matrix_cache is not None:
+        key = matrix_cache.key(X, measure, None if square else Y, cache_params(measure))
+        return matrix_cache.get_or_compute(
+            key, lambda: dissimilarity_matrix(
+                X, measure, None if square else Y, block_size=block_size, cache=False, n_jobs=n_jobs
+            )
+        )
+
+    # symmetric measures only compute the upper triangle of the square matrix (with the prepared measure)
+    if square and measures.has_capabilities(measure, measures.SYMMETRIC):
+        state = measures.prepared_measure(measure).prepare(X)
+        return symmetric_dissimilarity_matrix(state, measure, out=out, block_size=block_size)
+
+    # computing the matrix block by block
+    if out is not None or block_size is not None:
+        # allocating the output if not given
+        out = np.empty((X.shape[0], Y.shape[0])) if out is None else out
+
+        # validating the shape of the output
+        if out.shape != (X.shape[0], Y.shape[0]):
+            raise ValueError('The output must be a (n, p) matrix.')
+
+        # filling the output block by block
+        for start, stop, block in iter_dissimilarity_blocks(X, measure, None if square else Y, block_size,
+                                                            n_jobs=n_jobs):
+            out[start:stop] = block
+
+        return out
+
+    # measures without a batch implementation are computed pair by pair (in parallel if requested)
+    if measure not in measures.measure_to_matrix_function:
+        return squareform(parallel_pdist(X, measure, n_jobs)) if square else parallel_cdist(X, Y, measure, n_jobs)
+
+    # computing the whole matrix with the batch implementation
+    D = measures.measure_to_matrix_function[measure](X, Y)
+
+    # self-dissimilarities are zero (as in 'squareform')
+    if square:
+        np.fill_diagonal(D, 0.0)
+
+    # returning the dissimilarity matrix
+    return D
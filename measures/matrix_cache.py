@@ -0,0 +1,332 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Persistent on-disk cache of dissimilarity matrices.
+
+Matrices are keyed by a content hash of the data (and prototypes), the measure id, the
+measure parameters (e.g. the kernel computing it) and ``MATRIX_CACHE_VERSION``, and stored
+as ``.npy`` files, so they are reused memory mapped. The least recently used matrices are
+evicted when the disk quota is exceeded. Files are written atomically (temporary file +
+rename) and each computation is guarded by a file lock, so several worker processes can
+share the same cache directory.
+
+Once a cache is activated (see ``set_matrix_cache``), ``measures.dissimilarity_matrix`` (and
+thus every function taking a ``measure`` argument) transparently reuses it.
+
+Examples:
+    >>> import tempfile
+    >>> import measures
+    >>> _ = set_matrix_cache(tempfile.mkdtemp())
+    >>> X = np.array(range(1, 26), float).reshape((5, 5))
+    >>> D = measures.dissimilarity_matrix(X, measures.EUCLIDEAN)     # computed and stored
+    >>> D = measures.dissimilarity_matrix(X, measures.EUCLIDEAN)     # memory mapped from disk
+    >>> isinstance(D, np.memmap), get_matrix_cache().hits
+    (True, 1)
+    >>> set_matrix_cache(None)
+
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from measures.feature_store import fingerprint
+
+try:
+    import fcntl
+except ImportError:     # pragma: no cover (no file locks available, e.g. on windows)
+    fcntl = None
+
+# ---------------------------------------------------------------
+
+# default disk quota (in bytes) of the cache
+MATRIX_CACHE_QUOTA = 4 * 1024 ** 3
+
+# extension of the cached matrices
+MATRIX_EXT = '.npy'
+
+# extension of the lock files guarding the computation of each matrix
+LOCK_EXT = '.lock'
+
+# version of the cached matrices (bump it when a kernel changes its results, invalidating the stored ones)
+MATRIX_CACHE_VERSION = 1
+
+# ---------------------------------------------------------------
+
+
+def dataset_cache_dir(data_set):
+    """Gets the cache directory of dissimilarity matrices next to the cache of a data set.
+
+    Args:
+        data_set (str): The name of the data set package (e.g. 'nir_tecator').
+
+    Returns:
+        str: The path of the ``datasets/<data_set>/cache/matrices`` directory.
+
+    """
+
+    return os.path.join(os.path.split(__file__)[0], '..', 'datasets', data_set, 'cache', 'matrices')
+
+
+class _FileLock(object):
+    """Exclusive lock on a file shared among processes (no-op if file locks are not available)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f, fcntl.LOCK_UN)
+        self._f.close()
+
+
+class MatrixCache(object):
+    """On-disk LRU cache of dissimilarity matrices bounded by a disk quota.
+
+    Args:
+        directory (str): The directory holding the cached matrices (created if needed).
+        quota (int): The maximum amount of bytes of the cached matrices.
+
+    """
+
+    def __init__(self, directory, quota=MATRIX_CACHE_QUOTA):
+        # the directory holding the matrices
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        # the maximum amount of bytes of the cached matrices
+        self.quota = quota
+
+        # usage statistics (of this process)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(X, measure, Y=None, params=None):
+        """Computes the key of a dissimilarity matrix.
+
+        Args:
+            X (np.ndarray): The data array.
+            measure (int): The measure id (see 'measures' module).
+            Y (np.ndarray): The prototypes array (None when comparing `X` against itself).
+            params (dict): The parameters of the measure (e.g. the kernel computing it).
+
+        Returns:
+            str: The hexadecimal key.
+
+        """
+
+        h = hashlib.sha1()
+        h.update(fingerprint(X).encode('utf-8'))
+        h.update(('-' if Y is None else fingerprint(Y)).encode('utf-8'))
+        h.update(repr((MATRIX_CACHE_VERSION, measure, sorted((params or {}).items()))).encode('utf-8'))
+
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + MATRIX_EXT)
+
+    def get(self, key):
+        """Gets a cached matrix.
+
+        Args:
+            key (str): The key of the matrix.
+
+        Returns:
+            np.memmap: The (read only) memory mapped matrix, or None if it is not cached.
+
+        """
+
+        path = self._path(key)
+        try:
+            D = np.load(path, mmap_mode='r')
+        except (IOError, OSError, ValueError):
+            return None
+
+        # recording the access (least recently used matrices are evicted first)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return D
+
+    def put(self, key, D):
+        """Stores a matrix in the cache.
+
+        Args:
+            key (str): The key of the matrix.
+            D (np.ndarray): The matrix.
+
+        """
+
+        # matrices larger than the whole quota are not stored
+        D = np.asarray(D)
+        if D.nbytes > self.quota:
+            return
+
+        # writing to a temporary file first (readers never see a partial matrix)
+        path = self._path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            np.save(f, D)
+
+        # publishing the matrix
+        os.replace(tmp_path, path)
+
+        # keeping the cache under its quota
+        self.evict()
+
+    def get_or_compute(self, key, compute):
+        """Gets a cached matrix, computing and storing it if needed.
+
+        Args:
+            key (str): The key of the matrix.
+            compute (callable): Function with no arguments computing the matrix.
+
+        Returns:
+            np.ndarray: The (memory mapped if cached) matrix.
+
+        """
+
+        # the matrix is already cached
+        D = self.get(key)
+        if D is not None:
+            self.hits += 1
+            return D
+
+        # only one process computes a given matrix (the rest wait for it and reuse it)
+        with _FileLock(self._path(key) + LOCK_EXT):
+            D = self.get(key)
+            if D is not None:
+                self.hits += 1
+                return D
+
+            self.misses += 1
+            D = compute()
+            self.put(key, D)
+
+        # reusing the stored version (if it was not too large to be stored)
+        cached = self.get(key)
+        return D if cached is None else cached
+
+    def entries(self):
+        """Lists the cached matrices from least to most recently used.
+
+        Returns:
+            list: The ``(path, size, last_access)`` tuples of the cached matrices.
+
+        """
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(MATRIX_EXT):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, st.st_size, st.st_mtime))
+
+        return sorted(entries, key=lambda e: e[2])
+
+    @property
+    def nbytes(self):
+        """int: The amount of bytes of the cached matrices."""
+        return sum(size for _, size, _ in self.entries())
+
+    @staticmethod
+    def _remove(path):
+        """Removes a file (if it exists), getting whether it was removed."""
+
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _remove_matrix(self, path):
+        """Removes a cached matrix and its lock file, getting whether the matrix was removed."""
+
+        # (a process holding the lock keeps it, and any later one locks a new file)
+        self._remove(path + LOCK_EXT)
+
+        return self._remove(path)
+
+    def evict(self):
+        """Removes the least recently used matrices (and their lock files) until the cache fits in its quota."""
+
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+
+        for path, size, _ in entries:
+            if total <= self.quota:
+                break
+
+            # matrices being used by other processes stay mapped until they are released
+            if self._remove_matrix(path):
+                total -= size
+
+    def clear(self):
+        """Removes all the cached matrices and lock files.
+
+        Examples:
+            >>> import tempfile
+            >>> cache = MatrixCache(tempfile.mkdtemp())
+            >>> D = cache.get_or_compute(cache.key(np.eye(3), 0), lambda: np.eye(3))
+            >>> del D
+            >>> len(os.listdir(cache.directory))
+            2
+            >>> cache.clear()
+            >>> os.listdir(cache.directory)
+            []
+
+        """
+
+        for path, _, _ in self.entries():
+            self._remove_matrix(path)
+
+        # lock files of matrices that were never stored
+        for name in os.listdir(self.directory):
+            if name.endswith(LOCK_EXT):
+                self._remove(os.path.join(self.directory, name))
+
+# ---------------------------------------------------------------
+
+# cache used by 'measures.dissimilarity_matrix' (disabled by default)
+__matrix_cache = None
+
+
+def set_matrix_cache(directory, quota=MATRIX_CACHE_QUOTA):
+    """Activates (or deactivates) the cache used by ``measures.dissimilarity_matrix``.
+
+    Args:
+        directory (str): The cache directory (e.g. ``dataset_cache_dir('nir_tecator')``), or None to deactivate it.
+        quota (int): The maximum amount of bytes of the cached matrices.
+
+    Returns:
+        MatrixCache: The active cache (None if deactivated).
+
+    """
+
+    global __matrix_cache
+    __matrix_cache = None if directory is None else MatrixCache(directory, quota)
+
+    return __matrix_cache
+
+
+def get_matrix_cache():
+    """Gets the cache used by ``measures.dissimilarity_matrix`` (None if not active)."""
+    return __matrix_cache
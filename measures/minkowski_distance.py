@@ -8,6 +8,8 @@
 import numpy as np
 from scipy.spatial.distance import minkowski as scipy_minkowski
 
+from measures.utils import pair_block_sizes, row_blocks
+
 
 def minkowski(x, y, p=5):
     """Computes Minkowski distance.
@@ -38,3 +40,53 @@ def minkowski(x, y, p=5):
 
     # returning minkowski distance from scipy
     return scipy_minkowski(x_arr, y_arr, p)
+
+
+def minkowski_matrix(data, proto=None, p=5, dtype=np.float32, block_size=None):
+    """Computes the minkowski distances between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        p (float): Parameter p of Minkowski.
+        dtype (np.dtype): The floating point type used in the computation (float32 by default, as ``minkowski``).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of minkowski distances.
+
+    Notes:
+        * The differences of each block of samples against each tile of prototypes are accumulated at
+          once, so both are bounded by the memory budget of that (block, tile, features) buffer.
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0], [6.0, 5.0, 4.0], [1.0, 0.0, 0.0]])
+        >>> D = minkowski_matrix(X, X[:2], p=3)
+        >>> np.allclose(D[2, 1], minkowski(X[2], X[1], p=3))
+        True
+
+    """
+
+    # validating the parameter p
+    if p < 1:
+        raise ValueError('Parameter p of Minkowski must be at least 1.')
+
+    # converting data and prototypes to the requested precision
+    data = np.asarray(data, dtype)
+    proto = data if proto is None else np.asarray(proto, dtype)
+
+    # resulting distances
+    D = np.empty((data.shape[0], proto.shape[0]), dtype)
+
+    # amount of samples and prototypes per tile (bounded by the memory budget of the differences buffer)
+    block_size, proto_block = pair_block_sizes(proto.shape[0], proto.shape[1] * D.itemsize, block_size)
+
+    # accumulating |x - y|^p tile by tile
+    for start, stop in row_blocks(data.shape[0], block_size):
+        for p_start, p_stop in row_blocks(proto.shape[0], proto_block):
+            diff = np.abs(data[start:stop, np.newaxis, :] - proto[np.newaxis, p_start:p_stop, :])
+            np.power(diff, p, out=diff)
+            np.sum(diff, axis=2, out=D[start:stop, p_start:p_stop])
+
+    # returning the p-th root of the accumulated values
+    return np.power(D, 1.0 / p, out=D)
@@ -0,0 +1,274 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Parallel pair by pair evaluation of dissimilarities (``pdist``/``cdist`` replacements).
+
+Measures without a batch implementation can only be evaluated pair by pair, which ``pdist``
+does on a single core. Here the (condensed) index space is split into tiles with the same
+amount of pairs, evaluated by a pool of processes. The data and the output live in temporary
+memory mapped files: each task maps them (no pickling of the data per task) and writes its
+results in place.
+
+Measures are given to the workers by their id (see ``measures.measure_to_function``) and
+resolved in the registry of each worker. The built-in measures are registered on import, so
+they work with any start method. Callables registered at runtime (e.g. lambdas) are only seen
+by forked workers (the default on linux up to python 3.13). Under spawn or forkserver (e.g. on
+windows or macOS), the worker imports a fresh registry without them. Other comparison functions
+must be picklable (e.g. module level functions or partials of them), and scipy's metric names
+are evaluated by scipy itself.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from scipy.spatial.distance import cdist, pdist
+
+import measures
+from measures.utils import condensed_offset
+
+# ---------------------------------------------------------------
+
+# default amount of worker processes (used when no 'n_jobs' is given)
+DEFAULT_N_JOBS = 1
+
+# amount of tiles per worker process (more tiles balance better measures with varying costs)
+TILES_PER_JOB = 4
+
+# ---------------------------------------------------------------
+
+
+def set_default_n_jobs(n_jobs):
+    """Sets the default amount of worker processes of the pair by pair evaluations.
+
+    Args:
+        n_jobs (int): The amount of worker processes (-1 or None for all the available cores).
+
+    """
+
+    global DEFAULT_N_JOBS
+    DEFAULT_N_JOBS = n_jobs
+
+
+def effective_n_jobs(n_jobs=None):
+    """Gets the actual amount of worker processes for a 'n_jobs' value.
+
+    Args:
+        n_jobs (int): The requested amount (``DEFAULT_N_JOBS`` if None, all the cores if -1).
+
+    Returns:
+        int: The amount of worker processes (at least 1).
+
+    Examples:
+        >>> effective_n_jobs(3)
+        3
+        >>> effective_n_jobs(-1) == (os.cpu_count() or 1)
+        True
+
+    """
+
+    n_jobs = DEFAULT_N_JOBS if n_jobs is None else n_jobs
+    if n_jobs is None or n_jobs < 0:
+        return os.cpu_count() or 1
+
+    return max(1, n_jobs)
+
+
+def balanced_tiles(n_items, n_tiles):
+    """Splits a range of items into consecutive tiles of (almost) the same size.
+
+    Args:
+        n_items (int): The amount of items (e.g. entries of the condensed matrix).
+        n_tiles (int): The amount of tiles.
+
+    Returns:
+        list: The ``(start, stop)`` boundaries of the (non empty) tiles.
+
+    Examples:
+        >>> balanced_tiles(10, 3)
+        [(0, 3), (3, 6), (6, 10)]
+
+    """
+
+    # boundaries of the tiles (sizes differ at most by one item)
+    bounds = [(n_items * t) // n_tiles for t in range(n_tiles + 1)]
+
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def condensed_pairs(n, start, stop):
+    """Gets the pairs of samples of a range of entries of a condensed matrix.
+
+    Args:
+        n (int): The amount of samples.
+        start (int): The first entry.
+        stop (int): The entry after the last one.
+
+    Returns:
+        tuple: The arrays ``(i, j)`` (i < j) of the pairs of samples of the entries.
+
+    Examples:
+        >>> i, j = condensed_pairs(4, 0, 6)
+        >>> list(zip(i.tolist(), j.tolist()))
+        [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)]
+
+    """
+
+    # the offset of the first entry of each row
+    offsets = condensed_offset(n, np.arange(n))
+
+    # the row and column of each entry
+    k = np.arange(start, stop)
+    i = np.searchsorted(offsets, k, side='right') - 1
+    j = k - offsets[i] + i + 1
+
+    return i, j
+
+# ---------------------------------------------------------------
+
+
+def _comparison(measure):
+    """Gets the comparison function of a measure id (or the given callable)."""
+    return measures.measure_to_function[measure] if not callable(measure) else measure
+
+
+def _share(arr, directory, name):
+    """Copies an array into a new memory mapped file, getting its ``(filename, shape, dtype)`` spec."""
+
+    filename = os.path.join(directory, name)
+    mm = np.memmap(filename, dtype=arr.dtype, mode='w+', shape=arr.shape)
+    mm[...] = arr
+    mm.flush()
+
+    return filename, arr.shape, arr.dtype.str
+
+
+def _attach(spec, mode='r'):
+    """Maps the array of a spec (see ``_share``)."""
+
+    filename, shape, dtype = spec
+    return np.memmap(filename, dtype=dtype, mode=mode, shape=shape)
+
+
+def _pdist_tile(measure, specs, start, stop):
+    """Evaluates the entries ``start:stop`` of the condensed matrix (in place)."""
+
+    d = _comparison(measure)
+    X, out = _attach(specs[0]), _attach(specs[1], 'r+')
+
+    i, j = condensed_pairs(X.shape[0], start, stop)
+    for k, (a, b) in enumerate(zip(i.tolist(), j.tolist())):
+        out[start + k] = d(X[a], X[b])
+
+    out.flush()
+
+
+def _cdist_tile(measure, specs, start, stop):
+    """Evaluates the rows ``start:stop`` of the rectangular matrix (in place)."""
+
+    d = _comparison(measure)
+    XA, XB, out = _attach(specs[0]), _attach(specs[1]), _attach(specs[2], 'r+')
+
+    for a in range(start, stop):
+        for b in range(XB.shape[0]):
+            out[a, b] = d(XA[a], XB[b])
+
+    out.flush()
+
+
+def _run(measure, inputs, out_shape, task, tiles, n_jobs):
+    """Evaluates the tiles in a pool of processes sharing the inputs and the output."""
+
+    # copying inputs and output into memory mapped files (once for all the tasks)
+    directory = tempfile.mkdtemp(prefix='parallel-')
+    try:
+        arrays = inputs + [np.zeros(out_shape)]
+        specs = [_share(arr, directory, 'array{}.dat'.format(a)) for a, arr in enumerate(arrays)]
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            # waiting for all the tiles (re-raising any worker error)
+            for future in [pool.submit(task, measure, specs, start, stop) for start, stop in tiles]:
+                future.result()
+
+        # getting the results written in place by the workers
+        out = np.array(_attach(specs[-1]))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return out
+
+
+def parallel_pdist(X, measure, n_jobs=None):
+    """Computes the condensed dissimilarity matrix of `X` pair by pair in a pool of processes.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        measure (int, callable, str): The measure id (see 'measures' module), a picklable comparison
+            function or a scipy metric name.
+        n_jobs (int): Amount of worker processes (``DEFAULT_N_JOBS`` by default, -1 for all the cores).
+
+    Returns:
+        np.ndarray: The condensed matrix (as returned by ``pdist``).
+
+    Examples:
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> np.allclose(parallel_pdist(X, measures.SPEARMAN, n_jobs=2), pdist(X, measures.dis_spearman))
+        True
+
+    """
+
+    # getting data as a float64 array (as scipy does)
+    X = np.ascontiguousarray(X, np.float64)
+    n = X.shape[0]
+    n_pairs = n * (n - 1) // 2
+
+    # a single process (or a scipy metric, already vectorized) needs no pool
+    n_jobs = effective_n_jobs(n_jobs)
+    if n_jobs == 1 or n_pairs < 2 or isinstance(measure, str):
+        return pdist(X, measure if isinstance(measure, str) else _comparison(measure))
+
+    # tiles with the same amount of pairs
+    tiles = balanced_tiles(n_pairs, n_jobs * TILES_PER_JOB)
+
+    return _run(measure, [X], (n_pairs,), _pdist_tile, tiles, n_jobs)
+
+
+def parallel_cdist(XA, XB, measure, n_jobs=None):
+    """Computes the dissimilarities between the rows of `XA` and `XB` pair by pair in a pool of processes.
+
+    Args:
+        XA (np.ndarray): The first collection (rows are samples).
+        XB (np.ndarray): The second collection (rows are samples).
+        measure (int, callable, str): The measure id (see 'measures' module), a picklable comparison
+            function or a scipy metric name.
+        n_jobs (int): Amount of worker processes (``DEFAULT_N_JOBS`` by default, -1 for all the cores).
+
+    Returns:
+        np.ndarray: The (n, p) matrix (as returned by ``cdist``).
+
+    Examples:
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> np.allclose(parallel_cdist(X, X[:2], measures.SPEARMAN, n_jobs=2), cdist(X, X[:2], measures.dis_spearman))
+        True
+
+    """
+
+    # getting data as float64 arrays (as scipy does)
+    XA = np.ascontiguousarray(XA, np.float64)
+    XB = np.ascontiguousarray(XB, np.float64)
+
+    # a single process (or a scipy metric, already vectorized) needs no pool
+    n_jobs = effective_n_jobs(n_jobs)
+    if n_jobs == 1 or XA.shape[0] < 2 or XB.shape[0] == 0 or isinstance(measure, str):
+        return cdist(XA, XB, measure if isinstance(measure, str) else _comparison(measure))
+
+    # tiles with the same amount of rows (i.e. of pairs)
+    tiles = balanced_tiles(XA.shape[0], n_jobs * TILES_PER_JOB)
+
+    return _run(measure, [XA, XB], (XA.shape[0], XB.shape[0]), _cdist_tile, tiles, n_jobs)
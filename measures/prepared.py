@@ -0,0 +1,274 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Two-phase (prepare/compare) evaluation of the measures.
+
+Most measures transform each sample before comparing it (precision conversion, shifts,
+norms, standardization, ranks, cumulative sums, derivative filters, ...). A prepared
+measure splits that work in two phases:
+
+    * ``prepare(X) -> state``: computes the per-sample quantities of a whole data set once.
+    * ``compare(state_a, idx_a, state_b, idx_b)``: computes the (len(idx_a), len(idx_b))
+      dissimilarities among the selected rows of two prepared states.
+
+So a library is prepared once and new queries (or new prototypes) are compared against it
+without repeating the per-sample work. States are ndarrays or tuples of ndarrays with one
+row per sample; indices are arrays of row indices, boolean masks or slices.
+
+The prepared versions of the measures are registered in ``measures.measure_to_prepared``.
+Measures without one get a generic version (see ``prepared_measure``) comparing the raw rows
+with ``measures.dissimilarity_matrix``.
+
+Examples:
+    >>> import measures
+    >>> X = np.sin(np.arange(1, 201).reshape((4, 50)) / 7.0) + 2.0
+    >>> pm = prepared_measure(measures.SPEARMAN)
+    >>> library = pm.prepare(X)
+    >>> queries = pm.prepare(X[::-1])
+    >>> D = pm.compare(queries, [0, 1], library, slice(None))
+    >>> np.allclose(D, measures.dissimilarity_matrix(X[::-1][:2], measures.SPEARMAN, X))
+    True
+
+"""
+
+import numpy as np
+
+import measures
+from measures.andrew_curves import AndrewsCurves
+from measures.chi_squared import X2_nonnegative_matrix
+from measures.correlation_coefficient import standardize_rows
+from measures.distributions import compute_distribution, CDF, DENSITY, SHIFTED
+from measures.euclidean_distance import euclidean_matrix
+from measures.minkowski_distance import minkowski_matrix
+from measures.shape_dissimilarity import derivative_features
+from measures.spearman_coefficient import rank_rows
+from measures.spectral_angle_mapper import sam_from_dots
+from measures.utils import blocked_cdist
+
+# ---------------------------------------------------------------
+
+
+class PreparedMeasure(object):
+    """The prepare/compare version of a measure.
+
+    Args:
+        prepare (callable): Function computing the state of a data set, ``prepare(X) -> state``.
+        compare (callable): Function comparing rows of two states, ``compare(state_a, idx_a, state_b, idx_b)``.
+
+    """
+
+    def __init__(self, prepare, compare):
+        self.prepare = prepare
+        self.compare = compare
+
+    def matrix(self, state_a, state_b=None):
+        """Compares all the rows of two prepared states.
+
+        Args:
+            state_a: The prepared state of the data.
+            state_b: The prepared state of the prototypes (`state_a` if not provided).
+
+        Returns:
+            np.ndarray: The (n, p) dissimilarity matrix.
+
+        """
+
+        all_rows = slice(None)
+        return self.compare(state_a, all_rows, state_a if state_b is None else state_b, all_rows)
+
+
+def take_rows(state, idx):
+    """Selects rows of a prepared state.
+
+    Args:
+        state (np.ndarray, tuple): The prepared state (an ndarray or a tuple of row aligned ndarrays).
+        idx (np.ndarray, list, slice): The indices (or boolean mask, or slice) of the rows.
+
+    Returns:
+        The state of the selected rows (of the same kind of `state`).
+
+    Examples:
+        >>> take_rows((np.arange(6).reshape((3, 2)), np.arange(3)), [2, 0])[1].tolist()
+        [2, 0]
+
+    """
+
+    # indexing with lists (e.g. of prototypes) as numpy arrays
+    idx = np.asarray(idx) if isinstance(idx, list) else idx
+
+    return tuple(s[idx] for s in state) if isinstance(state, tuple) else state[idx]
+
+
+def state_size(state):
+    """Gets the amount of samples of a prepared state."""
+    return (state[0] if isinstance(state, tuple) else state).shape[0]
+
+# ---------------------------------------------------------------
+
+
+def prepare_squared_norms(X):
+    """Prepares the data and the squared norm of each sample (euclidean distance)."""
+
+    X = np.asarray(X, np.float64)
+    return X, np.einsum('ij,ij->i', X, X)
+
+
+def compare_euclidean(state_a, idx_a, state_b, idx_b):
+    """Compares rows of two states of ``prepare_squared_norms`` with the euclidean distance."""
+
+    A, a_sq = take_rows(state_a, idx_a)
+    B, b_sq = take_rows(state_b, idx_b)
+
+    return euclidean_matrix(A, B, data_sq=a_sq, proto_sq=b_sq)
+
+
+def prepare_unit_rows(X):
+    """Prepares the samples scaled to unit norm (cosine and angle based measures)."""
+
+    X = np.asarray(X, np.float64)
+
+    # zero vectors are undefined (as in the pairwise versions)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return X / np.sqrt(np.einsum('ij,ij->i', X, X))[:, np.newaxis]
+
+
+def prepare_standardized(X):
+    """Prepares the centered samples scaled to unit norm (correlation based measures)."""
+    return standardize_rows(X)
+
+
+def prepare_standardized_ranks(X):
+    """Prepares the standardized ranks of the samples (spearman correlation)."""
+    return standardize_rows(rank_rows(X))
+
+
+def prepare_shape_features(X, variant):
+    """Prepares the derivative filtered samples (shape measures)."""
+    return derivative_features(X, 2.0, variant)
+
+
+def prepare_standardized_shapes(X, variant):
+    """Prepares the standardized derivative filtered samples (correlation shape measures)."""
+    return standardize_rows(derivative_features(X, 2.0, variant))
+
+
+def compare_cosines(state_a, idx_a, state_b, idx_b):
+    """Compares rows of two states of unit rows with the cosine distance."""
+
+    D = np.dot(take_rows(state_a, idx_a), take_rows(state_b, idx_b).T)
+    return np.subtract(1.0, D, out=D)
+
+
+def prepare_angles(X):
+    """Prepares the single precision samples and their squared norms (spectral angle mapper, as ``sam``)."""
+
+    X = np.asarray(X, np.float32)
+    return X, np.einsum('ij,ij->i', X, X)
+
+
+def compare_angles(state_a, idx_a, state_b, idx_b):
+    """Compares rows of two states of samples and squared norms with the angle among them."""
+
+    (Xa, sq_a), (Xb, sq_b) = take_rows(state_a, idx_a), take_rows(state_b, idx_b)
+    return sam_from_dots(np.dot(Xa, Xb.T), sq_a, sq_b)
+
+
+def compare_correlations(state_a, idx_a, state_b, idx_b):
+    """Compares rows of two states of standardized rows with the correlation distance."""
+
+    D = np.dot(take_rows(state_a, idx_a), take_rows(state_b, idx_b).T)
+    np.clip(D, -1.0, 1.0, out=D)
+
+    return np.subtract(1.0, D, out=D)
+
+
+def prepare_float64(X):
+    """Prepares the samples in double precision."""
+    return np.asarray(X, np.float64)
+
+
+def prepare_float32(X):
+    """Prepares the samples in single precision."""
+    return np.asarray(X, np.float32)
+
+
+def compare_minkowski(state_a, idx_a, state_b, idx_b):
+    """Compares rows of two single precision states with the minkowski distance."""
+    return minkowski_matrix(take_rows(state_a, idx_a), take_rows(state_b, idx_b))
+
+
+def prepare_shifted(X):
+    """Prepares the non-negative samples (chi squared distance)."""
+    return compute_distribution(X, SHIFTED)
+
+
+def prepare_densities(X):
+    """Prepares the unit area densities of the samples (kolmogorov-smirnov dissimilarity)."""
+    return compute_distribution(X, DENSITY)
+
+
+def prepare_cdfs(X):
+    """Prepares the cumulative distributions of the samples (earth mover's distance)."""
+    return compute_distribution(X, CDF)
+
+
+def compare_chi_squared(state_a, idx_a, state_b, idx_b):
+    """Compares rows of two states of non-negative samples with the chi squared distance."""
+    return X2_nonnegative_matrix(take_rows(state_a, idx_a), take_rows(state_b, idx_b))
+
+
+def compare_cdist(state_a, idx_a, state_b, idx_b, metric):
+    """Compares rows of two states (feature vectors) with a scipy metric."""
+    return blocked_cdist(take_rows(state_a, idx_a), take_rows(state_b, idx_b), metric)
+
+
+def prepare_andrews_curves(X, measure):
+    """Prepares the state of `measure` for the Andrew's Curves of the samples."""
+
+    curves = AndrewsCurves().transform(np.asarray(X, np.float32))
+    return prepared_measure(measure).prepare(curves)
+
+
+def compare_andrews_curves(state_a, idx_a, state_b, idx_b, measure):
+    """Compares rows of two states of ``prepare_andrews_curves`` with `measure`."""
+    return prepared_measure(measure).compare(state_a, idx_a, state_b, idx_b)
+
+# ---------------------------------------------------------------
+
+
+def prepared_measure(measure):
+    """Gets the prepare/compare version of a measure.
+
+    Args:
+        measure (int): The type of dissimilarity (see 'measures' module).
+
+    Returns:
+        PreparedMeasure: The registered version (see ``measures.measure_to_prepared``) or, if there
+        is none, a generic one comparing the raw rows with ``measures.dissimilarity_matrix``.
+
+    Examples:
+        >>> import measures
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> pm = prepared_measure(measures.DNOM)
+        >>> np.allclose(pm.matrix(pm.prepare(X)), measures.dissimilarity_matrix(X, measures.DNOM))
+        True
+
+    """
+
+    # the specified metric must be one of the implemented measures
+    if measure not in measures.measure_to_function:
+        raise ValueError('Unknown dissimilarity measure.')
+
+    # the registered prepared version
+    if measure in measures.measure_to_prepared:
+        return measures.measure_to_prepared[measure]
+
+    # comparing the raw rows (with the batch implementation of the measure, if any)
+    def compare(state_a, idx_a, state_b, idx_b):
+        return measures.dissimilarity_matrix(take_rows(state_a, idx_a), measure, take_rows(state_b, idx_b), cache=False)
+
+    return PreparedMeasure(np.asarray, compare)
@@ -11,8 +11,29 @@ from math import ceil, floor
 import numpy as np
 from scipy.ndimage.filters import gaussian_filter1d as scipy_gauss1d
 
+from measures.feature_store import feature_store, fingerprint
+from measures.utils import blocked_cdist
+
+# ---------------------------------------------------------------
+
+# filter variants of the derivative features
+DERFILTER = 'derfilter'     # derivative filter with rows normalized by their maximum value (SHAPE_HY)
+GAUSS1D = 'gauss1d'         # scipy's first order gaussian filter in single precision (SHAPE_PY)
+
+# ---------------------------------------------------------------
+
+
+def derivative_kernel(sigma=2.0):
+    """Builds the Gaussian first derivative kernel used by the shape dissimilarity.
+
+    Args:
+        sigma (float): The smoothing parameter.
+
+    Returns:
+        np.ndarray: The kernel values in the range [-3 * sigma, 3 * sigma].
+
+    """
 
-def derfilter(data, sigma=2.0):
     # computing x boundaries
     x_lb = int(floor(-3 * sigma))
     x_ub = int(ceil(3 * sigma)) + 1   # accounting for the upper exclusive boundary in python
@@ -22,8 +43,12 @@ def derfilter(data, sigma=2.0):
     g = np.exp(-0.5 * (x ** 2) / sigma ** 2)    # parenthesis only for clarity
 
     # computing kernel
-    dg = -x * g / sigma ** 2
-    kernel = dg
+    return -x * g / sigma ** 2
+
+
+def derfilter(data, sigma=2.0):
+    # computing kernel
+    kernel = derivative_kernel(sigma)
 
     # computing data and sizes
     sc, fc = data.shape
@@ -36,59 +61,143 @@ def derfilter(data, sigma=2.0):
     # extend the data by mirroring the tails
     data2 = np.hstack([np.fliplr(data[:, 0:kc]), data, np.fliplr(data[:, -kc:])])
 
-    # size of the convolution output
-    outc = fc + 2*kc + kernel_length - 1
+    # first index of the full convolution kept in the output (MATLAB: kc+ceil(length(kernel)/2))
+    start = kc + int(ceil(kernel_length / 2))
 
-    # ind = kc+ceil(length(kernel)/2):outc-kc-floor(length(kernel)/2);
-    ind = slice(kc + int(ceil(kernel_length / 2)), outc - kc - int(floor(kernel_length / 2)) + 1)   # +1 because Python excludes upper bound while MATLAB does not
-
-    # TODO: Optimization here!: 1-list comprehension, 2-out=np.vstack(list_comprehension)
-    for i in range(sc):
-        t = np.convolve(data2[i, :], kernel)
-        out[i, :] = t[ind]
+    # convolving all the rows at once: each kernel tap adds a shifted copy of the extended data
+    for k, w in enumerate(kernel):
+        out += w * data2[:, start - k:start - k + fc]
 
     # data convolved with a gaussian kernel
     return out
 
 
 def dshape(x, y, sigma=2.0):
-    # creating a data array from the two samples
-    data = np.array([x, y])
+    # computing the filtered and normalized representation of the two samples
+    data2 = shape_features(np.array([x, y]), sigma)
+
+    # computing the shape dissimilarity (l1 distance between filtered samples)
+    return np.sum(np.abs(data2[0] - data2[1]))
+
+
+def shape_features(data, sigma=2.0):
+    """Computes the representation of the spectra compared by the shape dissimilarity.
 
-    # computing the dissimilarity representation via shape measure
-    dr_data = dspec_shape(data, data, sigma)
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        sigma (float): The smoothing parameter.
+
+    Returns:
+        np.ndarray: The derivative filtered data, each row normalized by its maximum value.
 
-    # dr_data should have shape (2, 2) and dshape(x, y) = dr_data[0, 1] = dr_data[1, 0]
-    return dr_data[0, 1]
+    """
 
+    # derivative filter for all the samples
+    data2 = derfilter(data, sigma)
+
+    # normalizing each row by its maximum value
+    return data2 / data2.max(axis=1)[:, np.newaxis]
+
+
+def derivative_features(data, sigma=2.0, variant=DERFILTER):
+    """Gets the derivative filtered representation of a data set (computed once per data set).
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        sigma (float): The smoothing parameter.
+        variant (str): The filter variant (``DERFILTER`` or ``GAUSS1D``).
+
+    Returns:
+        np.ndarray: The (read only) filtered representation of the data.
+
+    Notes:
+        * Features are kept in ``measures.feature_store.feature_store``, keyed by the data fingerprint, sigma and variant.
+
+    Examples:
+        >>> X = np.sin(np.arange(1, 201).reshape((4, 50)) / 7.0) + 2.0
+        >>> derivative_features(X) is derivative_features(X.copy())
+        True
+        >>> np.allclose(derivative_features(X, 1.5, GAUSS1D)[0], scipy_gauss1d(X[0].astype(np.float32), 1.5, order=1))
+        True
+
+    """
+
+    # validating the filter variant
+    if variant == DERFILTER:
+        compute = lambda: shape_features(data, sigma)
+    elif variant == GAUSS1D:
+        compute = lambda: scipy_gauss1d(np.asarray(data, np.float32), sigma, order=1, axis=1)
+    else:
+        raise ValueError('Unknown derivative filter variant.')
+
+    # getting the features from the store (computing them only the first time)
+    return feature_store.get((fingerprint(data), float(sigma), variant), compute)
+
+
+def dspec_shape(data, proto, sigma=2.0, block_size=None):
+    """Computes the dissimilarity representation of the data via shape measure.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array (rows are prototypes).
+        sigma (float): The smoothing parameter.
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of shape dissimilarities.
+
+    Examples:
+        >>> X = np.sin(np.arange(1, 201).reshape((4, 50)) / 7.0) + 2.0
+        >>> D = dspec_shape(X, X)
+        >>> np.allclose(D[0, 1], dshape(X[0], X[1]))
+        True
+        >>> np.allclose(D, D.T) and np.allclose(np.diag(D), 0.0)
+        True
+
+    """
 
-def dspec_shape(data, proto, sigma=2.0):
     # validating feature sizes
     if data.shape[1] != proto.shape[1]:
         raise Exception('Both "data" and "prototypes" must have the same feature sizes.')
 
-    # getting samples and prototypes count
-    sc = data.shape[0]
-    pc = proto.shape[0]
+    # filtered and normalized representation of both data and prototypes
+    data2 = derivative_features(data, sigma, DERFILTER)
+    proto2 = derivative_features(proto, sigma, DERFILTER)
 
-    # resulting dissimilarity representation
-    d = np.zeros((sc, pc))
+    # the dissimilarity representation (l1 distances between filtered samples and prototypes)
+    return blocked_cdist(data2, proto2, 'cityblock', block_size)
 
-    # derivative filter for both data and prototypes
-    data2 = derfilter(data, sigma)
-    proto2 = derfilter(proto, sigma)
 
-    # normalizing each row by its maximum value
-    data2 = np.apply_along_axis(lambda row: row / row.max(), 1, data2)
-    proto2 = np.apply_along_axis(lambda row: row / row.max(), 1, proto2)
+def shape_measure_matrix(data, proto, sigma=2.0, block_size=None):
+    """Computes the dissimilarity representation of the data via ``shape_measure``.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array (rows are prototypes).
+        sigma (float): The smoothing parameter.
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of shape dissimilarities.
+
+    Examples:
+        >>> X = np.sin(np.arange(1, 201).reshape((4, 50)) / 7.0) + 2.0
+        >>> D = shape_measure_matrix(X, X[:2])
+        >>> np.allclose(D[3, 1], shape_measure(X[3], X[1]), rtol=1e-5)
+        True
+
+    """
+
+    # validating feature sizes
+    if data.shape[1] != proto.shape[1]:
+        raise Exception('Both "data" and "prototypes" must have the same feature sizes.')
 
-    # TODO: Optimization here!: 1-list comprehension, 2-out=np.vstack(list_comprehension)
-    for i in range(pc):
-        t = np.apply_along_axis(lambda row: sum(abs(row - proto2[i, :])), 1, data2)
-        d[:, i] = t
+    # filtered representation of both data and prototypes
+    data2 = derivative_features(data, sigma, GAUSS1D)
+    proto2 = derivative_features(proto, sigma, GAUSS1D)
 
-    # the dissimilarity representation
-    return d
+    # the dissimilarity representation (l1 distances between filtered samples and prototypes)
+    return blocked_cdist(data2, proto2, 'cityblock', block_size)
 
 
 def shape_measure(x, y, sigma=2.0):
@@ -9,7 +9,18 @@
 Similarity measures utilities for data representation
 """
 
+from functools import partial
+
+import numpy as np
+
 import measures
+from measures.correlation_coefficient import correlation_matrix
+from measures.spearman_coefficient import spearman_matrix
+
+
+def _similarity(d_func, x, y):
+    """Computes the similarity of two samples from their dissimilarity."""
+    return 1 / (1 + d_func(x, y))
 
 
 def to_similarity(d):
@@ -20,7 +31,7 @@ def to_similarity(d):
         d (int, callable): The dissimilarity to build the similarity from.
 
     Returns:
-        The built similarity measure.
+        The built similarity measure (picklable if the dissimilarity is, e.g. for ``measures.parallel``).
 
     """
 
@@ -52,4 +63,56 @@ def to_similarity(d):
         raise ValueError('Unknown dissimilarity measure.')
 
     # returning a similarity function build on top of a dissimilarity function
-    return lambda x, y: 1 / (1 + d_func(x, y))
+    return partial(_similarity, d_func)
+
+
+def to_similarity_matrix(d):
+    """
+    Builds a function computing the similarity matrix of a data set from a dissimilarity.
+
+    Args:
+        d (int): The dissimilarity to build the similarity from (see 'measures' module).
+
+    Returns:
+        The built function. Given a data array `X`, it returns the same matrix as
+        ``squareform(pdist(X, to_similarity(d)))`` (i.e. with zeros in the diagonal).
+
+    Examples:
+        >>> from scipy.spatial.distance import pdist, squareform
+        >>> X = np.array([[1.0, 2.0, 3.0, 20.0, 150.0, 3.0], [6.0, 5.0, 4.0, 3.0, 2.0, 1.0], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+        >>> S = to_similarity_matrix(measures.SPEARMAN)(X)
+        >>> np.allclose(S, squareform(pdist(X, to_similarity(measures.SPEARMAN))))
+        True
+        >>> S = to_similarity_matrix(measures.EUCLIDEAN)(X)
+        >>> np.allclose(S, squareform(pdist(X, to_similarity(measures.EUCLIDEAN))))
+        True
+
+    """
+
+    # validating the dissimilarity type
+    if d not in measures.measure_to_function:
+        raise ValueError('Unknown dissimilarity measure type.')
+
+    # special case for correlation based dissimilarities (probabilistic versions of the coefficients)
+    if d in (measures.CORRELATION, measures.PEARSON):
+        sim_func = lambda X: 0.5 * (correlation_matrix(X) + 1.0)
+
+    elif d == measures.SPEARMAN:
+        sim_func = lambda X: 0.5 * (spearman_matrix(X) + 1.0)
+
+    # similarity built on top of the dissimilarity matrix
+    else:
+        sim_func = lambda X: 1 / (1 + measures.dissimilarity_matrix(X, d))
+
+    # the function computing the similarity matrix
+    def similarity_matrix(X):
+        # computing the similarity of all pairs of samples
+        S = sim_func(np.asarray(X, float))
+
+        # the diagonal is not a comparison (as in 'squareform')
+        np.fill_diagonal(S, 0.0)
+
+        return S
+
+    # returning the similarity matrix function
+    return similarity_matrix
@@ -5,8 +5,12 @@
 # Proprietary and confidential
 # Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, August 2016
 
+import numpy as np
+from scipy.stats import rankdata
 from scipy.stats.stats import spearmanr
 
+from measures.correlation_coefficient import correlation_matrix
+
 
 def probabilistic_spearmanr(x, y):
     """Computes the spearman coefficient as a probability value.
@@ -47,3 +51,74 @@ def dis_spearmanr(x, y):
 
     # setting dissimilarity value to the interval [0, 2]
     return 1 - value
+
+
+def rank_rows(X):
+    """Ranks the values of each row of `X`.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+
+    Returns:
+        np.ndarray: The ranks of each row (ties get their average rank, as in ``spearmanr``).
+
+    Examples:
+        >>> rank_rows(np.array([[10.0, 30.0, 20.0], [1.0, 1.0, 0.0]])).tolist()
+        [[1.0, 3.0, 2.0], [2.5, 2.5, 1.0]]
+
+    """
+
+    # ranking each row only once
+    return np.apply_along_axis(rankdata, 1, np.asarray(X, float))
+
+
+def spearman_matrix(data, proto=None, dtype=np.float64, block_size=None):
+    """Computes the spearman coefficients between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        dtype (np.dtype): The floating point type used in the computation (float32 or float64).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of spearman coefficients.
+
+    Notes:
+        * Each sample is ranked only once, then the pearson coefficients of the ranks are computed with matrix products.
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0, 20.0, 150.0, 3.0], [6.0, 5.0, 4.0, 3.0, 2.0, 1.0], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+        >>> R = spearman_matrix(X)
+        >>> np.allclose([R[0, 1], R[0, 2]], [spearmanr(X[0], X[1])[0], spearmanr(X[0], X[2])[0]])
+        True
+
+    """
+
+    # ranking data and prototypes (only once when comparing data against itself)
+    data_ranks = rank_rows(data)
+    proto_ranks = data_ranks if proto is None or proto is data else rank_rows(proto)
+
+    # spearman coefficient is the pearson coefficient of the ranks
+    return correlation_matrix(data_ranks, proto_ranks, dtype, block_size)
+
+
+def dis_spearman_matrix(data, proto=None, dtype=np.float64, block_size=None):
+    """Computes the spearman dissimilarities between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        dtype (np.dtype): The floating point type used in the computation (float32 or float64).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of spearman dissimilarities (as ``dis_spearmanr`` for each pair).
+
+    """
+
+    # computing the spearman coefficients
+    D = spearman_matrix(data, proto, dtype, block_size)
+
+    # setting dissimilarity values to the interval [0, 2]
+    return np.subtract(1.0, D, out=D)
@@ -8,6 +8,8 @@
 from math import acos
 import numpy as np
 
+from measures.utils import block_size_for, row_blocks
+
 
 def sam(x, y):
     """Computes the Spectral Angle Mapper (SAM) dissimilarity value.
@@ -45,3 +47,74 @@ def sam(x, y):
 
     # returning acos (num / den)
     return acos(coc)
+
+
+def sam_from_dots(dots, data_sq, proto_sq):
+    """Computes spectral angles from dot products and squared norms, as ``sam`` does.
+
+    Args:
+        dots (np.ndarray): The (n, p) dot products among the rows of data and prototypes.
+        data_sq (np.ndarray): The squared norms of the rows of data.
+        proto_sq (np.ndarray): The squared norms of the rows of prototypes.
+
+    Returns:
+        np.ndarray: The (n, p) matrix of spectral angles (in double precision).
+
+    """
+
+    # computing the cosines as 'sam' (num / sqrt(<x, x> <y, y>), in the precision of the inputs)
+    coc = dots / np.sqrt(data_sq[:, np.newaxis] * proto_sq[np.newaxis, :])
+
+    # clipping values in domain
+    A = np.clip(coc, -1.0, 1.0).astype(np.float64)
+
+    # returning acos (num / den)
+    return np.arccos(A, out=A)
+
+
+def sam_matrix(data, proto=None, data_norms=None, proto_norms=None, dtype=np.float32, block_size=None):
+    """Computes the Spectral Angle Mapper (SAM) dissimilarities between the rows of `data` and `proto`.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        proto (np.ndarray): The prototypes array. If not provided, `data` is compared against itself.
+        data_norms (np.ndarray): The precomputed norms of the rows of `data` (computed if not provided).
+        proto_norms (np.ndarray): The precomputed norms of the rows of `proto` (computed if not provided).
+        dtype (np.dtype): The floating point type of the cosines (single precision by default, as ``sam``).
+        block_size (int): Amount of samples compared at once (by default computed from the memory budget).
+
+    Returns:
+        np.ndarray: The (n, p) matrix of spectral angles (as ``sam`` for each pair).
+
+    Examples:
+        >>> X = np.array([[1.0, 2.0, 3.0], [6.0, 5.0, 4.0], [1.0, 0.0, 0.0]])
+        >>> A = sam_matrix(X)
+        >>> np.allclose([A[0, 1], A[1, 2]], [sam(X[0], X[1]), sam(X[1], X[2])])
+        True
+
+    """
+
+    # comparing data against itself if no prototypes were given
+    square = proto is None or proto is data
+
+    # converting data and prototypes to the requested precision
+    data = np.asarray(data, dtype)
+    proto = data if square else np.asarray(proto, dtype)
+
+    # computing the squared norms of the rows (only once when comparing data against itself)
+    data_sq = np.einsum('ij,ij->i', data, data) if data_norms is None else np.square(np.asarray(data_norms, dtype))
+    proto_sq = data_sq if square else \
+        np.einsum('ij,ij->i', proto, proto) if proto_norms is None else np.square(np.asarray(proto_norms, dtype))
+
+    # resulting angles
+    A = np.empty((data.shape[0], proto.shape[0]))
+
+    # amount of samples per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(proto.shape[0] * A.itemsize) if block_size is None else block_size
+
+    # computing the dot products block by block with matrix products
+    for start, stop in row_blocks(data.shape[0], block_size):
+        A[start:stop] = sam_from_dots(np.dot(data[start:stop], proto.T), data_sq[start:stop], proto_sq)
+
+    # returning the angles
+    return A
@@ -0,0 +1,153 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Common utilities for the batch (matrix) computation of dissimilarities."""
+
+import numpy as np
+from scipy.spatial.distance import cdist
+
+# ---------------------------------------------------------------
+
+# default memory budget (in bytes) for the temporary buffers of the blocked kernels
+BLOCK_MEMORY_BUDGET = 64 * 1024 ** 2
+
+# ---------------------------------------------------------------
+
+
+def block_size_for(row_nbytes, budget=None):
+    """Computes how many rows fit in a given memory budget.
+
+    Args:
+        row_nbytes (int): The amount of bytes needed by each row of the block.
+        budget (int): The memory budget in bytes (defaults to ``BLOCK_MEMORY_BUDGET``).
+
+    Returns:
+        int: The amount of rows of the block (at least 1).
+
+    Examples:
+        >>> block_size_for(8 * 700, budget=8 * 700 * 10)
+        10
+        >>> block_size_for(8 * 700, budget=1)
+        1
+
+    """
+
+    # using the default budget if none was given
+    budget = BLOCK_MEMORY_BUDGET if budget is None else budget
+
+    # at least one row per block
+    return max(1, int(budget // max(1, row_nbytes)))
+
+
+def pair_block_sizes(n_proto, pair_nbytes, block_size=None, budget=None):
+    """Computes the tiles of a (samples, prototypes, features) buffer bounded by a memory budget.
+
+    The prototypes are tiled too, so the buffer of even a single sample is bounded by the budget
+    (and not by the amount of prototypes).
+
+    Args:
+        n_proto (int): The amount of prototypes.
+        pair_nbytes (int): The amount of bytes of the buffer for each pair of sample and prototype.
+        block_size (int): The amount of samples per block (computed from the memory budget if not given).
+        budget (int): The memory budget in bytes (defaults to ``BLOCK_MEMORY_BUDGET``).
+
+    Returns:
+        tuple: The amounts of samples and of prototypes per tile.
+
+    Examples:
+        >>> pair_block_sizes(10, 8, budget=8 * 40)
+        (4, 10)
+        >>> pair_block_sizes(10 ** 5, 4000, budget=64 * 1024 ** 2)
+        (1, 16777)
+
+    """
+
+    # amount of prototypes per tile (the buffer of the samples of a block against them fits the budget)
+    proto_block = min(max(1, n_proto), block_size_for(pair_nbytes * (1 if block_size is None else block_size), budget))
+
+    # amount of samples per block (bounded by the budget of the buffer against a tile of prototypes)
+    block_size = block_size_for(proto_block * pair_nbytes, budget) if block_size is None else block_size
+
+    return block_size, proto_block
+
+
+def row_blocks(n, block_size):
+    """Iterates over the (start, stop) boundaries of consecutive row blocks.
+
+    Args:
+        n (int): The amount of rows.
+        block_size (int): The amount of rows of each block.
+
+    Returns:
+        A generator of ``(start, stop)`` tuples.
+
+    Examples:
+        >>> list(row_blocks(5, 2))
+        [(0, 2), (2, 4), (4, 5)]
+
+    """
+
+    # validating the block size
+    if block_size <= 0:
+        raise ValueError('The block size must be positive.')
+
+    # yielding the boundaries of each block
+    for start in range(0, n, block_size):
+        yield start, min(start + block_size, n)
+
+
+def condensed_offset(n, i):
+    """Computes the offset of row `i` in a condensed (``pdist`` like) matrix of `n` samples.
+
+    Args:
+        n (int): The amount of samples.
+        i (int): The row (its entries are the comparisons against the samples ``i + 1, ..., n - 1``).
+
+    Returns:
+        int: The position of the comparison ``(i, i + 1)`` in the condensed matrix.
+
+    Examples:
+        >>> [condensed_offset(4, i) for i in range(4)]
+        [0, 3, 5, 6]
+
+    """
+
+    return n * i - i * (i + 1) // 2
+
+
+def blocked_cdist(XA, XB, metric, block_size=None, **kwargs):
+    """Computes scipy's ``cdist`` between two collections, block by block of rows of `XA`.
+
+    Args:
+        XA (np.ndarray): The first collection (rows are samples).
+        XB (np.ndarray): The second collection (rows are samples).
+        metric (str): The name of the scipy metric.
+        block_size (int): Amount of rows of `XA` compared at once (by default computed from the memory budget).
+        **kwargs: Additional arguments of the metric.
+
+    Returns:
+        np.ndarray: The (n, p) matrix of distances.
+
+    Examples:
+        >>> XA = np.arange(12.0).reshape((4, 3))
+        >>> np.allclose(blocked_cdist(XA, XA[:2], 'cityblock', block_size=3), cdist(XA, XA[:2], 'cityblock'))
+        True
+
+    """
+
+    # resulting distances
+    D = np.empty((XA.shape[0], XB.shape[0]))
+
+    # amount of rows per block (bounded by the memory budget of the output block)
+    block_size = block_size_for(XB.shape[0] * D.itemsize) if block_size is None else block_size
+
+    # computing the distances block by block
+    for start, stop in row_blocks(XA.shape[0], block_size):
+        D[start:stop, :] = cdist(XA[start:stop], XB, metric, **kwargs)
+
+    # returning the distances
+    return D
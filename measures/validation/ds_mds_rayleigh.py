@@ -7,7 +7,6 @@
 
 import numpy as np
 from sklearn import manifold
-from scipy.spatial.distance import pdist, squareform
 
 import measures
 
@@ -20,7 +19,8 @@ def dr_mds_rayleigh(X, labels, measure, k=5):
     Args:
         X (ndarray): The data to be analyzed.
         labels (ndarray, list): The labels of X data.
-        measure: The measure (metric or not) used as a metric for the dissimilarity representation.
+        measure: The measure (metric or not) used as a metric for the dissimilarity representation, or
+            'precomputed' if X is already a dissimilarity matrix.
         k: Amount of times that MDS + Rayleigh will be performed (MDS implementation is non-deterministic)
 
     Returns:
@@ -33,7 +33,7 @@ def dr_mds_rayleigh(X, labels, measure, k=5):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not isinstance(X, (np.ndarray, measures.DistanceMatrix)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
@@ -43,15 +43,21 @@ def dr_mds_rayleigh(X, labels, measure, k=5):
     if X.shape[0] != y.shape[0]:
         raise ValueError('Amount of samples must be the same as the amount of labels.')
 
-    # the specified metric must be one of the implemented measures
-    if measure not in measures.measure_to_function:
-        raise ValueError('Unknown dissimilarity measure.')
-
-    # getting the metric function
-    d = measures.measure_to_function[measure]
-
-    # build distance/dissimilarity matrix
-    dm = squareform(pdist(X, d))
+    # taking X data as proximity values
+    if measure == 'precomputed':
+        # checking for square matrix
+        if X.shape[0] != X.shape[1]:
+            raise ValueError('Proximity matrix must be a squared matrix.')
+
+        # using X as proximity matrix (e.g. a memory mapped one, without copying it)
+        dm = X
+    else:
+        # the specified metric must be one of the implemented measures
+        if measure not in measures.measure_to_function:
+            raise ValueError('Unknown dissimilarity measure.')
+
+        # build distance/dissimilarity matrix
+        dm = measures.dissimilarity_matrix(X, measure)
 
     # size of the embedded euclidean feature space
     n_comps = dm.shape[0]
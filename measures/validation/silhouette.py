@@ -7,9 +7,10 @@
 
 import numpy as np
 from sklearn import metrics
-from scipy.spatial.distance import pdist, squareform
 
 from measures import measure_to_function as d_to_f
+from measures import dissimilarity_matrix
+from measures import DistanceMatrix
 
 # ---------------------------------------------------------------
 
@@ -25,7 +26,8 @@ def silhouette_score_from_data(X, labels, measure):
     Args:
         X (ndarray): The data to be analyzed.
         labels (ndarray, list): The labels of X data.
-        measure: The measure (metric or not) used as a metric for silhouette.
+        measure: The measure (metric or not) used as a metric for silhouette, or 'precomputed' if X is
+            already a dissimilarity matrix.
 
     Returns:
         The silhouette score for the given data and provided labels.
@@ -33,7 +35,7 @@ def silhouette_score_from_data(X, labels, measure):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not isinstance(X, (np.ndarray, DistanceMatrix)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Verify data and labels.')
 
     # getting the values of labels as ndarray
@@ -43,15 +45,21 @@ def silhouette_score_from_data(X, labels, measure):
     if X.shape[0] != y.shape[0]:
         raise ValueError('Amount of samples must be the same as the amount of labels.')
 
-    # the specified metric must be one of the implemented measures
-    if measure not in d_to_f:
-        raise ValueError('Unknown dissimilarity measure.')
+    # taking X data as proximity values
+    if measure == 'precomputed':
+        # checking for square matrix
+        if X.shape[0] != X.shape[1]:
+            raise ValueError('Proximity matrix must be a squared matrix.')
 
-    # getting the metric function
-    d = d_to_f[measure]
+        # using X as proximity matrix (e.g. a memory mapped one, without copying it)
+        dm = X
+    else:
+        # the specified metric must be one of the implemented measures
+        if measure not in d_to_f:
+            raise ValueError('Unknown dissimilarity measure.')
 
-    # build distance/dissimilarity matrix
-    dm = squareform(pdist(X, d))
+        # build distance/dissimilarity matrix
+        dm = dissimilarity_matrix(X, measure)
 
     # compute silhouette from distance matrix
     return silhouette_score_from_dist_mat(dm, y)
@@ -75,7 +83,7 @@ def silhouette_score_from_dist_mat(X, labels):
     """
 
     # validating 'data' and 'labels'
-    if not isinstance(X, np.ndarray) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
+    if not isinstance(X, (np.ndarray, DistanceMatrix)) or not (isinstance(labels, np.ndarray) or isinstance(labels, list)):
         raise ValueError('Distributions must be lists')
 
     # getting the values of labels as ndarray
@@ -8,9 +8,8 @@
 from collections import defaultdict
 
 import numpy as np
-from scipy.spatial.distance import cdist, pdist
-
 import measures
+from measures.parallel import parallel_cdist, parallel_pdist
 
 # ---------------------------------------------------------------
 
@@ -94,20 +93,66 @@ def intra_inter_class_dissimilarities(X, labels, measure):
     if measure not in measures.measure_to_function:
         raise ValueError('Unknown dissimilarity measure.')
 
-    # getting the comparison function
-    cmp_func = measures.measure_to_function[measure]
+    # build distance/dissimilarity matrix (reusing the persistent cache if active)
+    D = measures.dissimilarity_matrix(X, measure)
 
     # returning the `intra` and `inter` class comparisons
-    return intra_inter_class_comparisons(X, y, cmp_func)
+    return intra_inter_class_from_matrix(D, y)
+
+
+def intra_inter_class_from_matrix(D, labels):
+    """Gets the `intra` and `inter` class comparisons from a (square) dissimilarity matrix.
+
+    Args:
+        D (np.ndarray): The dissimilarity matrix.
+        labels (list, np.ndarray): The data labels.
+
+    Returns:
+        The lists of `intra` and `inter` class comparisons respectively (in the same order as
+        ``intra_inter_class_comparisons``).
+
+    Examples:
+        >>> D = np.array([[0.0, 1.0, 2.0], [1.0, 0.0, 3.0], [2.0, 3.0, 0.0]])
+        >>> intra_inter_class_from_matrix(D, [0, 1, 0])
+        ([2.0], [1.0, 3.0])
+
+    """
+
+    # getting the values of labels as ndarray
+    y = np.asarray(labels)
+
+    # declaring the lists of intra and inter class comparisons
+    intra_dists = []
+    inter_dists = []
+
+    # finding the unique labels and sorting them
+    y_unique = np.sort(np.unique(y))
+
+    # indices of the samples of each class
+    c_idxs = [np.where(y == label)[0] for label in y_unique]
+
+    # for each label k
+    for k, ck in enumerate(c_idxs):
+        # appending all intra-class comparisons of cluster k (upper triangle, as 'pdist')
+        iu = np.triu_indices(len(ck), k=1)
+        intra_dists += D[np.ix_(ck, ck)][iu].tolist()
+
+        # appending inter-class comparisons between cluster k and the following ones (as 'cdist')
+        for cl in c_idxs[k + 1:]:
+            inter_dists += np.ravel(D[np.ix_(ck, cl)]).tolist()
+
+    # returning the intra and inter class comparisons
+    return intra_dists, inter_dists
 
 
-def intra_inter_class_comparisons(X, labels, cmp_func):
+def intra_inter_class_comparisons(X, labels, cmp_func, n_jobs=None):
     """Computes the `intra` and `inter` class comparisons (distances, dissimilarities, similarities).
 
     Args:
         X (np.ndarray): The data array.
         labels (list, np.ndarray): The data labels.
         cmp_func (string, func): The comparison function for the objects.
+        n_jobs (int): Amount of worker processes comparing the objects (see ``measures.parallel``).
 
     Returns:
         The lists of `intra` and `inter` class distances respectively.
@@ -166,7 +211,7 @@ def intra_inter_class_comparisons(X, labels, cmp_func):
             ck = c_list[k]
 
         # appending all intra-class comparisons of cluster k
-        intra_dists += pdist(ck, cmp_func).tolist()
+        intra_dists += parallel_pdist(ck, cmp_func, n_jobs).tolist()
 
         # for clusters other than k
         for l in labels_range[k + 1:]:
@@ -177,7 +222,7 @@ def intra_inter_class_comparisons(X, labels, cmp_func):
                 cl = c_list[l]
 
             # appending inter-class comparisons between cluster k and l (https://docs.scipy.org/doc/scipy/reference/generated/scipy.spatial.distance.cdist.html)
-            inter_dists += np.ravel(cdist(ck, cl, cmp_func)).tolist()
+            inter_dists += np.ravel(parallel_cdist(ck, cl, cmp_func, n_jobs)).tolist()
 
     # returning the intra and inter class distances
     return intra_dists, inter_dists
@@ -6,9 +6,10 @@
 # Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, May 2017
 
 import numpy as np
-from scipy.spatial.distance import pdist, squareform
+from scipy.spatial.distance import squareform
 
-from measures.similarity import to_similarity as to_sim
+from measures.parallel import parallel_pdist
+from measures.similarity import to_similarity_matrix as to_sim_mat
 
 from prototypes.entropy.sort_by_entropy import sort_by_entropy
 
@@ -48,12 +49,13 @@ selection_strategies_names = {
 # ---------------------------------------------------------------
 
 
-def order_templates(gk, s):
+def order_templates(gk, s, n_jobs=None):
     """Orders templates in a gallery using entropy value as a criterion
 
     Args:
         gk (ndarray): The similarity matrix of the gallery.
         s (callable): Similarity function to compare samples in gallery
+        n_jobs (int): Amount of worker processes comparing the samples (see ``measures.parallel``).
 
     Returns:
         (idx, entropy) Sample index and entropy value from more important to less important
@@ -68,7 +70,7 @@ def order_templates(gk, s):
         >>> s = to_sim(measures.MANHATTAN)
         >>> gk = np.arange(1, 10).reshape((3, 3))
         >>> order_templates(gk, s)
-        [(0, 0.96840510364912347), (1, 0.0)]
+        [(0, 0.96529194357216091), (1, 0.0)]
 
     """
 
@@ -77,7 +79,22 @@ def order_templates(gk, s):
         raise ValueError('Verify comparisons and labels.')
 
     # computing a similarity matrix
-    dm = squareform(pdist(gk, metric=s))
+    dm = squareform(parallel_pdist(gk, s, n_jobs))
+
+    # ordering templates from the similarity matrix
+    return order_templates_from_sim_mat(dm)
+
+
+def order_templates_from_sim_mat(dm):
+    """Orders templates in a gallery using entropy value as a criterion
+
+    Args:
+        dm (ndarray): The similarity matrix of the gallery samples (with zeros in the diagonal).
+
+    Returns:
+        (idx, entropy) Sample index and entropy value from more important to less important
+
+    """
 
     # sorting gallery samples by entropy value
     pivots, entropy_values = sort_by_entropy(dm, 0)
@@ -91,13 +108,13 @@ def ent_sel_from_df(df, labels_col, measure, percent):
     # selected templates given an entropy criterion
     idxs_sel = list()
 
-    # getting a similarity function from the given dissimilarity
-    sim = to_sim(measure)
+    # getting a similarity matrix function from the given dissimilarity
+    sim_mat = to_sim_mat(measure)
 
     # performing entropy-based template selection for each group
     for gid, g in df.groupby(labels_col):
         # ordering templates
-        g_ordered = [(0, 0.0)] if len(g) < 2 else order_templates(g.values[:, :-1], s=sim)
+        g_ordered = [(0, 0.0)] if len(g) < 2 else order_templates_from_sim_mat(sim_mat(g.values[:, :-1]))
 
         # getting selected templates
         selection = best_percent(g_ordered, percent)
@@ -126,9 +143,9 @@ def cluster_template_selection(cluster_id, cluster_dict, sim_type, sel_type):
     cluster_dataset = cluster_dict[cluster_id]
 
     # applying template selection by means of entropy
-    sim = to_sim(sim_type)
+    sim_mat = to_sim_mat(sim_type)
     data = [t[1] for t in cluster_dataset]
-    ordered = order_templates(data, s=sim)
+    ordered = order_templates_from_sim_mat(sim_mat(data))
 
     # # showing parable
     # f_values = [v for _, v in ordered]
@@ -8,6 +8,8 @@
 import random as rnd
 import numpy as np
 
+import measures
+
 
 def fft_selection_from_lists(data, k, d):
     # validating data
@@ -30,6 +32,10 @@ def fft_selection_from_arrays(data, k, d):
     if data is None or not isinstance(data, np.ndarray):
         raise ValueError('Data must be valid')
 
+    # measure ids are compared with their prepared version (see 'measures.prepared')
+    if not callable(d):
+        return fft_selection_prepared(data, k, d)
+
     # getting amount of samples
     data_count = data.shape[0]
 
@@ -69,3 +75,60 @@ def fft_selection_from_arrays(data, k, d):
         protos_idxs.append(j_best)
 
     return protos_idxs
+
+
+def fft_selection_prepared(data, k, measure):
+    """Selects prototypes with the Farthest First Traversal, comparing samples with a prepared measure.
+
+    Args:
+        data (np.ndarray): The data array (rows are samples).
+        k (int): Amount of prototypes to select.
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+
+    Returns:
+        list: The indexes of the selected prototypes (in selection order).
+
+    Notes:
+        * The data is prepared only once, and the minimum dissimilarity of each sample to the
+          selected prototypes is updated with the comparisons against the last selected one.
+
+    Examples:
+        >>> X = np.array([[0.0, 0.0], [1.0, 0.0], [10.0, 0.0], [5.0, 0.0]])
+        >>> rnd.seed(0)
+        >>> protos = fft_selection_prepared(X, 3, measures.EUCLIDEAN)
+        >>> rnd.seed(0)
+        >>> protos == fft_selection_from_arrays(X, 3, measures.euclidean)
+        True
+
+    """
+
+    # the specified metric must be one of the implemented measures
+    if measure not in measures.measure_to_function:
+        raise ValueError('Unknown dissimilarity measure.')
+
+    # preparing the data only once
+    pm = measures.prepared_measure(measure)
+    state = pm.prepare(data)
+    all_rows = slice(None)
+
+    # selecting a random sample as a first prototype
+    p_idx = rnd.randint(0, data.shape[0] - 1)
+    protos_idxs = [p_idx]
+
+    # minimum dissimilarity of each sample to all prototypes
+    min_dis = pm.compare(state, [p_idx], state, all_rows)[0]
+
+    # k-1 times (select a prototype)
+    for i in range(k - 1):
+        # ignoring samples already selected as prototypes
+        candidates = min_dis.copy()
+        candidates[protos_idxs] = -np.inf
+
+        # getting sample with max (min distance) to all prototypes
+        j_best = int(np.argmax(candidates))
+        protos_idxs.append(j_best)
+
+        # updating the minimum dissimilarities with the new prototype
+        np.minimum(min_dis, pm.compare(state, [j_best], state, all_rows)[0], out=min_dis)
+
+    return protos_idxs
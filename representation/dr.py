@@ -7,6 +7,9 @@
 
 import numpy as np
 import measures
+from measures.matrix import symmetric_dissimilarity_matrix
+from measures.prepared import state_size
+from measures.utils import block_size_for, row_blocks
 
 
 def build_dr_from_lists(data, proto, measure):
@@ -54,25 +57,162 @@ def build_dr_from_ndarrays(data, proto, measure):
         if min(proto) < 0 or max(proto) >= data.shape[0]:
             raise ValueError('Invalid prototype indexes')
 
-        # setting proto data
-        proto_data = data[proto]
-        proto = proto_data
+        # preparing the data only once (prototypes are compared through the prepared state of the data)
+        pm = measures.prepared_measure(measure)
+        state = pm.prepare(data)
+
+        # symmetric measures compare each pair of prototypes only once
+        if measures.has_capabilities(measure, measures.SYMMETRIC):
+            return build_dr_by_data_prototypes(state, measure, proto)
+
+        # building the dissimilarity representation of the data by the prototypes
+        return pm.compare(state, slice(None), state, list(proto))
 
     # validating data and prototypes altogether
     if data.shape[1] != proto.shape[1]:
         raise ValueError('Data and prototypes must have the same size')
 
-    # building resulting array representation
-    dr = np.empty((data.shape[0], proto.shape[0]), float)
+    # building the dissimilarity representation of the data by the prototypes
+    return measures.dissimilarity_matrix(data, measure, proto)
+
+
+def build_dr_by_data_prototypes(state, measure, proto):
+    """Builds the dissimilarity representation of data by some of its samples, for a symmetric measure.
+
+    The dissimilarities among the prototypes are computed only once (see
+    ``measures.matrix.symmetric_dissimilarity_matrix``), and only the rest of the samples are
+    compared against the prototypes, so the work is halved when all the samples are prototypes.
+
+    Args:
+        state: The prepared state of the data (see ``measures.prepared``).
+        measure (int): The type of dissimilarity to use (a symmetric one, see ``measures.measure_to_capabilities``).
+        proto (list, np.ndarray): The indices of the prototypes in the data.
+
+    Returns:
+        np.ndarray: The (n, p) dissimilarity representation.
+
+    Examples:
+        >>> X = np.array(range(1, 26), float).reshape((5, 5)) ** 0.5
+        >>> pm = measures.prepared_measure(measures.EMD)
+        >>> D = build_dr_by_data_prototypes(pm.prepare(X), measures.EMD, [3, 1, 3])
+        >>> np.allclose(D, measures.dissimilarity_matrix(X, measures.EMD, X[[3, 1, 3]]))
+        True
+
+    """
+
+    # each prototype is compared only once (even if it is repeated)
+    proto = np.asarray(proto)
+    unique, inverse = np.unique(proto, return_inverse=True)
+
+    # the prototypes among them (only the upper triangle is computed)
+    n = state_size(state)
+    D = np.empty((n, len(unique)))
+    D[unique] = symmetric_dissimilarity_matrix(state, measure, idx=unique)
+
+    # the rest of the samples against the prototypes
+    rest = np.setdiff1d(np.arange(n), unique)
+    if len(rest):
+        D[rest] = measures.prepared_measure(measure).compare(state, rest, state, unique)
+
+    # the columns in the order of the given prototypes
+    return D if np.array_equal(unique, proto) else D[:, inverse]
+
+
+class DissimilarityRepresentation(object):
+    """Dissimilarity representation of data by a fixed set of prototypes.
+
+    ``fit`` prepares the prototypes once (filtered signals, norms, ranks, distributions, ...,
+    see ``measures.prepared``), so ``transform`` only prepares each chunk of data and compares
+    it against the prepared prototypes with the batch version of the measure.
+
+    Args:
+        block_size (int): Amount of data rows transformed at once (by default computed from the memory budget).
+
+    Examples:
+        >>> X = np.sin(np.arange(1, 201).reshape((8, 25)) / 7.0) + 2.0
+        >>> dr = DissimilarityRepresentation(block_size=3).fit(X[:2], measures.SHAPE_HY)
+        >>> out = np.empty((8, 2))
+        >>> D = dr.transform(X, out=out)
+        >>> D is out, np.allclose(D, build_dr_from_ndarrays(X, X[:2], measures.SHAPE_HY))
+        (True, True)
+
+    """
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+
+        # the state of the fitted prototypes
+        self.measure = None
+        self._pm = None
+        self._proto_state = None
+        self.n_prototypes = 0
+        self.n_features = 0
+
+    def fit(self, prototypes, measure):
+        """Prepares the prototypes for a measure.
+
+        Args:
+            prototypes (np.ndarray): The prototypes array (rows are samples).
+            measure (int): The type of dissimilarity to use (see 'measures' module).
+
+        Returns:
+            DissimilarityRepresentation: The fitted representation (self).
+
+        """
+
+        # if unknown measure
+        if measure not in measures.measure_to_function:
+            raise ValueError('Unknown dissimilarity function.')
+
+        # validating the prototypes
+        prototypes = np.asarray(prototypes)
+        if prototypes.ndim != 2 or prototypes.shape[0] == 0:
+            raise ValueError('Prototypes must be a non empty 2D matrix.')
+
+        # preparing the prototypes only once
+        self.measure = measure
+        self._pm = measures.prepared_measure(measure)
+        self._proto_state = self._pm.prepare(prototypes)
+        self.n_prototypes, self.n_features = prototypes.shape
+
+        return self
+
+    def transform(self, X, out=None):
+        """Computes the dissimilarity representation of data by the fitted prototypes.
+
+        Args:
+            X (np.ndarray): The data array (rows are samples), e.g. a memory mapped one.
+            out (np.ndarray): Optional (n, p) output buffer (e.g. a memory mapped one, or a preallocated
+                array reused among batches) where the representation is written.
+
+        Returns:
+            np.ndarray: The (n, p) dissimilarity representation (`out`, if provided).
+
+        """
+
+        # validating that the prototypes were fitted
+        if self._pm is None:
+            raise ValueError('The representation must be fitted before transforming data.')
+
+        # validating the data (memory mapped data is not copied)
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError('Data and prototypes must have the same size')
+
+        # validating (or allocating) the output buffer
+        shape = X.shape[0], self.n_prototypes
+        if out is None:
+            out = np.empty(shape)
+        elif out.shape != shape:
+            raise ValueError('The output buffer must have shape {}.'.format(shape))
 
-    # building dr
-    d = measures.measure_to_function[measure]
-    for i, p in enumerate(proto):
-        # computing dissimilarity of each sample to i-th prototype
-        x = np.apply_along_axis(lambda v: d(v, p), axis=1, arr=data)
+        # amount of rows per chunk (bounded by the memory budget of the output block)
+        block_size = block_size_for(self.n_prototypes * 8) if self.block_size is None else self.block_size
 
-        # setting i-th feature for each sample
-        dr[:, i] = x[:]
+        # streaming the data chunk by chunk (only the chunk is prepared at once)
+        all_rows = slice(None)
+        for start, stop in row_blocks(X.shape[0], block_size):
+            state = self._pm.prepare(X[start:stop])
+            out[start:stop] = self._pm.compare(state, all_rows, self._proto_state, all_rows)
 
-    # returning the dissimilarity representation of the data by the prototypes
-    return dr
+        return out
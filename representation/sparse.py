@@ -0,0 +1,86 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Sparse dissimilarity representation by the k nearest prototypes of each sample.
+
+Only the `k` smallest dissimilarities of each sample are kept: they are selected (with
+``np.argpartition``) from each block of the representation as soon as it is computed (see
+``representation.streaming.iter_dr_chunks``), so the dense (n, p) representation is never
+materialized and the result takes O(n k) memory.
+
+The result is a ``scipy.sparse.csr_matrix`` that scikit-learn estimators (e.g. ``KMeans`` or
+``SVC``) consume directly. Since sparse consumers read the entries of the discarded prototypes as
+zeros, the kept dissimilarities are stored as affinities ``exp(-d / sigma)``: an identical
+prototype has affinity 1 and the discarded (farther) ones have the implicit affinity 0.
+
+Examples:
+    >>> import measures
+    >>> X = np.array([[0.0], [1.0], [3.0], [7.0]])
+    >>> S = knp_representation(X, X, measures.MANHATTAN, 2, sigma=1.0)
+    >>> np.round(S.toarray(), 2).tolist()
+    [[1.0, 0.37, 0.0, 0.0], [0.37, 1.0, 0.0, 0.0], [0.0, 0.14, 1.0, 0.0], [0.0, 0.0, 0.02, 1.0]]
+    >>> S.nnz
+    8
+
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+from representation.streaming import iter_dr_chunks
+
+# ---------------------------------------------------------------
+
+
+def knp_representation(X, prototypes, measure, k, sigma=None, chunk_size=None):
+    """Computes the sparse representation of data by its `k` nearest prototypes.
+
+    Args:
+        X: The data (rows are samples), any array-like supporting row slicing.
+        prototypes (np.ndarray): The prototypes array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        k (int): Amount of dissimilarities kept for each sample (the smallest ones).
+        sigma (float): The scale of the affinities (by default the mean of the kept dissimilarities).
+        chunk_size (int): Amount of data rows per chunk (by default computed from the memory budget).
+
+    Returns:
+        scipy.sparse.csr_matrix: The (n, p) affinities ``exp(-d / sigma)``, with `k` stored entries per row.
+
+    """
+
+    # validating the amount of kept dissimilarities
+    p = len(prototypes)
+    if not 1 <= k <= p:
+        raise ValueError('The amount of nearest prototypes must be between 1 and the amount of prototypes.')
+
+    # validating the scale of the affinities
+    if sigma is not None and not sigma > 0:
+        raise ValueError('The scale of the affinities must be positive.')
+
+    # the kept dissimilarities (and their prototypes) of each row
+    n = X.shape[0]
+    data = np.empty((n, k))
+    indices = np.empty((n, k), np.int32)
+
+    for start, stop, block in iter_dr_chunks(X, prototypes, measure, chunk_size):
+        # selecting the k smallest dissimilarities of each row (sorted by prototype, as in canonical csr matrices)
+        top = np.argpartition(block, k - 1, axis=1)[:, :k] if k < p else np.broadcast_to(np.arange(p), block.shape)
+        top = np.sort(top, axis=1)
+
+        data[start:stop] = block[np.arange(stop - start)[:, np.newaxis], top]
+        indices[start:stop] = top
+
+    # the scale of the affinities (identical data and prototypes keep a unit scale)
+    if sigma is None:
+        sigma = data.mean() if data.size and data.mean() > 0 else 1.0
+
+    # converting the dissimilarities into affinities (so the implicit zeros are the farthest prototypes)
+    np.exp(-data / sigma, out=data)
+
+    # building the csr matrix
+    indptr = np.arange(0, n * k + 1, k)
+    return sp.csr_matrix((data.ravel(), indices.ravel(), indptr), shape=(n, p))
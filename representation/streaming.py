@@ -0,0 +1,202 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Streaming construction of dissimilarity representations larger than memory.
+
+The data is read in chunks of rows from any array-like supporting row slicing (ndarrays,
+memory mapped arrays, HDF5 datasets, ...), so it is never loaded at once. The prototypes are
+prepared once (see ``representation.dr.DissimilarityRepresentation``) and each chunk yields a
+block of the representation, which is consumed by the caller or written to a memory mapped
+(or HDF5) target. The peak memory is bounded by the chunk size (one chunk of data, its prepared
+state and its block of the representation), and the throughput of each chunk is logged.
+
+Examples:
+    >>> import os, tempfile
+    >>> import measures
+    >>> X = np.random.RandomState(0).rand(100, 30)
+    >>> path = os.path.join(tempfile.mkdtemp(), 'dr.dat')
+    >>> D = build_dr_memmap(X, X[:10], measures.CORRELATION, path, chunk_size=16)
+    >>> D.shape, np.allclose(D, measures.dissimilarity_matrix(X, measures.CORRELATION, X[:10]))
+    ((100, 10), True)
+
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from measures.utils import block_size_for, row_blocks
+from representation.dr import DissimilarityRepresentation
+
+try:
+    import h5py
+except ImportError:     # pragma: no cover (no HDF5 targets available)
+    h5py = None
+
+# ---------------------------------------------------------------
+
+# logger reporting the throughput of each chunk
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------
+
+
+def dr_chunk_size(n_features, n_prototypes):
+    """Computes how many data rows are transformed at once within the memory budget.
+
+    Each row needs its data, its prepared state (about the size of the data) and its block of
+    the representation (see ``measures.utils.BLOCK_MEMORY_BUDGET``).
+
+    Args:
+        n_features (int): The amount of features of the data.
+        n_prototypes (int): The amount of prototypes.
+
+    Returns:
+        int: The amount of rows of each chunk.
+
+    """
+
+    return block_size_for((2 * n_features + n_prototypes) * 8)
+
+
+def iter_dr_chunks(X, prototypes, measure, chunk_size=None):
+    """Computes the dissimilarity representation of data by prototypes, chunk by chunk of rows.
+
+    Args:
+        X: The data (rows are samples), any array-like supporting row slicing (e.g. an HDF5 dataset).
+        prototypes (np.ndarray): The prototypes array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        chunk_size (int): Amount of data rows per chunk (by default computed from the memory budget).
+
+    Returns:
+        A generator of ``(start, stop, block)`` tuples, where `block` holds the rows
+        ``start:stop`` of the dissimilarity representation.
+
+    Examples:
+        >>> import measures
+        >>> X = np.array(range(1, 26), float).reshape((5, 5))
+        >>> [(start, stop, block.shape) for start, stop, block in iter_dr_chunks(X, X[:2], measures.EMD, 2)]
+        [(0, 2, (2, 2)), (2, 4, (2, 2)), (4, 5, (1, 2))]
+
+    """
+
+    # preparing the prototypes only once
+    dr = DissimilarityRepresentation().fit(prototypes, measure)
+
+    # validating the data (without reading it)
+    if len(X.shape) != 2 or X.shape[1] != dr.n_features:
+        raise ValueError('Data and prototypes must have the same size')
+
+    # amount of rows per chunk (bounded by the memory budget)
+    n = X.shape[0]
+    chunk_size = dr_chunk_size(dr.n_features, dr.n_prototypes) if chunk_size is None else chunk_size
+
+    start_time = time.time()
+    for start, stop in row_blocks(n, chunk_size):
+        # reading and transforming the chunk
+        chunk_time = time.time()
+        block = dr.transform(np.asarray(X[start:stop]))
+
+        # reporting the throughput of the chunk
+        elapsed = max(time.time() - chunk_time, 1e-9)
+        logger.info('DR rows %d-%d of %d: %.1f rows/s (%.3g dissimilarities/s, %.1fs in total).',
+                    start, stop, n, (stop - start) / elapsed, block.size / elapsed, time.time() - start_time)
+
+        yield start, stop, block
+
+
+def write_dr(X, prototypes, measure, target, chunk_size=None):
+    """Writes the dissimilarity representation of data by prototypes into a target, chunk by chunk.
+
+    Args:
+        X: The data (rows are samples), any array-like supporting row slicing.
+        prototypes (np.ndarray): The prototypes array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        target: The (n, p) target, any array-like supporting assignment of row slices (e.g. a
+            ``np.memmap`` or an HDF5 dataset).
+        chunk_size (int): Amount of data rows per chunk (by default computed from the memory budget).
+
+    Returns:
+        The target.
+
+    """
+
+    # validating the target
+    shape = X.shape[0], len(prototypes)
+    if tuple(target.shape) != shape:
+        raise ValueError('The target must have shape {}.'.format(shape))
+
+    # writing the blocks of the representation as they are computed
+    for start, stop, block in iter_dr_chunks(X, prototypes, measure, chunk_size):
+        target[start:stop] = block
+
+    # persisting memory mapped targets
+    if hasattr(target, 'flush'):
+        target.flush()
+
+    return target
+
+
+def build_dr_memmap(X, prototypes, measure, filename, dtype=np.float64, chunk_size=None):
+    """Builds the dissimilarity representation of data by prototypes into a memory mapped file.
+
+    Args:
+        X: The data (rows are samples), any array-like supporting row slicing.
+        prototypes (np.ndarray): The prototypes array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        filename (str): The path of the raw file of the representation.
+        dtype (np.dtype): The floating point type of the stored representation.
+        chunk_size (int): Amount of data rows per chunk (by default computed from the memory budget).
+
+    Returns:
+        np.memmap: The (read only) memory mapped (n, p) representation.
+
+    """
+
+    # the memory mapped target
+    shape = X.shape[0], len(prototypes)
+    D = np.memmap(filename, dtype=dtype, mode='w+', shape=shape)
+
+    # writing the representation
+    write_dr(X, prototypes, measure, D, chunk_size)
+    del D
+
+    # returning a read only map of the representation
+    return np.memmap(filename, dtype=dtype, mode='r', shape=shape)
+
+
+def build_dr_hdf5(X, prototypes, measure, filename, dataset='dr', dtype=np.float64, chunk_size=None):
+    """Builds the dissimilarity representation of data by prototypes into an HDF5 dataset.
+
+    Args:
+        X: The data (rows are samples), any array-like supporting row slicing (e.g. a dataset of the same file).
+        prototypes (np.ndarray): The prototypes array (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        filename (str): The path of the HDF5 file (created if needed).
+        dataset (str): The name of the dataset of the representation (replaced if it exists).
+        dtype (np.dtype): The floating point type of the stored representation.
+        chunk_size (int): Amount of data rows per chunk (by default computed from the memory budget).
+
+    """
+
+    # validating that HDF5 files are supported
+    if h5py is None:
+        raise ValueError('Building HDF5 representations requires h5py.')
+
+    # amount of rows per chunk (the HDF5 chunks of the dataset are aligned with the computed ones)
+    shape = X.shape[0], len(prototypes)
+    chunk_size = dr_chunk_size(X.shape[1], shape[1]) if chunk_size is None else chunk_size
+
+    with h5py.File(filename, 'a') as f:
+        # replacing a previous representation
+        if dataset in f:
+            del f[dataset]
+
+        # writing the representation
+        target = f.create_dataset(dataset, shape=shape, dtype=dtype, chunks=(max(1, min(chunk_size, shape[0])), shape[1]))
+        write_dr(X, prototypes, measure, target, chunk_size)
@@ -0,0 +1,321 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Exact k nearest neighbour search pruned by a cascade of cheap lower bounds.
+
+Candidates are sorted by a cheap lower bound of the measure and compared with the full
+measure (in small batches) only while their bound does not exceed the dissimilarity of the
+current k-th neighbour; tighter (more expensive) bounds are computed only for the candidates
+surviving the previous ones. Since no candidate is discarded unless its lower bound exceeds the
+k-th dissimilarity, the result is the one of an exhaustive search.
+
+Bounds of the measures that are an l_p distance among (prepared) representations of the spectra
+(euclidean, manhattan, minkowski, the shape measures on derivative filtered spectra, earth
+mover's on cumulative distributions and kolmogorov-smirnov on densities):
+
+    * Norms: ``| |x|_p - |y|_p | <= |x - y|_p`` (reverse triangle inequality).
+    * Piecewise means: ``(sum_s len_s |mean_s(x) - mean_s(y)|^p)^(1/p) <= |x - y|_p`` (Jensen's inequality).
+
+Bounds of ``DNOM`` and ``DORD`` (``0.5 d_pres + 0.25 d_corr + 0.25 d_hist``, all terms non-negative):
+
+    * Presence counts: ``|A xor B| >= |#A - #B|``, with `A` and `B` the non-zero entries.
+    * Presence: ``d_pres = sqrt(|A xor B|)`` computed on bit-packed presence vectors.
+
+Examples:
+    >>> import measures
+    >>> rs = np.random.RandomState(0)
+    >>> X = np.cumsum(rs.randn(300, 64), axis=1)
+    >>> search = CascadeSearch(X, measures.EUCLIDEAN)
+    >>> dist, idx, stats = search.query(X[:5] + 0.1, k=3, return_stats=True)
+    >>> D = measures.dissimilarity_matrix(X[:5] + 0.1, measures.EUCLIDEAN, X)
+    >>> bool(np.all(idx == np.argsort(D, axis=1, kind='mergesort')[:, :3]))
+    True
+    >>> bool(np.all(stats['exact'] < len(X)))
+    True
+
+"""
+
+import numpy as np
+
+import measures
+
+# ---------------------------------------------------------------
+
+# relative tolerance of the pruning (dissimilarities computed in single precision may differ from the bounds)
+BOUND_TOLERANCE = 1e-5
+
+# default amount of segments of the piecewise means bounds
+DEFAULT_SEGMENTS = 16
+
+# default amount of candidates compared at once with the full measure
+DEFAULT_BATCH_SIZE = 16
+
+# ---------------------------------------------------------------
+
+
+class LowerBound(object):
+    """A cheap lower bound of a measure.
+
+    Args:
+        name (str): The name of the bound (used in the search statistics).
+        prepare (callable): Function computing the bound features, ``prepare(X, state)``, from the data
+            and its prepared state (see ``measures.prepared``).
+        bound (callable): Function computing the bounds of a query against some samples,
+            ``bound(features_q, qi, features, idx) -> np.ndarray``.
+
+    """
+
+    def __init__(self, name, prepare, bound):
+        self.name = name
+        self.prepare = prepare
+        self.bound = bound
+
+
+def lp_vectors(state):
+    """Gets the vectors whose l_p distance is the measure from a prepared state."""
+    return np.asarray(state[0] if isinstance(state, tuple) else state, np.float64)
+
+
+def lp_norm(V, p):
+    """Computes the l_p norm of each row of `V`."""
+
+    if np.isinf(p):
+        return np.abs(V).max(axis=1)
+
+    return np.power(np.power(np.abs(V), p).sum(axis=1), 1.0 / p)
+
+
+def lp_norm_bound(p):
+    """Gets the norm difference lower bound of an l_p distance."""
+
+    def prepare(X, state):
+        return lp_norm(lp_vectors(state), p)
+
+    def bound(fq, qi, f, idx):
+        return np.abs(f[idx] - fq[qi])
+
+    return LowerBound('norm', prepare, bound)
+
+
+def lp_piecewise_bound(p, segments=DEFAULT_SEGMENTS):
+    """Gets the piecewise means lower bound of an l_p distance.
+
+    Examples:
+        >>> X = np.random.RandomState(0).rand(4, 10)
+        >>> lb = lp_piecewise_bound(1, segments=3)
+        >>> f = lb.prepare(X, X)
+        >>> bool(np.all(lb.bound(f, 0, f, slice(None)) <= np.abs(X - X[0]).sum(axis=1) + 1e-12))
+        True
+
+    """
+
+    def prepare(X, state):
+        V = lp_vectors(state)
+
+        # (almost) equal segments of features
+        starts = np.linspace(0, V.shape[1], min(segments, V.shape[1]) + 1).astype(int)
+        lengths = np.diff(starts).astype(np.float64)
+
+        # the mean of each segment
+        return np.add.reduceat(V, starts[:-1], axis=1) / lengths, lengths
+
+    def bound(fq, qi, f, idx):
+        (Mq, lengths), (M, _) = fq, f
+        diff = np.abs(M[idx] - Mq[qi])
+
+        if np.isinf(p):
+            return diff.max(axis=1)
+
+        return np.power(np.dot(np.power(diff, p), lengths), 1.0 / p)
+
+    return LowerBound('piecewise', prepare, bound)
+
+
+def _presence_count_bound():
+    """Gets the presence count lower bound of DNOM and DORD."""
+
+    def prepare(X, state):
+        return (np.asarray(X) != 0).sum(axis=1)
+
+    def bound(fq, qi, f, idx):
+        return 0.5 * np.sqrt(np.abs(f[idx] - fq[qi]))
+
+    return LowerBound('presence_count', prepare, bound)
+
+
+def _presence_bound():
+    """Gets the presence lower bound of DNOM and DORD (their exact presence term)."""
+
+    # amount of set bits of each byte
+    popcount = np.array([bin(b).count('1') for b in range(256)], np.uint8)
+
+    def prepare(X, state):
+        return np.packbits(np.asarray(X) != 0, axis=1)
+
+    def bound(fq, qi, f, idx):
+        differences = popcount[np.bitwise_xor(f[idx], fq[qi])].sum(axis=1, dtype=np.int64)
+        return 0.5 * np.sqrt(differences)
+
+    return LowerBound('presence', prepare, bound)
+
+
+def lower_bounds(measure, segments=DEFAULT_SEGMENTS):
+    """Gets the cascade of lower bounds of a measure (from the cheapest to the tightest).
+
+    Args:
+        measure (int): The type of dissimilarity (see 'measures' module).
+        segments (int): Amount of segments of the piecewise means bounds.
+
+    Returns:
+        list: The ``LowerBound`` instances of the measure (empty if it has none).
+
+    """
+
+    # the exponent of the measures that are l_p distances among their prepared vectors
+    lp = {
+        measures.EUCLIDEAN: 2,
+        measures.MANHATTAN: 1,
+        measures.MINKOWSKI: 5,
+        measures.SHAPE_HY: 1,
+        measures.SHAPE_PY: 1,
+        measures.EMD: 1,
+        measures.KOLMOGOROV: np.inf,
+    }
+
+    if measure in lp:
+        return [lp_norm_bound(lp[measure]), lp_piecewise_bound(lp[measure], segments)]
+
+    if measure in (measures.DNOM, measures.DORD):
+        return [_presence_count_bound(), _presence_bound()]
+
+    return []
+
+# ---------------------------------------------------------------
+
+
+class CascadeSearch(object):
+    """Exact k nearest neighbour search of a library pruned by lower bounds of the measure.
+
+    Args:
+        X (np.ndarray): The library (rows are samples).
+        measure (int): The type of dissimilarity to use (see 'measures' module).
+        segments (int): Amount of segments of the piecewise means bounds.
+        batch_size (int): Amount of candidates compared at once with the full measure.
+
+    Notes:
+        * Measures without lower bounds are searched exhaustively (with the prepared measure).
+
+    """
+
+    def __init__(self, X, measure, segments=DEFAULT_SEGMENTS, batch_size=DEFAULT_BATCH_SIZE):
+        # the specified metric must be one of the implemented measures
+        if measure not in measures.measure_to_function:
+            raise ValueError('Unknown dissimilarity measure.')
+
+        self.measure = measure
+        self.batch_size = batch_size
+
+        # preparing the library (for the measure and for its bounds) only once
+        X = np.asarray(X)
+        self._pm = measures.prepared_measure(measure)
+        self._state = self._pm.prepare(X)
+        self.bounds = lower_bounds(measure, segments)
+        self._features = [lb.prepare(X, self._state) for lb in self.bounds]
+        self._n = X.shape[0]
+
+    def __len__(self):
+        return self._n
+
+    def _search(self, q_state, q_features, qi, k, stats):
+        """Searches the `k` nearest neighbours of a query."""
+
+        # all the library samples are candidates (with a trivial lower bound)
+        cand = np.arange(self._n)
+        lb = np.zeros(self._n)
+
+        # the current neighbours (sorted by dissimilarity and index)
+        best_d = np.empty(0)
+        best_i = np.empty(0, np.intp)
+
+        def compare(idx):
+            # comparing candidates with the full measure and keeping the k nearest
+            nonlocal best_d, best_i
+            d = self._pm.compare(q_state, [qi], self._state, idx)[0]
+            stats['exact'][qi] += len(idx)
+            best_d = np.concatenate([best_d, d])
+            best_i = np.concatenate([best_i, idx])
+            keep = np.lexsort((best_i, best_d))[:k]
+            best_d, best_i = best_d[keep], best_i[keep]
+
+        def threshold():
+            # candidates with bounds above the k-th dissimilarity cannot be neighbours
+            if len(best_d) < k:
+                return np.inf
+            return best_d[-1] * (1 + BOUND_TOLERANCE) + 1e-12
+
+        for s, (lb_f, lb_fq) in enumerate(zip(self._features, q_features)):
+            # discarding candidates with the bounds computed so far
+            keep = lb <= threshold()
+            stats[self.bounds[s].name][qi] += len(cand) - np.count_nonzero(keep)
+            cand, lb = cand[keep], lb[keep]
+
+            # tightening the bounds of the rest
+            lb = np.maximum(lb, self.bounds[s].bound(lb_fq, qi, lb_f, cand))
+
+            # sorting the candidates by their bounds
+            order = np.argsort(lb, kind='mergesort')
+            cand, lb = cand[order], lb[order]
+
+            # the nearest candidates by the first bound give an initial k-th dissimilarity
+            if s == 0:
+                compare(cand[:k])
+                cand, lb = cand[k:], lb[k:]
+
+        # comparing the candidates from the lowest bound while they may be neighbours
+        start = 0
+        while start < len(cand) and lb[start] <= threshold():
+            stop = min(start + self.batch_size, len(cand))
+            compare(cand[start:stop])
+            start = stop
+        stats['pruned'][qi] += len(cand) - start
+
+        return best_d, best_i
+
+    def query(self, Q, k=1, return_stats=False):
+        """Finds the `k` nearest neighbours of each query.
+
+        Args:
+            Q (np.ndarray): The queries (rows are samples).
+            k (int): Amount of neighbours.
+            return_stats (bool): Whether to return the search statistics.
+
+        Returns:
+            tuple: The (m, k) dissimilarities and indices of the neighbours (sorted from the nearest,
+            ties by index) and, if requested, a dictionary with the amount of full measure evaluations
+            (``exact``) and of candidates discarded by each bound, for each query.
+
+        """
+
+        # validating the amount of neighbours
+        if not 1 <= k <= self._n:
+            raise ValueError('The amount of neighbours must be between 1 and the amount of samples.')
+
+        # preparing all the queries at once
+        Q = np.asarray(Q)
+        q_state = self._pm.prepare(Q)
+        q_features = [lb.prepare(Q, q_state) for lb in self.bounds]
+
+        # statistics of the search of each query
+        names = ['exact', 'pruned'] + [lb.name for lb in self.bounds]
+        stats = {name: np.zeros(Q.shape[0], np.intp) for name in names}
+
+        dist = np.empty((Q.shape[0], k))
+        idx = np.empty((Q.shape[0], k), np.intp)
+        for qi in range(Q.shape[0]):
+            dist[qi], idx[qi] = self._search(q_state, q_features, qi, k, stats)
+
+        return (dist, idx, stats) if return_stats else (dist, idx)
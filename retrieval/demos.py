@@ -0,0 +1,78 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+import numpy as np
+
+import measures
+from retrieval.library import SpectralLibrary, query_latencies
+from retrieval.lsh import recall_benchmark
+
+from datasets.nir_tecator import load_nir_tecator
+from datasets.ms_glycol import load_ms_glycol
+
+# ---------------------------------------------------------------
+
+
+def print_recall_benchmark(data, data_set_name, k=5, n_bits=10):
+    # for each angle based measure of the benchmark
+    for measure in [measures.COSINE, measures.PCC, measures.CORRELATION]:
+        # evaluating the index against the exact search
+        rows = recall_benchmark(data, measure, n_queries=40, k=k, n_bits=n_bits, random_state=0)
+
+        print('SRP index with {} on {} (recall at {}).'.format(measures.measures_names[measure], data_set_name, k))
+        for row in rows:
+            print('    probes: {probes}, recall: {recall:.3f}, compared: {candidates:.1%}, '
+                  'index: {index_time:.3f}s, exact: {exact_time:.3f}s'.format(**row))
+        print()
+
+
+def lsh_recall_on_nir_tecator():
+    # loading the nir tecator data set
+    ds = load_nir_tecator()
+
+    # removing columns associated with classes and properties
+    data = ds.iloc[:, :-2].values
+
+    # benchmarking the index
+    print_recall_benchmark(data, 'NIR Tecator')
+
+
+def lsh_recall_on_ms_glycol():
+    # loading the ms glycol data set
+    ds = load_ms_glycol()
+
+    # removing the column of the concentrations
+    data = ds['glycol1'].iloc[:, :-1].values
+
+    # benchmarking the index
+    print_recall_benchmark(data, 'MS Glycol')
+
+
+def print_query_latencies(data, data_set_name, k=5):
+    # the library of reference spectra (prepared once per measure)
+    library = SpectralLibrary(data, single_precision=True)
+
+    # for each measure of the benchmark
+    for measure in [measures.EUCLIDEAN, measures.COSINE, measures.CORRELATION, measures.SHAPE_HY]:
+        # querying (slightly perturbed) spectra of the data set one at a time
+        spectra = data * (1 + 0.01 * np.random.RandomState(0).randn(*data.shape))
+        latencies = query_latencies(library, spectra, measure, k=k)
+
+        print('{} on {} (top {}): p50 {:.3f} ms, p99 {:.3f} ms'.format(
+            measures.measures_names[measure], data_set_name, k,
+            1e3 * np.percentile(latencies, 50), 1e3 * np.percentile(latencies, 99)))
+
+
+def query_latencies_on_nir_tecator():
+    # loading the nir tecator data set
+    ds = load_nir_tecator()
+
+    # removing columns associated with classes and properties
+    data = ds.iloc[:, :-2].values
+
+    # measuring the latency of single spectrum queries
+    print_query_latencies(data, 'NIR Tecator')
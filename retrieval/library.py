@@ -0,0 +1,318 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Spectral library answering nearest neighbour queries with low latency.
+
+The reference spectra are validated once, and the prepared state of each measure (see
+``measures.prepared``) is computed the first time the measure is queried and kept, so a
+query only prepares the incoming spectra and compares them against the references.
+
+Exhaustive queries are answered in micro-batches: up to ``batch_size`` incoming spectra are
+compared at once against blocks of references bounded by the memory budget (see
+``measures.utils.BLOCK_MEMORY_BUDGET``), keeping only the running top-k of each spectrum. So
+large batches never materialize the whole dissimilarity representation, and a single spectrum
+is compared against the whole library with a few vectorized calls.
+
+Angle based measures compare the prepared spectra with a single matrix product, whose time is
+bound by reading the prepared references from memory; with ``single_precision=True`` their
+states are kept in single precision, halving the memory traffic of each query.
+
+Queries can also be answered by the indexes of the ``retrieval`` package (built on first use
+and kept): ``'cascade'`` (exact, pruned by lower bounds), ``'vptree'`` (exact, metric measures)
+and ``'lsh'`` (approximate, angle based measures).
+
+Examples:
+    >>> import measures
+    >>> references = np.random.RandomState(0).rand(1000, 50)
+    >>> library = SpectralLibrary(references)
+    >>> dist, idx = library.query(references[[3, 7]] + 0.001, measures.CORRELATION, k=2)
+    >>> idx[:, 0].tolist()
+    [3, 7]
+    >>> bool(np.all(library.query(references[:5], measures.EUCLIDEAN, method='cascade')[1].ravel() == range(5)))
+    True
+
+"""
+
+import time
+
+import numpy as np
+
+import measures
+from measures.prepared import state_size
+from measures.utils import block_size_for, row_blocks
+from retrieval.cascade import CascadeSearch
+from retrieval.lsh import ANGULAR_MEASURES, SRPIndex
+from retrieval.vp_tree import VPTree
+
+# ---------------------------------------------------------------
+
+# default amount of incoming spectra compared at once against the references
+DEFAULT_BATCH_SIZE = 64
+
+# methods answering the queries (besides the exhaustive one) and the index implementing each one
+QUERY_INDEXES = {
+    'cascade': CascadeSearch,
+    'vptree': VPTree,
+    'lsh': SRPIndex,
+}
+
+# ---------------------------------------------------------------
+
+
+def _top_k(D, k):
+    """Gets the (unsorted) columns of the `k` lowest values of each row."""
+
+    if D.shape[1] <= k:
+        return np.broadcast_to(np.arange(D.shape[1]), D.shape)
+
+    return np.argpartition(D, k - 1, axis=1)[:, :k]
+
+
+class SpectralLibrary(object):
+    """A set of reference spectra queried for nearest neighbours under any measure.
+
+    Args:
+        references (np.ndarray): The reference spectra (rows are samples).
+        labels (list, np.ndarray): Optional labels (e.g. compound names) of the references.
+        batch_size (int): Amount of incoming spectra compared at once against the references.
+        single_precision (bool): Whether to keep the states of the angle based measures (see
+            ``retrieval.lsh.ANGULAR_MEASURES``) in single precision.
+
+    """
+
+    def __init__(self, references, labels=None, batch_size=DEFAULT_BATCH_SIZE, single_precision=False):
+        # validating the references (only once)
+        references = np.asarray(references)
+        if references.ndim != 2 or references.shape[0] == 0:
+            raise ValueError('References must be a non empty 2D matrix.')
+
+        # validating the labels
+        if labels is not None and len(labels) != references.shape[0]:
+            raise ValueError('Amount of references must be the same as the amount of labels.')
+
+        # validating the size of the micro-batches
+        if batch_size < 1:
+            raise ValueError('The batch size must be positive.')
+
+        self.references = references
+        self.labels = None if labels is None else np.asarray(labels)
+        self.batch_size = batch_size
+        self.single_precision = single_precision
+
+        # prepared states and indexes of the references (computed on first use)
+        self._states = {}
+        self._indexes = {}
+
+    def __len__(self):
+        return self.references.shape[0]
+
+    def state(self, measure):
+        """Gets the prepared state of the references for a measure (computing it on first use).
+
+        Args:
+            measure (int): The type of dissimilarity (see 'measures' module).
+
+        Returns:
+            The prepared state of the references (see ``measures.prepared``).
+
+        """
+
+        if measure not in self._states:
+            self._states[measure] = self._prepare(self.references, measure)
+
+        return self._states[measure]
+
+    def _prepare(self, spectra, measure):
+        """Prepares spectra for a measure (in single precision, if requested and possible)."""
+
+        state = measures.prepared_measure(measure).prepare(spectra)
+        if self.single_precision and measure in ANGULAR_MEASURES and isinstance(state, np.ndarray):
+            state = state.astype(np.float32)
+
+        return state
+
+    def index(self, method, measure, index_params=None):
+        """Gets the index of the references for a measure (building it on first use).
+
+        An index is built (and kept) for each different set of parameters.
+
+        Args:
+            method (str): The kind of index (one of ``QUERY_INDEXES``).
+            measure (int): The type of dissimilarity (see 'measures' module).
+            index_params (dict): Parameters of the index constructor (e.g. ``{'n_tables': 16}``).
+
+        Returns:
+            The index (e.g. a ``retrieval.vp_tree.VPTree``).
+
+        """
+
+        # validating the kind of index
+        if method not in QUERY_INDEXES:
+            raise ValueError('Unknown query method.')
+
+        index_params = {} if index_params is None else index_params
+        key = method, measure, tuple(sorted(index_params.items()))
+        if key not in self._indexes:
+            self._indexes[key] = QUERY_INDEXES[method](self.references, measure, **index_params)
+
+        return self._indexes[key]
+
+    def _spectra(self, spectra):
+        """Gets the incoming spectra as a 2D array (a single spectrum is a one row batch)."""
+
+        spectra = np.asarray(spectra)
+        if spectra.ndim == 1:
+            spectra = spectra[np.newaxis]
+
+        # validating the spectra against the references
+        if spectra.ndim != 2 or spectra.shape[1] != self.references.shape[1]:
+            raise ValueError('Spectra must have the same amount of features of the references.')
+
+        return spectra
+
+    def dissimilarities(self, spectra, measure):
+        """Computes the dissimilarity representation of spectra by all the references.
+
+        Args:
+            spectra (np.ndarray): The incoming spectra (rows are samples, or a single spectrum).
+            measure (int): The type of dissimilarity (see 'measures' module).
+
+        Returns:
+            np.ndarray: The (m, n) dissimilarities of the spectra to the references.
+
+        """
+
+        pm = measures.prepared_measure(measure)
+        q_state = self._prepare(self._spectra(spectra), measure)
+
+        return pm.compare(q_state, slice(None), self.state(measure), slice(None))
+
+    def _exhaustive(self, spectra, measure, k):
+        """Finds the `k` nearest references of each spectrum, in micro-batches."""
+
+        # preparing the incoming spectra
+        pm = measures.prepared_measure(measure)
+        q_state = self._prepare(spectra, measure)
+        state = self.state(measure)
+
+        m, n = state_size(q_state), len(self)
+        dist = np.empty((m, k))
+        idx = np.empty((m, k), np.intp)
+        for q_start, q_stop in row_blocks(m, self.batch_size):
+            # amount of references compared at once (bounded by the memory budget of the block)
+            ref_block = max(k, block_size_for((q_stop - q_start) * 8))
+
+            # the running top-k of the micro-batch (and its rows, for indexing the columns of each one)
+            rows = np.arange(q_stop - q_start)[:, np.newaxis]
+            best_d = np.empty((q_stop - q_start, 0))
+            best_i = np.empty((q_stop - q_start, 0), np.intp)
+            for r_start, r_stop in row_blocks(n, ref_block):
+                D = pm.compare(q_state, slice(q_start, q_stop), state, slice(r_start, r_stop))
+
+                # the top-k of the block, merged with the current one
+                top = _top_k(D, k)
+                best_d = np.hstack([best_d, D[rows, top]])
+                best_i = np.hstack([best_i, top + r_start])
+                top = _top_k(best_d, k)
+                best_d, best_i = best_d[rows, top], best_i[rows, top]
+
+            # sorting the neighbours from the nearest
+            order = np.argsort(best_d, axis=1, kind='mergesort')
+            dist[q_start:q_stop] = best_d[rows, order]
+            idx[q_start:q_stop] = best_i[rows, order]
+
+        return dist, idx
+
+    def query(self, spectra, measure, k=1, method='exhaustive', index_params=None, query_params=None):
+        """Finds the `k` nearest references of each incoming spectrum.
+
+        Args:
+            spectra (np.ndarray): The incoming spectra (rows are samples, or a single spectrum).
+            measure (int): The type of dissimilarity (see 'measures' module).
+            k (int): Amount of matches of each spectrum.
+            method (str): ``'exhaustive'`` or one of ``QUERY_INDEXES``.
+            index_params (dict): Parameters of the index constructor (see ``index``).
+            query_params (dict): Parameters of the queries of the index (e.g. ``{'n_probes': 2}``).
+
+        Returns:
+            tuple: The (m, k) dissimilarities and indices of the matches (sorted from the nearest).
+            Approximate indexes may find less than `k` matches, padded with an infinite
+            dissimilarity and a ``-1`` index.
+
+        """
+
+        # the specified metric must be one of the implemented measures
+        if measure not in measures.measure_to_function:
+            raise ValueError('Unknown dissimilarity measure.')
+
+        # validating the amount of matches
+        if not 1 <= k <= len(self):
+            raise ValueError('The amount of matches must be between 1 and the amount of references.')
+
+        spectra = self._spectra(spectra)
+        if method == 'exhaustive':
+            return self._exhaustive(spectra, measure, k)
+
+        query_params = {} if query_params is None else query_params
+        return self.index(method, measure, index_params).query(spectra, k=k, **query_params)
+
+    def query_labels(self, spectra, measure, k=1, method='exhaustive', index_params=None, query_params=None):
+        """Finds the labels of the `k` nearest references of each incoming spectrum.
+
+        Returns:
+            tuple: The (m, k) dissimilarities and labels of the matches (sorted from the nearest). The
+            labels are a masked array, whose missing matches (see ``query``) are masked.
+
+        Examples:
+            >>> import measures
+            >>> library = SpectralLibrary(np.eye(3), labels=['a', 'b', 'c'])
+            >>> dist, labels = library.query_labels([[1.0, 0.1, 0.0]], measures.EUCLIDEAN, k=2)
+            >>> labels.tolist()
+            [['a', 'b']]
+
+        """
+
+        # validating that the references are labeled
+        if self.labels is None:
+            raise ValueError('The references of the library are not labeled.')
+
+        dist, idx = self.query(spectra, measure, k, method, index_params, query_params)
+
+        # masking the missing matches (instead of wrapping their -1 index to the last label)
+        return dist, np.ma.masked_array(self.labels[np.maximum(idx, 0)], mask=idx < 0)
+
+
+def query_latencies(library, spectra, measure, k=1, method='exhaustive', index_params=None, query_params=None):
+    """Measures the latency of single spectrum queries.
+
+    The prepared state (or index) of the measure is computed before timing the queries.
+
+    Args:
+        library (SpectralLibrary): The queried library.
+        spectra (np.ndarray): The spectra, queried one at a time.
+        measure (int): The type of dissimilarity (see 'measures' module).
+        k (int): Amount of matches of each spectrum.
+        method (str): ``'exhaustive'`` or one of ``QUERY_INDEXES``.
+        index_params (dict): Parameters of the index constructor (see ``SpectralLibrary.index``).
+        query_params (dict): Parameters of the queries of the index (see ``SpectralLibrary.query``).
+
+    Returns:
+        np.ndarray: The latency of each query (in seconds), e.g. ``np.percentile(latencies, 99)``.
+
+    """
+
+    # preparing the references (or building the index) beforehand
+    spectra = np.asarray(spectra)
+    library.query(spectra[:1], measure, k, method, index_params, query_params)
+
+    latencies = np.empty(spectra.shape[0])
+    for i in range(spectra.shape[0]):
+        start = time.perf_counter()
+        library.query(spectra[i], measure, k, method, index_params, query_params)
+        latencies[i] = time.perf_counter() - start
+
+    return latencies
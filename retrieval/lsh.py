@@ -0,0 +1,275 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Approximate nearest neighbour search for angle based measures (signed random projections).
+
+Cosine, angle and correlation based measures are monotone functions of the angle among the
+prepared spectra (unit norm spectra for ``COSINE``/``SAM``, mean centered and unit norm ones
+for the correlation measures). A random hyperplane separates two spectra with probability
+proportional to their angle, so the signs of ``n_bits`` random projections give a hash in
+which similar spectra tend to collide. Several hash tables reduce the chance of missing a
+neighbour, and probing also the buckets of the most uncertain bits (the projections closer to
+zero) trades speed for recall without more tables.
+
+Spectra of a library usually lie in a small region of the sphere (e.g. NIR spectra have
+cosines close to one), where most hyperplanes through the origin separate nothing. So the
+hyperplanes go through the centroid of the prepared library instead: on the sphere the
+euclidean distance is a monotone function of the angle, and random hyperplanes through the
+centroid separate two spectra with a probability that grows with their distance.
+
+The candidates found in the buckets are re-ranked with the exact (prepared) measure, so the
+returned dissimilarities are exact; only neighbours that never collide with the query are lost.
+
+References:
+    . M. S. Charikar, Similarity estimation techniques from rounding algorithms, Proceedings
+    of the 34th ACM Symposium on Theory of Computing (2002) 380–388.
+    . Q. Lv, W. Josephson, Z. Wang, M. Charikar, K. Li, Multi-probe LSH: efficient indexing for
+    high-dimensional similarity search, Proceedings of the 33rd VLDB (2007) 950–961.
+
+Examples:
+    >>> import measures
+    >>> rs = np.random.RandomState(0)
+    >>> X = np.repeat(rs.rand(10, 50), 20, axis=0) + 0.01 * rs.randn(200, 50)
+    >>> index = SRPIndex(X, measures.CORRELATION, n_tables=4, n_bits=8, random_state=0)
+    >>> dist, idx = index.query(X[:2], k=3)
+    >>> bool(np.all(idx[:, 0] == [0, 1]))
+    True
+
+"""
+
+import time
+
+import numpy as np
+
+import measures
+from measures.prepared import state_size
+
+# ---------------------------------------------------------------
+
+# measures that are monotone functions of the angle among their prepared spectra
+ANGULAR_MEASURES = {
+    measures.COSINE,
+    measures.SAM,
+    measures.CORRELATION,
+    measures.PEARSON,
+    measures.PCC,
+    measures.SPEARMAN,
+    measures.CORR_SHAPE_HY,
+    measures.CORR_SHAPE_PY,
+}
+
+# ---------------------------------------------------------------
+
+
+def hashed_vectors(state):
+    """Gets the unit vectors hashed from a prepared state (``SAM`` states keep the samples and their squared norms)."""
+
+    if not isinstance(state, tuple):
+        return state
+
+    X, sq = state
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return X / np.sqrt(sq)[:, np.newaxis]
+
+
+class SRPIndex(object):
+    """Signed random projections index of a spectral library under an angle based measure.
+
+    Args:
+        X (np.ndarray): The library (rows are samples).
+        measure (int): The type of dissimilarity to use (one of ``ANGULAR_MEASURES``).
+        n_tables (int): Amount of hash tables (more tables, higher recall and more candidates).
+        n_bits (int): Amount of bits of each hash (more bits, fewer candidates and lower recall).
+        random_state (int): Seed of the random hyperplanes.
+
+    """
+
+    def __init__(self, X, measure, n_tables=8, n_bits=12, random_state=None):
+        # the hashes approximate angles among the prepared spectra
+        if measure not in ANGULAR_MEASURES:
+            raise ValueError('The index requires an angle based measure (see retrieval.lsh.ANGULAR_MEASURES).')
+
+        # validating the hashing parameters
+        if n_tables < 1 or not 1 <= n_bits <= 62:
+            raise ValueError('Invalid amount of tables or bits.')
+
+        self.measure = measure
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+
+        # preparing the library only once
+        self._pm = measures.prepared_measure(measure)
+        self._state = self._pm.prepare(np.asarray(X))
+
+        # the random hyperplanes of all the tables (through the centroid of the prepared library)
+        V = hashed_vectors(self._state)
+        rs = np.random.RandomState(random_state)
+        self.planes = rs.randn(V.shape[1], n_tables * n_bits)
+        self.center = np.nan_to_num(np.nanmean(V, axis=0))
+
+        # the hashes of the library (one per table)
+        codes = self._codes(self._project(self._state))
+
+        # the buckets of each table (samples sorted by hash, with the boundaries of each hash)
+        self._order, self._keys, self._bounds = [], [], []
+        for t in range(n_tables):
+            order = np.argsort(codes[:, t], kind='mergesort')
+            keys, starts = np.unique(codes[order, t], return_index=True)
+            self._order.append(order)
+            self._keys.append(keys)
+            self._bounds.append(np.append(starts, len(order)))
+
+    def __len__(self):
+        return state_size(self._state)
+
+    def _project(self, state):
+        """Projects prepared spectra on the hyperplanes (undefined spectra are projected to the centroid)."""
+
+        V = hashed_vectors(state)
+        P = np.dot(np.nan_to_num(V - self.center), self.planes)
+        return P.reshape((V.shape[0], self.n_tables, self.n_bits))
+
+    def _codes(self, projections):
+        """Gets the hash of each table from the signs of the projections."""
+        return np.dot(projections > 0, 1 << np.arange(self.n_bits, dtype=np.int64))
+
+    def _bucket(self, t, code):
+        """Gets the library samples with a given hash in a table."""
+
+        pos = np.searchsorted(self._keys[t], code)
+        if pos == len(self._keys[t]) or self._keys[t][pos] != code:
+            return self._order[t][:0]
+
+        return self._order[t][self._bounds[t][pos]:self._bounds[t][pos + 1]]
+
+    def candidates(self, projections, n_probes=0):
+        """Gets the candidate neighbours of a query.
+
+        Args:
+            projections (np.ndarray): The (n_tables, n_bits) projections of the query.
+            n_probes (int): Amount of additional buckets probed per table (flipping its most uncertain bits).
+
+        Returns:
+            np.ndarray: The (sorted) indices of the candidates.
+
+        """
+
+        code = self._codes(projections[np.newaxis])[0]
+        found = []
+        for t in range(self.n_tables):
+            # the bucket of the query
+            found.append(self._bucket(t, code[t]))
+
+            # the buckets differing in one of the bits whose projections are closer to zero
+            for b in np.argsort(np.abs(projections[t]))[:n_probes]:
+                found.append(self._bucket(t, code[t] ^ (1 << int(b))))
+
+        return np.unique(np.concatenate(found))
+
+    def query(self, Q, k=1, n_probes=0, return_candidates=False):
+        """Finds the (approximate) `k` nearest neighbours of each query.
+
+        Args:
+            Q (np.ndarray): The queries (rows are samples).
+            k (int): Amount of neighbours.
+            n_probes (int): Amount of additional buckets probed per table (higher recall, more candidates).
+            return_candidates (bool): Whether to return the amount of candidates compared for each query.
+
+        Returns:
+            tuple: The (m, k) exact dissimilarities and indices of the neighbours found (sorted from the
+            nearest, padded with inf and -1 when fewer candidates were found) and, if requested, the
+            amount of candidates of each query.
+
+        """
+
+        # validating the amount of neighbours
+        if k < 1:
+            raise ValueError('The amount of neighbours must be positive.')
+
+        # preparing and hashing all the queries at once
+        Q = np.asarray(Q)
+        q_state = self._pm.prepare(Q)
+        projections = self._project(q_state)
+
+        dist = np.full((Q.shape[0], k), np.inf)
+        idx = np.full((Q.shape[0], k), -1, np.intp)
+        n_candidates = np.empty(Q.shape[0], np.intp)
+        for qi in range(Q.shape[0]):
+            cand = self.candidates(projections[qi], n_probes)
+            n_candidates[qi] = len(cand)
+            if not len(cand):
+                continue
+
+            # re-ranking the candidates with the exact measure
+            d = self._pm.compare(q_state, [qi], self._state, cand)[0]
+            best = np.argsort(d, kind='mergesort')[:k]
+            dist[qi, :len(best)] = d[best]
+            idx[qi, :len(best)] = cand[best]
+
+        return (dist, idx, n_candidates) if return_candidates else (dist, idx)
+
+
+def recall_benchmark(X, measure, n_queries=50, k=10, n_tables=8, n_bits=12, probes=(0, 1, 2, 4), noise=0.01,
+                     random_state=None):
+    """Measures recall and speed of the index against the exact search on a data set.
+
+    The queries are perturbed copies of held out samples, searched in the rest of the data set.
+
+    Args:
+        X (np.ndarray): The data set (rows are samples).
+        measure (int): The type of dissimilarity to use (one of ``ANGULAR_MEASURES``).
+        n_queries (int): Amount of held out samples used as queries.
+        k (int): Amount of neighbours.
+        n_tables (int): Amount of hash tables.
+        n_bits (int): Amount of bits of each hash.
+        probes (tuple): The amounts of additional probed buckets to evaluate.
+        noise (float): Standard deviation of the perturbation of the queries (relative to the data one).
+        random_state (int): Seed of the queries, perturbations and hyperplanes.
+
+    Returns:
+        list: A dictionary per amount of probes with the ``recall`` at `k`, the mean fraction of the library
+        compared (``candidates``) and the query times of the index and of the exact search (in seconds).
+
+    Examples:
+        >>> import measures
+        >>> rs = np.random.RandomState(0)
+        >>> X = np.repeat(rs.rand(20, 50), 20, axis=0) + 0.05 * rs.randn(400, 50)
+        >>> rows = recall_benchmark(X, measures.COSINE, n_queries=20, k=5, probes=(0, 4), random_state=0)
+        >>> rows[0]['recall'] <= rows[1]['recall'] and rows[1]['candidates'] < 1.0
+        True
+
+    """
+
+    # splitting queries and library
+    X = np.asarray(X, np.float64)
+    rs = np.random.RandomState(random_state)
+    q_idx = rs.choice(X.shape[0], n_queries, replace=False)
+    library = np.delete(X, q_idx, axis=0)
+    Q = X[q_idx] + noise * X.std() * rs.randn(n_queries, X.shape[1])
+
+    # the exact neighbours (with the prepared measure)
+    pm = measures.prepared_measure(measure)
+    start = time.time()
+    D = pm.compare(pm.prepare(Q), slice(None), pm.prepare(library), slice(None))
+    exact = np.argsort(D, axis=1, kind='mergesort')[:, :k]
+    exact_time = time.time() - start
+
+    # the approximate neighbours for each amount of probes
+    index = SRPIndex(library, measure, n_tables, n_bits, random_state=rs.randint(2 ** 31))
+    rows = []
+    for n_probes in probes:
+        start = time.time()
+        _, idx, n_candidates = index.query(Q, k, n_probes, return_candidates=True)
+        rows.append({
+            'probes': n_probes,
+            'recall': float(np.mean([len(np.intersect1d(a, e)) / float(k) for a, e in zip(idx, exact)])),
+            'candidates': float(np.mean(n_candidates)) / len(index),
+            'index_time': time.time() - start,
+            'exact_time': exact_time,
+        })
+
+    return rows
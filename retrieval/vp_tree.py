@@ -0,0 +1,337 @@
+#!/usr/bin/env
+# -*- coding: utf-8 -*-
+# Copyright (C) Victor M. Mendiola Lau - All Rights Reserved
+# Unauthorized copying of this file, via any medium is strictly prohibited
+# Proprietary and confidential
+# Written by Victor M. Mendiola Lau <ryuzakyl@gmail.com>, October 2017
+
+"""Vantage-point tree for nearest neighbour queries under metric measures.
+
+Each internal node holds a vantage point and splits the rest of its samples in two halves:
+the ones closer to it (inside) and the farther ones (outside), keeping the range of
+dissimilarities to the vantage point of each half. By the triangle inequality, a half whose
+range does not intersect ``[d(q, vp) - tau, d(q, vp) + tau]`` holds no sample closer than
+``tau`` to the query `q`, so it is skipped without comparing its samples.
+
+Only the measures in ``measures.metric_measures`` can be indexed. Samples are compared with
+the prepared version of the measure (see ``measures.prepared``), so the data set is prepared
+only once. The tree is built once per data set and can be persisted (see ``VPTree.save``).
+
+References:
+    . P. N. Yianilos, Data structures and algorithms for nearest neighbor search in general
+    metric spaces, Proceedings of the 4th ACM-SIAM Symposium on Discrete Algorithms (1993) 311–321.
+
+Examples:
+    >>> import measures
+    >>> X = np.random.RandomState(0).rand(200, 3)
+    >>> tree = VPTree(X, measures.EUCLIDEAN, leaf_size=8, random_state=0)
+    >>> dist, idx, saved = tree.query(X[:3] + 0.01, k=2, return_saved=True)
+    >>> idx[:, 0].tolist()
+    [0, 1, 2]
+    >>> bool(np.all(saved > 0))
+    True
+
+"""
+
+import heapq
+
+import numpy as np
+
+import measures
+from measures.feature_store import fingerprint
+
+# ---------------------------------------------------------------
+
+# default maximum amount of samples of the leaves
+DEFAULT_LEAF_SIZE = 16
+
+# ---------------------------------------------------------------
+
+
+class VPTree(object):
+    """Vantage-point tree of a data set under a metric measure.
+
+    Args:
+        X (np.ndarray): The data array (rows are samples).
+        measure (int): The type of dissimilarity to use (one of ``measures.metric_measures``).
+        leaf_size (int): Maximum amount of samples of the leaves (compared all at once).
+        random_state (int): Seed of the selection of the vantage points.
+
+    Attributes:
+        build_evaluations (int): Amount of dissimilarities computed while building the tree.
+
+    """
+
+    def __init__(self, X, measure, leaf_size=DEFAULT_LEAF_SIZE, random_state=None):
+        # the tree requires the triangle inequality
+        if measure not in measures.metric_measures:
+            raise ValueError('The VP-tree requires a metric measure (see measures.metric_measures).')
+
+        # validating the leaf size
+        if leaf_size < 1:
+            raise ValueError('The leaf size must be positive.')
+
+        # the indexed data and its prepared state
+        self._attach(np.asarray(X), measure)
+        self.leaf_size = leaf_size
+
+        # building the tree
+        self._build(np.random.RandomState(random_state))
+
+    def _attach(self, X, measure):
+        """Sets the indexed data (and its prepared state)."""
+
+        # validating the data
+        if X.ndim != 2 or X.shape[0] == 0:
+            raise ValueError('Data must be a non empty 2D matrix.')
+
+        self.X = X
+        self.measure = measure
+        self._pm = measures.prepared_measure(measure)
+        self._state = self._pm.prepare(X)
+
+    def _build(self, rs):
+        """Builds the nodes of the tree (without recursion)."""
+
+        n = self.X.shape[0]
+
+        # samples reordered so that every node owns a contiguous range
+        perm = np.arange(n)
+
+        # nodes: vantage point (-1 for leaves), children, ranges of the children and owned samples
+        vantage, inside, outside, bounds, span = [], [], [], [], []
+
+        def new_node(start, stop):
+            vantage.append(-1)
+            inside.append(-1)
+            outside.append(-1)
+            bounds.append((0.0, 0.0, 0.0, 0.0))
+            span.append((start, stop))
+            return len(vantage) - 1
+
+        self.build_evaluations = 0
+        stack = [new_node(0, n)]
+        while stack:
+            node = stack.pop()
+            start, stop = span[node]
+
+            # small sets of samples are leaves
+            if stop - start <= self.leaf_size:
+                continue
+
+            # choosing a random vantage point (and moving it to the beginning of the range)
+            v = rs.randint(start, stop)
+            perm[[start, v]] = perm[[v, start]]
+            vantage[node] = perm[start]
+
+            # comparing the rest of the samples against the vantage point
+            rest = perm[start + 1:stop]
+            d = self._pm.compare(self._state, [perm[start]], self._state, rest)[0]
+            self.build_evaluations += len(rest)
+
+            # splitting them by their rank (ties may go to both halves, so ranges may touch)
+            order = np.argsort(d, kind='mergesort')
+            half = len(rest) // 2
+            perm[start + 1:stop] = rest[order]
+            d = d[order]
+
+            # the ranges of dissimilarities of the halves to the vantage point
+            bounds[node] = (d[0], d[half - 1] if half else d[0], d[half], d[-1])
+
+            # the children
+            if half:
+                inside[node] = new_node(start + 1, start + 1 + half)
+                stack.append(inside[node])
+            outside[node] = new_node(start + 1 + half, stop)
+            stack.append(outside[node])
+
+        # storing the nodes as arrays
+        self.perm = perm
+        self.vantage = np.array(vantage, np.intp)
+        self.children = np.array([inside, outside], np.intp).T.reshape((-1, 2))
+        self.bounds = np.array(bounds, np.float64).reshape((-1, 4))
+        self.span = np.array(span, np.intp).reshape((-1, 2))
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def _search(self, q_state, qi, k=None, radius=None):
+        """Searches the neighbours of a query (the `k` nearest or the ones within a radius)."""
+
+        # the best candidates so far, as a max heap of (-dissimilarity, -index)
+        best = []
+        tau = np.inf if radius is None else radius
+        evaluations = 0
+
+        def consider(ds, idx):
+            nonlocal tau
+            for dist, i in zip(ds.tolist(), idx.tolist()):
+                if dist > tau:
+                    continue
+                heapq.heappush(best, (-dist, -i))
+                if k is not None and len(best) > k:
+                    heapq.heappop(best)
+                if k is not None and len(best) == k:
+                    tau = -best[0][0]
+
+        # nodes to visit with the dissimilarity of the query to their parent and their range
+        stack = [(0, 0.0, -np.inf, np.inf)]
+        while stack:
+            node, d_parent, lo, hi = stack.pop()
+
+            # skipping nodes that cannot hold a candidate (triangle inequality)
+            if d_parent + tau < lo or d_parent - tau > hi:
+                continue
+
+            # comparing the query against all the samples of the leaves
+            if self.vantage[node] < 0:
+                start, stop = self.span[node]
+                idx = self.perm[start:stop]
+                consider(self._pm.compare(q_state, [qi], self._state, idx)[0], idx)
+                evaluations += len(idx)
+                continue
+
+            # comparing the query against the vantage point
+            vp = self.vantage[node]
+            d = self._pm.compare(q_state, [qi], self._state, [vp])[0]
+            consider(d, np.array([vp]))
+            evaluations += 1
+            d = float(d[0])
+
+            # visiting first the half closer to the query (pushed last)
+            in_lo, in_hi, out_lo, out_hi = self.bounds[node]
+            children = [(self.children[node, 0], in_lo, in_hi), (self.children[node, 1], out_lo, out_hi)]
+            if d > in_hi:
+                children.reverse()
+            for child, c_lo, c_hi in reversed(children):
+                if child >= 0:
+                    stack.append((child, d, c_lo, c_hi))
+
+        # sorting the neighbours by dissimilarity (and index)
+        neighbours = sorted((-nd, -ni) for nd, ni in best)
+
+        return neighbours, evaluations
+
+    def query(self, Q, k=1, return_saved=False):
+        """Finds the `k` nearest neighbours of each query.
+
+        Args:
+            Q (np.ndarray): The queries (rows are samples).
+            k (int): Amount of neighbours.
+            return_saved (bool): Whether to return the amount of saved dissimilarity evaluations.
+
+        Returns:
+            tuple: The (m, k) dissimilarities and indices of the neighbours (sorted from the nearest)
+            and, if requested, the amount of evaluations saved for each query w.r.t. a linear scan.
+
+        """
+
+        # validating the amount of neighbours
+        if not 1 <= k <= len(self):
+            raise ValueError('The amount of neighbours must be between 1 and the amount of samples.')
+
+        # preparing all the queries at once
+        Q = np.asarray(Q)
+        q_state = self._pm.prepare(Q)
+
+        dist = np.empty((Q.shape[0], k))
+        idx = np.empty((Q.shape[0], k), np.intp)
+        saved = np.empty(Q.shape[0], np.intp)
+        for qi in range(Q.shape[0]):
+            neighbours, evaluations = self._search(q_state, qi, k=k)
+            dist[qi], idx[qi] = zip(*neighbours)
+            saved[qi] = len(self) - evaluations
+
+        return (dist, idx, saved) if return_saved else (dist, idx)
+
+    def query_radius(self, Q, radius, return_saved=False):
+        """Finds the samples within a radius of each query.
+
+        Args:
+            Q (np.ndarray): The queries (rows are samples).
+            radius (float): The maximum dissimilarity of the neighbours.
+            return_saved (bool): Whether to return the amount of saved dissimilarity evaluations.
+
+        Returns:
+            tuple: The lists of dissimilarities and indices of the neighbours of each query (sorted
+            from the nearest) and, if requested, the amount of evaluations saved for each query.
+
+        Examples:
+            >>> import measures
+            >>> X = np.array([[0.0], [1.0], [2.0], [5.0], [9.0]])
+            >>> tree = VPTree(X, measures.MANHATTAN, leaf_size=1, random_state=0)
+            >>> dist, idx = tree.query_radius([[1.5]], 1.0)
+            >>> idx[0].tolist(), dist[0].tolist()
+            ([1, 2], [0.5, 0.5])
+
+        """
+
+        # validating the radius
+        if radius < 0:
+            raise ValueError('The radius must be non negative.')
+
+        # preparing all the queries at once
+        Q = np.asarray(Q)
+        q_state = self._pm.prepare(Q)
+
+        dist, idx = [], []
+        saved = np.empty(Q.shape[0], np.intp)
+        for qi in range(Q.shape[0]):
+            neighbours, evaluations = self._search(q_state, qi, radius=radius)
+            dist.append(np.array([nd for nd, _ in neighbours], np.float64))
+            idx.append(np.array([ni for _, ni in neighbours], np.intp))
+            saved[qi] = len(self) - evaluations
+
+        return (dist, idx, saved) if return_saved else (dist, idx)
+
+    def save(self, filename):
+        """Stores the tree (not the data) in a ``.npz`` file.
+
+        Args:
+            filename (str): The path of the file.
+
+        """
+
+        np.savez(
+            filename,
+            perm=self.perm, vantage=self.vantage, children=self.children, bounds=self.bounds, span=self.span,
+            measure=self.measure, leaf_size=self.leaf_size, build_evaluations=self.build_evaluations,
+            data=fingerprint(self.X),
+        )
+
+    @classmethod
+    def load(cls, filename, X):
+        """Loads a tree stored with ``save``.
+
+        Args:
+            filename (str): The path of the file.
+            X (np.ndarray): The indexed data (the same the tree was built with).
+
+        Returns:
+            VPTree: The tree of `X`.
+
+        Examples:
+            >>> import os, tempfile, measures
+            >>> X = np.random.RandomState(0).rand(50, 10)
+            >>> path = os.path.join(tempfile.mkdtemp(), 'tree.npz')
+            >>> VPTree(X, measures.SAM, random_state=0).save(path)
+            >>> tree = VPTree.load(path, X)
+            >>> tree.query(X[:2], k=1)[1].ravel().tolist()
+            [0, 1]
+
+        """
+
+        with np.load(filename) as f:
+            # the tree must be used with the data it was built with
+            X = np.asarray(X)
+            if str(f['data']) != fingerprint(X):
+                raise ValueError('The data is not the one the tree was built with.')
+
+            tree = cls.__new__(cls)
+            tree._attach(X, int(f['measure']))
+            tree.leaf_size = int(f['leaf_size'])
+            tree.build_evaluations = int(f['build_evaluations'])
+            for name in ('perm', 'vantage', 'children', 'bounds', 'span'):
+                setattr(tree, name, f[name])
+
+        return tree